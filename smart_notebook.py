@@ -1,33 +1,34 @@
 import os
 import datetime
 import tkinter as tk
-from tkinter import messagebox, simpledialog, scrolledtext, filedialog
-import zipfile
+from tkinter import messagebox, simpledialog, scrolledtext, filedialog, ttk
+from smartnotes import perf
+from smartnotes.core import CATEGORIES, Notebook
+from smartnotes.dates import parse_range
+from smartnotes.export import format_for
+from smartnotes.gradient import GradientBackground
+from smartnotes.index import DATE_RE
+from smartnotes.journal import Conflict
+from smartnotes.worker import Worker
+from smartnotes.watcher import NotesWatcher
+from smartnotes.lazyview import ListSource, VirtualList, WHOLE_FILE_BYTES
 
 # ---------------------------------------------------
-# Ensure notes folder exists
+# Settings
 # ---------------------------------------------------
-categories = ["school", "personal", "ideas", "journal"]
-for cat in categories:
-    if not os.path.exists(f"notes/{cat}"):
-        os.makedirs(f"notes/{cat}")
+# "files" or "sqlite", see smartnotes.core
+STORE = os.environ.get("SMART_NOTEBOOK_STORE", "files")
 
-# ---------------------------------------------------
-# Gradient Background
-# ---------------------------------------------------
-def draw_gradient(canvas, color1, color2):
-    width = canvas.winfo_width()
-    height = canvas.winfo_height()
-    r1, g1, b1 = canvas.winfo_rgb(color1)
-    r2, g2, b2 = canvas.winfo_rgb(color2)
-    r1 >>= 8; g1 >>= 8; b1 >>= 8
-    r2 >>= 8; g2 >>= 8; b2 >>= 8
-    for i in range(height):
-        r = int(r1 + (r2 - r1) * (i / height))
-        g = int(g1 + (g2 - g1) * (i / height))
-        b = int(b1 + (b2 - b1) * (i / height))
-        color = f"#{r:02x}{g:02x}{b:02x}"
-        canvas.create_line(0, i, width, i, fill=color)
+# How often (ms) notes/ is checked for changes made outside the app
+WATCH_INTERVAL_MS = 1000
+
+# On exit, day files of months that ended more than this many days ago are
+# packed into archives (see smartnotes.archive); 0 keeps every file as is
+ARCHIVE_AFTER_DAYS = int(os.environ.get("SMART_NOTEBOOK_ARCHIVE_DAYS", "0"))
+
+# URL of a shared notes server (python -m smartnotes serve) to use instead
+# of the local notes folder
+SERVER = os.environ.get("SMART_NOTEBOOK_SERVER")
 
 # ---------------------------------------------------
 # App Class
@@ -36,70 +37,94 @@ class SmartNotebookApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Smart Notebook by Sakina")
-        self.root.geometry("650x750")
+        self.root.geometry("650x820")
+        # all note operations go through the notebook; the app is only the UI
+        self.worker = Worker(root)
+        self.remote = SERVER is not None
+        if self.remote:
+            # the server keeps its own index and caches, and nothing local
+            # is there to watch
+            from smartnotes.client import RemoteNotebook
+            self.notebook = RemoteNotebook(SERVER)
+            self.watcher = None
+        else:
+            self.notebook = Notebook("notes", CATEGORIES, STORE, "backups")
+            if STORE != "sqlite":
+                # load (or build) the search index in the background;
+                # searches scan the files until it is there
+                self.worker.submit(lambda job: self.notebook.index)
+            self.watcher = NotesWatcher("notes", interval=WATCH_INTERVAL_MS)
+            self.watcher.subscribe(self.notes_changed)
+            self.watcher.attach(root)
+        # hidden performance panel
+        root.bind("<Control-P>", self.show_perf)
 
         # Canvas for gradient
         self.canvas = tk.Canvas(root, highlightthickness=0)
         self.canvas.pack(fill="both", expand=True)
-        self.canvas.bind("<Configure>", self.redraw_gradient)
+        self.gradient = GradientBackground(self.canvas, "#ffcfcf", "#ffffff",
+                                           on_resize=self.place_widgets)
 
         # Title
         self.title_label = tk.Label(root, text="Smart Notebook 🧠", bg="#ffcfcf",
                                     fg="white", font=("Segoe UI", 22, "bold"))
-        self.canvas.create_window(325, 60, window=self.title_label)
+        self.title_window = self.canvas.create_window(325, 60, window=self.title_label)
 
         # Buttons
+        self.button_windows = []
         self.add_button = tk.Button(root, text="➕ Add Note", command=self.add_note,
                                     bg="white", fg="#ff8aa6", font=("Segoe UI", 14, "bold"), width=25)
-        self.canvas.create_window(325, 150, window=self.add_button)
+        self.button_windows.append(self.canvas.create_window(325, 150, window=self.add_button))
 
         self.edit_button = tk.Button(root, text="✏️ Edit Notes", command=self.edit_notes,
                                      bg="white", fg="#ff8aa6", font=("Segoe UI", 14, "bold"), width=25)
-        self.canvas.create_window(325, 220, window=self.edit_button)
+        self.button_windows.append(self.canvas.create_window(325, 220, window=self.edit_button))
 
         self.delete_button = tk.Button(root, text="🗑️ Delete Note", command=self.delete_note,
                                        bg="white", fg="#ff8aa6", font=("Segoe UI", 14, "bold"), width=25)
-        self.canvas.create_window(325, 290, window=self.delete_button)
+        self.button_windows.append(self.canvas.create_window(325, 290, window=self.delete_button))
 
         self.search_button = tk.Button(root, text="🔍 Search Notes", command=self.search_notes,
                                        bg="white", fg="#ff8aa6", font=("Segoe UI", 14, "bold"), width=25)
-        self.canvas.create_window(325, 360, window=self.search_button)
+        self.button_windows.append(self.canvas.create_window(325, 360, window=self.search_button))
 
         self.today_button = tk.Button(root, text="📅 Today’s Notes", command=self.today_notes,
                                       bg="white", fg="#ff8aa6", font=("Segoe UI", 14, "bold"), width=25)
-        self.canvas.create_window(325, 430, window=self.today_button)
+        self.button_windows.append(self.canvas.create_window(325, 430, window=self.today_button))
+
+        self.calendar_button = tk.Button(root, text="🗓️ Calendar", command=self.calendar_notes,
+                                         bg="white", fg="#ff8aa6", font=("Segoe UI", 14, "bold"), width=25)
+        self.button_windows.append(self.canvas.create_window(325, 500, window=self.calendar_button))
 
         self.stats_button = tk.Button(root, text="📊 Notebook Stats", command=self.show_stats,
                                       bg="white", fg="#ff8aa6", font=("Segoe UI", 14, "bold"), width=25)
-        self.canvas.create_window(325, 500, window=self.stats_button)
+        self.button_windows.append(self.canvas.create_window(325, 570, window=self.stats_button))
 
         self.export_button = tk.Button(root, text="📤 Export All Notes", command=self.export_all,
                                        bg="white", fg="#ff8aa6", font=("Segoe UI", 14, "bold"), width=25)
-        self.canvas.create_window(325, 570, window=self.export_button)
+        self.button_windows.append(self.canvas.create_window(325, 640, window=self.export_button))
 
         self.exit_button = tk.Button(root, text="🚪 Exit", command=self.exit_app,
                                      bg="white", fg="#ff8aa6", font=("Segoe UI", 14, "bold"), width=25)
-        self.canvas.create_window(325, 640, window=self.exit_button)
+        self.button_windows.append(self.canvas.create_window(325, 710, window=self.exit_button))
 
         # Signature
         self.signature = tk.Label(root, text="made by Sakina", bg="#ffcfcf",
                                   fg="white", font=("Segoe UI", 10, "italic"))
-        self.canvas.create_window(620, 720, window=self.signature, anchor="se")
-
-    def redraw_gradient(self, event):
-        self.canvas.delete("all")
-        draw_gradient(self.canvas, "#ffcfcf", "#ffffff")
-        # redraw widgets
-        self.canvas.create_window(325, 60, window=self.title_label)
-        self.canvas.create_window(325, 150, window=self.add_button)
-        self.canvas.create_window(325, 220, window=self.edit_button)
-        self.canvas.create_window(325, 290, window=self.delete_button)
-        self.canvas.create_window(325, 360, window=self.search_button)
-        self.canvas.create_window(325, 430, window=self.today_button)
-        self.canvas.create_window(325, 500, window=self.stats_button)
-        self.canvas.create_window(325, 570, window=self.export_button)
-        self.canvas.create_window(325, 640, window=self.exit_button)
-        self.canvas.create_window(620, 720, window=self.signature, anchor="se")
+        self.signature_window = self.canvas.create_window(620, 790, window=self.signature, anchor="se")
+
+    def notes_changed(self, events):
+        # keep the search index and stats cache in step with the disk
+        for kind, rel in events:
+            self.notebook.update_file(f"notes/{rel}")
+
+    def place_widgets(self, width, height):
+        # keep everything centred without re-creating the windows
+        x = width // 2
+        self.canvas.coords(self.title_window, x, 60)
+        for i, window in enumerate(self.button_windows):
+            self.canvas.coords(window, x, 150 + 70 * i)
+        self.canvas.coords(self.signature_window, width - 30, height - 30)
 
     # ---------------------------------------------------
     # Add Note
@@ -110,21 +135,20 @@ class SmartNotebookApp:
             return
 
         # Timestamp
-        now = datetime.datetime.now().strftime("%H:%M")
-        note_text = f"[{now}] {note}"
+        now = datetime.datetime.now()
 
         # Choose category
         category = simpledialog.askstring("Category",
-                                          f"Choose category ({', '.join(categories)}):")
-        if category not in categories:
+                                          f"Choose category ({', '.join(CATEGORIES)}):")
+        if category not in CATEGORIES:
             messagebox.showerror("Error", f"Invalid category! Saving to 'personal'.")
             category = "personal"
 
-        today = datetime.date.today().strftime("%Y-%m-%d")
-        filename = f"notes/{category}/{today}_notes.txt"
-
-        with open(filename, "a", encoding="utf-8") as f:
-            f.write(note_text + "\n")
+        try:
+            filename = self.notebook.add(note, category, now)
+        except ValueError as e:
+            messagebox.showerror("Not Saved", str(e))
+            return
 
         messagebox.showinfo("Saved 💗", f"Note saved in {filename}")
 
@@ -132,12 +156,12 @@ class SmartNotebookApp:
     # Edit Notes
     # ---------------------------------------------------
     def edit_notes(self):
-        category = simpledialog.askstring("Category", f"Choose category ({', '.join(categories)}):")
-        if category not in categories:
+        category = simpledialog.askstring("Category", f"Choose category ({', '.join(CATEGORIES)}):")
+        if category not in CATEGORIES:
             messagebox.showerror("Error", "Invalid category")
             return
 
-        file_list = [f for f in os.listdir(f"notes/{category}") if f.endswith(".txt")]
+        file_list = self.notebook.list_files(category)
         if not file_list:
             messagebox.showinfo("No Notes", "No note files in this category.")
             return
@@ -148,8 +172,14 @@ class SmartNotebookApp:
             return
 
         path = f"notes/{category}/{file_choice}"
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read()
+        # opening costs the same whatever the size; only a small file is read
+        lines = self.notebook.open_lines(path)
+        if lines.size > WHOLE_FILE_BYTES:
+            self.edit_lines(path, lines)
+            return
+        lines.close()
+        # the version is checked on save, so edits from elsewhere aren't lost
+        content, version = self.notebook.read_file(path)
 
         edit_win = tk.Toplevel(self.root)
         edit_win.title(f"Editing {file_choice}")
@@ -158,23 +188,75 @@ class SmartNotebookApp:
         text_area.insert(tk.END, content)
 
         def save_changes():
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(text_area.get("1.0", tk.END).strip())
+            nonlocal version
+            try:
+                version = self.notebook.edit_file(path, text_area.get("1.0", tk.END), version)
+            except Conflict:
+                messagebox.showerror("Not Saved", "This file was changed while you edited it.\n"
+                                     "Close the window and open it again to see the changes.", parent=edit_win)
+                return
             messagebox.showinfo("Saved 💗", "Changes saved successfully!")
 
         save_btn = tk.Button(edit_win, text="Save Changes", command=save_changes, bg="#ffcfcf")
         save_btn.pack(pady=10)
 
+    def edit_lines(self, path, lines):
+        # Big files are edited a line at a time from a paged view, so the
+        # file is never put into the dialog whole
+
+        edit_win = tk.Toplevel(self.root)
+        edit_win.title(f"Editing {os.path.basename(path)}")
+
+        def edit_line(i):
+            nonlocal lines
+            line = lines.line(i)
+            if line is None:
+                return
+            new = simpledialog.askstring("Edit Line", "Change this note:", parent=edit_win,
+                                         initialvalue=line.rstrip("\r\n"))
+            if not new:
+                return
+            version = lines.version
+            # closed while the file is rewritten (a mapped file can't be
+            # replaced on Windows) and opened again, saved or not
+            lines.close()
+            try:
+                self.notebook.edit_line(path, i, new, version)
+            except Conflict:
+                messagebox.showerror("Not Saved", "This file was changed meanwhile.\n"
+                                     "Close the window and open it again.", parent=edit_win)
+            except ValueError as e:
+                messagebox.showerror("Not Saved", str(e), parent=edit_win)
+            finally:
+                lines = view.source = self.notebook.open_lines(path)
+                view.refresh()
+
+        def edit_selected():
+            if view.selection() is None:
+                messagebox.showerror("Error", "Select a line to edit", parent=edit_win)
+            else:
+                edit_line(view.selection())
+
+        def close():
+            lines.close()
+            edit_win.destroy()
+
+        view = VirtualList(edit_win, lines, rows=20, width=70, on_activate=edit_line)
+        view.pack(padx=10, pady=10, fill="both", expand=True)
+        edit_btn = tk.Button(edit_win, text="Edit Selected Line", command=edit_selected, bg="#ffcfcf")
+        edit_btn.pack(pady=10)
+        edit_win.protocol("WM_DELETE_WINDOW", close)
+
     # ---------------------------------------------------
     # Delete Note
     # ---------------------------------------------------
     def delete_note(self):
-        category = simpledialog.askstring("Category", f"Choose category ({', '.join(categories)}):")
-        if category not in categories:
+        category = simpledialog.askstring("Category", f"Choose category ({', '.join(CATEGORIES)}):")
+        if category not in CATEGORIES:
             messagebox.showerror("Error", "Invalid category")
             return
 
-        file_list = [f for f in os.listdir(f"notes/{category}") if f.endswith(".txt")]
+        file_list = self.notebook.list_files(category)
         if not file_list:
             messagebox.showinfo("No Notes", "No note files in this category.")
             return
@@ -185,134 +267,310 @@ class SmartNotebookApp:
             return
 
         path = f"notes/{category}/{file_choice}"
-        with open(path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
+        # the file as it is now, and its version; paged into the list as it
+        # scrolls
+        lines = self.notebook.open_lines(path)
+
+        delete_win = tk.Toplevel(self.root)
+        delete_win.title(f"Delete from {file_choice}")
+        view = VirtualList(delete_win, lines, rows=20, width=70)
+        view.pack(padx=10, pady=10, fill="both", expand=True)
+
+        def delete_selected():
+            nonlocal lines
+            line_num = view.selection()
+            if line_num is None:
+                messagebox.showerror("Error", "Select a line to delete", parent=delete_win)
+                return
+            version = lines.version
+            lines.close()
+            try:
+                self.notebook.delete_line(path, line_num, version)
+            except Conflict:
+                messagebox.showerror("Not Deleted", "This file was changed meanwhile.\n"
+                                     "Close the window and open it again.", parent=delete_win)
+                return
+            finally:
+                lines = view.source = self.notebook.open_lines(path)
+                view.refresh()
+
+            messagebox.showinfo("Deleted ❌", f"Line {line_num + 1} deleted successfully!", parent=delete_win)
+
+        def close():
+            lines.close()
+            delete_win.destroy()
+
+        delete_btn = tk.Button(delete_win, text="Delete Selected", command=delete_selected, bg="#ffcfcf")
+        delete_btn.pack(pady=10)
+        delete_win.protocol("WM_DELETE_WINDOW", close)
 
-        line_text = "\n".join([f"{i+1}. {l.strip()}" for i, l in enumerate(lines)])
-        line_num = simpledialog.askinteger("Delete Line", f"Select line number to delete:\n{line_text}")
-        if not line_num or line_num < 1 or line_num > len(lines):
-            messagebox.showerror("Error", "Invalid line number")
-            return
-
-        del lines[line_num - 1]
-        with open(path, "w", encoding="utf-8") as f:
-            f.writelines(lines)
-
-        messagebox.showinfo("Deleted ❌", f"Line {line_num} deleted successfully!")
+    # ---------------------------------------------------
+    # Background jobs
+    # ---------------------------------------------------
+    def show_results(self, title, empty_title, empty_message, task, *args, on_close=None):
+        # Streams the lines a task emits into a results window as they
+        # arrive; only the rows on screen are drawn. Returns a reload() that
+        # clears the window and runs the task again.
+        result_win = tk.Toplevel(self.root)
+        result_win.title(title)
+        results = ListSource()
+        view = VirtualList(result_win, results, rows=25, width=70)
+        view.pack(padx=10, pady=10, fill="both", expand=True)
+        bar = ttk.Progressbar(result_win, length=300, mode="indeterminate")
+        state = {"job": None, "found": 0, "runs": 0}
+
+        def on_items(lines):
+            results.add(lines)
+            view.refresh()
+            state["found"] += len(lines)
+
+        def on_done(result):
+            bar.stop()
+            bar.pack_forget()
+            if not state["found"] and state["runs"] == 1:
+                close()
+                messagebox.showinfo(empty_title, empty_message)
+
+        def on_error(error):
+            close()
+            messagebox.showerror("Error", str(error))
+
+        def reload():
+            if state["job"] is not None:
+                state["job"].cancel()
+            results.clear()
+            view.refresh()
+            state["found"] = 0
+            state["runs"] += 1
+            bar.pack(pady=(0, 10))
+            bar.start(10)
+            state["job"] = self.worker.submit(task, *args, on_items=on_items, on_done=on_done,
+                                              on_error=on_error)
+
+        def close():
+            state["job"].cancel()
+            result_win.destroy()
+            if on_close:
+                on_close()
+
+        result_win.protocol("WM_DELETE_WINDOW", close)
+        reload()
+        return reload
+
+    def run_with_progress(self, title, message, task, *args, on_done=None):
+        # Runs a task behind a small progress window with a Cancel button
+        progress_win = tk.Toplevel(self.root)
+        progress_win.title(title)
+        tk.Label(progress_win, text=message, font=("Segoe UI", 12)).pack(padx=20, pady=10)
+        bar = ttk.Progressbar(progress_win, length=250, mode="indeterminate")
+        bar.pack(padx=20, pady=10)
+        bar.start(10)
+
+        def on_progress(value):
+            done, total = value
+            if total:
+                bar.stop()
+                bar.configure(mode="determinate", maximum=total, value=done)
+
+        def finish(result):
+            progress_win.destroy()
+            if on_done:
+                on_done(result)
+
+        def on_error(error):
+            progress_win.destroy()
+            messagebox.showerror("Error", str(error))
+
+        job = self.worker.submit(task, *args, on_progress=on_progress, on_done=finish,
+                                 on_error=on_error)
+
+        def cancel():
+            job.cancel()
+            progress_win.destroy()
+
+        tk.Button(progress_win, text="Cancel", command=cancel, bg="#ffcfcf").pack(pady=(0, 10))
+        progress_win.protocol("WM_DELETE_WINDOW", cancel)
+        return job
 
     # ---------------------------------------------------
     # Search Notes
     # ---------------------------------------------------
     def search_notes(self):
-        keyword = simpledialog.askstring("Search", "Enter keyword:")
+        keyword = simpledialog.askstring("Search", "Enter keyword (or ~words for the best matches first):")
         if not keyword:
             return
 
-        results = ""
-        date_filter = simpledialog.askstring("Filter by Date (optional)", "Enter date YYYY-MM-DD or leave blank:")
-        for cat in categories:
-            folder = f"notes/{cat}"
-            for file in os.listdir(folder):
-                if file.endswith(".txt") and (not date_filter or date_filter in file):
-                    with open(f"{folder}/{file}", "r", encoding="utf-8") as f:
-                        for line in f:
-                            if keyword.lower() in line.lower():
-                                results += f"{cat}/{file}: {line}"
-
-        if not results:
-            messagebox.showinfo("No Results 😪", "No matching notes found.")
-        else:
-            result_win = tk.Toplevel(self.root)
-            result_win.title("Search Results 🎯")
-            text_area = scrolledtext.ScrolledText(result_win, width=70, height=25)
-            text_area.pack(padx=10, pady=10)
-            text_area.insert(tk.END, results)
+        date_filter = simpledialog.askstring("Filter by Date (optional)",
+                                             "Enter a date (YYYY-MM-DD, this week, March 2026...) or leave blank:")
+        self.show_results("Search Results 🎯", "No Results 😪", "No matching notes found.",
+                          self.search_job, keyword, date_filter)
+
+    def search_job(self, job, keyword, date_filter):
+        # the date may also be a range ("this week", "FROM..TO"); see
+        # smartnotes.grep for "a | b", "a & b", '"phrase"' and /regex/ queries
+        if keyword.startswith("~"):
+            # ranked by relevance (smartnotes.rank); pasting a whole note finds similar ones
+            for score, rel, lineno, line in self.notebook.ranked(keyword[1:], CATEGORIES, date_filter):
+                job.emit(f"{rel}:{lineno}: {line}\n")
+            return
+        for rel, line in self.notebook.search(keyword, CATEGORIES, date_filter):
+            job.emit(f"{rel}: {line}\n")
 
     # ---------------------------------------------------
     # Today's Notes
     # ---------------------------------------------------
     def today_notes(self):
+        # The window follows changes to today's files while it is open
         today = datetime.date.today().strftime("%Y-%m-%d")
-        results = ""
-        for cat in categories:
-            folder = f"notes/{cat}"
-            for file in os.listdir(folder):
-                if file.endswith(f"{today}_notes.txt"):
-                    with open(f"{folder}/{file}", "r", encoding="utf-8") as f:
-                        for line in f:
-                            results += f"{cat}/{file}: {line}"
-
-        if not results:
-            messagebox.showinfo("No Notes Today 😪", "No notes found for today.")
-        else:
-            result_win = tk.Toplevel(self.root)
-            result_win.title("Today's Notes 📅")
-            text_area = scrolledtext.ScrolledText(result_win, width=70, height=25)
-            text_area.pack(padx=10, pady=10)
-            text_area.insert(tk.END, results)
+
+        def on_change(events):
+            if any(rel.endswith(f"{today}_notes.txt") for kind, rel in events):
+                reload()
+
+        if self.watcher is None:
+            # served: shown as it was when opened
+            self.show_results("Today's Notes 📅", "No Notes Today 😪", "No notes found for today.",
+                              self.today_job)
+            return
+        reload = self.show_results("Today's Notes 📅", "No Notes Today 😪", "No notes found for today.",
+                                   self.today_job, on_close=lambda: self.watcher.unsubscribe(on_change))
+        self.watcher.subscribe(on_change)
+
+    def today_job(self, job):
+        for rel, line in self.notebook.today(CATEGORIES):
+            job.emit(f"{rel}: {line}\n")
+
+    # ---------------------------------------------------
+    # Calendar
+    # ---------------------------------------------------
+    def calendar_notes(self):
+        span = simpledialog.askstring("Calendar", "Which days? (this week, last month, March 2026, "
+                                      "2026-03-01..2026-03-15)", initialvalue="this week")
+        if not span:
+            return
+        try:
+            first, last = parse_range(span)
+        except ValueError:
+            messagebox.showerror("Error", f"Don't know which days \"{span}\" means")
+            return
+        self.show_results(f"Calendar: {span} 🗓️", "No Notes 😪", "No notes on those days.",
+                          self.calendar_job, first, last)
+
+    def calendar_job(self, job, first, last):
+        # each day opens with its rollup line, straight from the date index
+        days = self.notebook.rollup(first, last, CATEGORIES)
+        current = None
+        for rel, line in self.notebook.days(first, last, CATEGORIES):
+            date = DATE_RE.search(rel).group(1)
+            if date != current:
+                current = date
+                day = days.get(date, {"notes": 0, "words": 0})
+                job.emit(f"── {date}: {day['notes']} notes, {day['words']} words ──\n")
+            job.emit(f"{rel}: {line}\n")
 
     # ---------------------------------------------------
     # Notebook Stats
     # ---------------------------------------------------
     def show_stats(self):
-        total_notes = 0
-        word_count = {}
-        for cat in categories:
-            folder = f"notes/{cat}"
-            for file in os.listdir(folder):
-                if file.endswith(".txt"):
-                    with open(f"{folder}/{file}", "r", encoding="utf-8") as f:
-                        lines = f.readlines()
-                        total_notes += len(lines)
-                        for line in lines:
-                            for word in line.split():
-                                word = word.strip("#.,!?").lower()
-                                if word:
-                                    word_count[word] = word_count.get(word, 0) + 1
-        most_used = max(word_count, key=word_count.get) if word_count else "N/A"
+        self.run_with_progress("Stats 📊", "Counting your notes...", self.stats_job,
+                               on_done=self.stats_done)
+
+    def stats_job(self, job):
+        return self.notebook.summary(CATEGORIES, top=5)
+
+    def stats_done(self, stats):
+        most_used = stats["most_used"] or "N/A"
+        top_words = ", ".join(f"{w} ({n})" for w, n in stats["top_words"]) or "N/A"
+        per_category = "\n".join(f"  {cat}: {n}" for cat, n in stats["per_category"].items())
+        busiest = max(stats["per_day"].items(), key=lambda d: d[1], default=None)
+        busiest = f"{busiest[0]} ({busiest[1]} notes)" if busiest else "N/A"
         messagebox.showinfo("Stats 📊",
-                            f"Total Notes: {total_notes}\nMost Used Word: {most_used}")
+                            f"Total Notes: {stats['total_notes']}\nMost Used Word: {most_used}\n"
+                            f"Top Words: {top_words}\n\nPer Category:\n{per_category}\n\n"
+                            f"Days With Notes: {len(stats['per_day'])}\nBusiest Day: {busiest}")
 
     # ---------------------------------------------------
     # Export All Notes
     # ---------------------------------------------------
     def export_all(self):
         export_path = filedialog.asksaveasfilename(defaultextension=".txt",
-                                                   filetypes=[("Text Files", "*.txt")],
+                                                   filetypes=[("Text Files", "*.txt"),
+                                                              ("JSON Lines", "*.jsonl"),
+                                                              ("Markdown", "*.md"),
+                                                              ("CSV", "*.csv")],
                                                    title="Export All Notes")
         if not export_path:
             return
 
-        all_notes = ""
-        for cat in categories:
-            folder = f"notes/{cat}"
-            for file in os.listdir(folder):
-                if file.endswith(".txt"):
-                    with open(f"{folder}/{file}", "r", encoding="utf-8") as f:
-                        all_notes += f"--- {cat}/{file} ---\n"
-                        all_notes += f.read() + "\n\n"
+        def done(result):
+            messagebox.showinfo("Exported 📤", f"All notes exported to {export_path}")
+
+        self.run_with_progress("Exporting 📤", "Exporting your notes...", self.export_job,
+                               export_path, on_done=done)
+
+    def export_job(self, job, export_path):
+        self.notebook.export({export_path: format_for(export_path)}, CATEGORIES, progress=job.progress)
+
+    # ---------------------------------------------------
+    # Performance panel (Ctrl+Shift+P)
+    # ---------------------------------------------------
+    def show_perf(self, event=None):
+        perf_win = tk.Toplevel(self.root)
+        perf_win.title("Performance")
+        text_area = scrolledtext.ScrolledText(perf_win, width=90, height=30, font=("Courier", 10))
+        text_area.pack(padx=10, pady=10)
 
-        with open(export_path, "w", encoding="utf-8") as f:
-            f.write(all_notes)
+        def refresh():
+            text_area.delete("1.0", tk.END)
+            if perf.enabled():
+                text_area.insert(tk.END, perf.report(perf.samples()))
+            else:
+                text_area.insert(tk.END, "Recording is off. Start it here or set SMARTNOTES_PERF=1.")
 
-        messagebox.showinfo("Exported 📤", f"All notes exported to {export_path}")
+        def start():
+            if not perf.enabled():
+                perf.enable()
+            refresh()
+
+        tk.Button(perf_win, text="Refresh", command=refresh).pack(side="left", padx=10, pady=(0, 10))
+        tk.Button(perf_win, text="Start Recording", command=start).pack(side="left", pady=(0, 10))
+        refresh()
 
     # ---------------------------------------------------
     # Exit App with Backup
     # ---------------------------------------------------
     def exit_app(self):
-        backup_name = f"backup_{datetime.date.today().strftime('%Y-%m-%d')}.zip"
-        with zipfile.ZipFile(backup_name, 'w') as zipf:
-            for cat in categories:
-                folder = f"notes/{cat}"
-                for file in os.listdir(folder):
-                    zipf.write(f"{folder}/{file}")
-        messagebox.showinfo("Goodbye 💗", f"Backup created: {backup_name}\nNotes saved successfully!")
-        self.root.destroy()
+        if self.remote:
+            # backups are the server's business
+            self.notebook.close()
+            self.worker.shutdown()
+            self.root.destroy()
+            return
+        self.notebook.save()
+
+        # Only changed files are stored, off the Tk thread; an archive is one
+        # file to store where its month was one per day
+        def pack_and_backup(job):
+            if ARCHIVE_AFTER_DAYS:
+                self.notebook.pack(ARCHIVE_AFTER_DAYS)
+            return self.notebook.backup(job.progress)
+
+        # the watcher keeps running until the backup is done: cancelled or
+        # failed, the app stays open and its views stay current
+        def done(snapshot):
+            self.watcher.stop()
+            self.notebook.close()
+            self.worker.shutdown()
+            messagebox.showinfo("Goodbye 💗", f"Backup snapshot: {snapshot}\nNotes saved successfully!")
+            self.root.destroy()
+
+        self.run_with_progress("Backing up 💾", "Backing up your notes...",
+                               pack_and_backup, on_done=done)
 
 # ---------------------------------------------------
 # Run App
 # ---------------------------------------------------
-root = tk.Tk()
-app = SmartNotebookApp(root)
-root.mainloop()
+if __name__ == "__main__":
+    root = tk.Tk()
+    app = SmartNotebookApp(root)
+    root.mainloop()
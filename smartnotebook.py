@@ -2,10 +2,16 @@ import os
 import datetime
 import tkinter as tk
 from tkinter import messagebox, simpledialog, scrolledtext
-
-# --- Setup folders ---
+from smartnotes import perf
+from smartnotes.core import Notebook
+from smartnotes.gradient import gradient_image
+from smartnotes.journal import Conflict
+from smartnotes.watcher import NotesWatcher
+from smartnotes.lazyview import ListSource, VirtualList, WHOLE_FILE_BYTES
+
+# --- Settings ---
 NOTES_DIR = "notes"
-os.makedirs(NOTES_DIR, exist_ok=True)
+EXPORT_PATH = "all_notes.txt"
 
 # --- Main App ---
 class SmartNotebook:
@@ -13,6 +19,11 @@ class SmartNotebook:
         self.root = root
         root.title("Smart Notebook ✨")
         root.geometry("700x700")
+        # flat layout (notes/<date>_notes.txt), notes saved as typed
+        self.notebook = Notebook(NOTES_DIR, [""], timestamps=False)
+        self.watcher = NotesWatcher(NOTES_DIR)
+        self.watcher.subscribe(self.notes_changed)
+        self.watcher.attach(root)
 
         # Gradient background
         self.canvas = tk.Canvas(root, width=700, height=700)
@@ -34,7 +45,11 @@ class SmartNotebook:
         self.add_btn("Search Notes", self.search_notes, btn_y + 4*btn_gap)
         self.add_btn("Stats", self.show_stats, btn_y + 5*btn_gap)
         self.add_btn("Export All", self.export_all_notes, btn_y + 6*btn_gap)
-        self.add_btn("Exit", root.quit, btn_y + 7*btn_gap)
+        self.add_btn("Exit", self.exit_app, btn_y + 7*btn_gap)
+
+    def notes_changed(self, events):
+        for kind, rel in events:
+            self.notebook.update_file(os.path.join(NOTES_DIR, rel))
 
     def add_btn(self, text, command, y):
         b = tk.Button(self.root, text=text, command=command,
@@ -43,19 +58,9 @@ class SmartNotebook:
         self.canvas.create_window(350, y, window=b)
 
     def draw_gradient(self, color1, color2):
-        for i in range(700):
-            ratio = i / 700
-            r1, g1, b1 = self.hex_to_rgb(color1)
-            r2, g2, b2 = self.hex_to_rgb(color2)
-            r = int(r1 + (r2 - r1) * ratio)
-            g = int(g1 + (g2 - g1) * ratio)
-            b = int(b1 + (b2 - b1) * ratio)
-            color = f"#{r:02x}{g:02x}{b:02x}"
-            self.canvas.create_line(0, i, 700, i, fill=color)
-
-    def hex_to_rgb(self, hex_code):
-        hex_code = hex_code.lstrip('#')
-        return tuple(int(hex_code[i:i+2], 16) for i in (0, 2, 4))
+        with perf.measure("gradient"):
+            self.gradient = gradient_image(self.canvas, 700, 700, color1, color2)
+            self.canvas.create_image(0, 0, image=self.gradient, anchor="nw")
 
     # --- Features ---
     def add_note(self):
@@ -63,13 +68,13 @@ class SmartNotebook:
         if not note:
             return
 
-        today = datetime.date.today().isoformat()
-        file_path = os.path.join(NOTES_DIR, f"{today}_notes.txt")
-
-        with open(file_path, "a", encoding="utf-8") as f:
-            f.write(note + "\n")
+        try:
+            file_path = self.notebook.add(note)
+        except ValueError as e:
+            messagebox.showerror("Not Saved", str(e))
+            return
 
-        messagebox.showinfo("Saved", f"Note saved to {today}_notes.txt ✨")
+        messagebox.showinfo("Saved", f"Note saved to {os.path.basename(file_path)} ✨")
 
     def edit_notes(self):
         today = datetime.date.today().isoformat()
@@ -79,6 +84,10 @@ class SmartNotebook:
             messagebox.showinfo("None", "No notes today yet!")
             return
 
+        if os.path.getsize(file_path) > WHOLE_FILE_BYTES:
+            self.edit_lines(file_path)
+            return
+
         editor = tk.Toplevel(self.root)
         editor.title("Edit Today's Notes")
         editor.geometry("600x500")
@@ -86,17 +95,64 @@ class SmartNotebook:
         text_area = scrolledtext.ScrolledText(editor, font=("Segoe UI", 12))
         text_area.pack(fill="both", expand=True)
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            text_area.insert("1.0", f.read())
+        content, version = self.notebook.read_file(file_path)
+        text_area.insert("1.0", content)
 
         def save():
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(text_area.get("1.0", "end"))
+            try:
+                self.notebook.edit_file(file_path, text_area.get("1.0", "end"), version)
+            except Conflict:
+                messagebox.showerror("Not Saved", "These notes changed meanwhile, open them again.",
+                                     parent=editor)
+                return
             editor.destroy()
             messagebox.showinfo("Updated", "Notes updated!")
 
         tk.Button(editor, text="Save", command=save, bg="#ffb6c1").pack()
 
+    def edit_lines(self, file_path):
+        # Big files: pick a line in a paged view and edit just that line
+        lines = self.notebook.open_lines(file_path)
+
+        editor = tk.Toplevel(self.root)
+        editor.title("Edit Today's Notes")
+        editor.geometry("600x500")
+
+        def edit_line(index):
+            nonlocal lines
+            line = lines.line(index)
+            if line is None:
+                return
+            new = simpledialog.askstring("Edit Note", "Change this note:", parent=editor,
+                                         initialvalue=line.rstrip("\r\n"))
+            if not new:
+                return
+            version = lines.version
+            # closed while the file is rewritten (a mapped file can't be
+            # replaced on Windows) and opened again, saved or not
+            lines.close()
+            try:
+                self.notebook.edit_line(file_path, index, new, version)
+            except Conflict:
+                messagebox.showerror("Not Saved", "These notes changed meanwhile, open them again.",
+                                     parent=editor)
+            finally:
+                lines = view.source = self.notebook.open_lines(file_path)
+                view.refresh()
+
+        def edit_selected():
+            if view.selection() is not None:
+                edit_line(view.selection())
+
+        def close():
+            lines.close()
+            editor.destroy()
+
+        view = VirtualList(editor, lines, rows=20, font=("Segoe UI", 12), on_activate=edit_line)
+        view.pack(fill="both", expand=True)
+        tk.Button(editor, text="Edit Selected", command=edit_selected, bg="#ffb6c1").pack()
+        editor.protocol("WM_DELETE_WINDOW", close)
+
     def delete_note(self):
         today = datetime.date.today().isoformat()
         file_path = os.path.join(NOTES_DIR, f"{today}_notes.txt")
@@ -105,31 +161,39 @@ class SmartNotebook:
             messagebox.showinfo("None", "No notes today!")
             return
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
+        # lines are decoded as the list scrolls
+        lines = self.notebook.open_lines(file_path)
 
         delete_window = tk.Toplevel(self.root)
         delete_window.title("Delete Note")
         delete_window.geometry("500x400")
 
-        lb = tk.Listbox(delete_window, font=("Segoe UI", 12))
+        lb = VirtualList(delete_window, lines, rows=15, font=("Segoe UI", 12))
         lb.pack(fill="both", expand=True)
 
-        for line in lines:
-            lb.insert("end", line.strip())
-
         def delete_selected():
-            sel = lb.curselection()
-            if not sel:
+            nonlocal lines
+            index = lb.selection()
+            if index is None:
                 return
-            index = sel[0]
-            lines.pop(index)
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.writelines(lines)
-            lb.delete(index)
+            version = lines.version
+            lines.close()
+            try:
+                self.notebook.delete_line(file_path, index, version)
+            except Conflict:
+                messagebox.showerror("Not Deleted", "These notes changed meanwhile, open them again.",
+                                     parent=delete_window)
+            finally:
+                lines = lb.source = self.notebook.open_lines(file_path)
+                lb.refresh()
+
+        def close():
+            lines.close()
+            delete_window.destroy()
 
         tk.Button(delete_window, text="Delete Selected", command=delete_selected,
                   bg="#ff8ca9").pack()
+        delete_window.protocol("WM_DELETE_WINDOW", close)
 
     def show_today_notes(self):
         today = datetime.date.today().isoformat()
@@ -143,28 +207,23 @@ class SmartNotebook:
         viewer.title("Today's Notes")
         viewer.geometry("600x500")
 
-        text_area = scrolledtext.ScrolledText(viewer, font=("Segoe UI", 12))
-        text_area.pack(fill="both", expand=True)
+        lines = self.notebook.open_lines(file_path)
+        VirtualList(viewer, lines, font=("Segoe UI", 12)).pack(fill="both", expand=True)
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            text_area.insert("1.0", f.read())
+        def close():
+            lines.close()
+            viewer.destroy()
+
+        viewer.protocol("WM_DELETE_WINDOW", close)
 
     def search_notes(self):
         keyword = simpledialog.askstring("Search", "Enter keyword:")
         if not keyword:
             return
 
-        matches = []
-
-        for file in os.listdir(NOTES_DIR):
-            if file.endswith(".txt"):
-                path = os.path.join(NOTES_DIR, file)
-                with open(path, "r", encoding="utf-8") as f:
-                    for line in f:
-                        if keyword.lower() in line.lower():
-                            matches.append((file, line.strip()))
+        matches = ListSource(f"{file} → {line.strip()}" for file, line in self.notebook.search(keyword))
 
-        if not matches:
+        if not matches.count():
             messagebox.showinfo("None", "No matches found.")
             return
 
@@ -172,43 +231,29 @@ class SmartNotebook:
         result.title("Search Results")
         result.geometry("600x500")
 
-        text_area = scrolledtext.ScrolledText(result, font=("Segoe UI", 12))
-        text_area.pack(fill="both", expand=True)
-
-        for file, line in matches:
-            text_area.insert("end", f"{file} → {line}\n")
+        VirtualList(result, matches, font=("Segoe UI", 12)).pack(fill="both", expand=True)
 
     def show_stats(self):
-        total = 0
-        words = {}
-
-        for file in os.listdir(NOTES_DIR):
-            if file.endswith(".txt"):
-                path = os.path.join(NOTES_DIR, file)
-                with open(path, "r", encoding="utf-8") as f:
-                    for line in f:
-                        total += 1
-                        for w in line.split():
-                            w = w.lower()
-                            words[w] = words.get(w, 0) + 1
-
-        most_used = max(words, key=words.get) if words else "None"
+        stats = self.notebook.summary(top=5)
+        most_used = stats["most_used"] or "None"
+        top_words = ", ".join(f"{w} ({n})" for w, n in stats["top_words"]) or "None"
 
-        messagebox.showinfo("Stats", f"Total notes: {total}\nMost used word: {most_used}")
+        messagebox.showinfo("Stats", f"Total notes: {stats['total_notes']}\nMost used word: {most_used}\n"
+                                     f"Top words: {top_words}\nDays with notes: {len(stats['per_day'])}")
 
     def export_all_notes(self):
-        export_path = os.path.join(NOTES_DIR, "all_notes.txt")
+        # Written next to the notes folder so later exports never include it
+        self.notebook.export({EXPORT_PATH: "txt"})
 
-        with open(export_path, "w", encoding="utf-8") as out:
-            for file in os.listdir(NOTES_DIR):
-                if file.endswith(".txt"):
-                    out.write(f"--- {file} ---\n")
-                    with open(os.path.join(NOTES_DIR, file), "r", encoding="utf-8") as f:
-                        out.write(f.read() + "\n")
+        messagebox.showinfo("Exported", f"All notes exported to {EXPORT_PATH} ✨")
 
-        messagebox.showinfo("Exported", "All notes exported to all_notes.txt ✨")
+    def exit_app(self):
+        self.watcher.stop()
+        self.notebook.close()
+        self.root.quit()
 
 # --- Run ---
-root = tk.Tk()
-app = SmartNotebook(root)
-root.mainloop()
+if __name__ == "__main__":
+    root = tk.Tk()
+    app = SmartNotebook(root)
+    root.mainloop()
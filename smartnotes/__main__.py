@@ -0,0 +1,275 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+
+from smartnotes import perf
+from smartnotes.core import CATEGORIES, STORES, Notebook
+
+# ---------------------------------------------------
+# Command line
+# ---------------------------------------------------
+#   python -m smartnotes add "buy milk" -c personal
+#   python -m smartnotes search milk --date 2026-03-01..2026-03-31
+#   python -m smartnotes search "milk | bread"         # also "a & b", '"a phrase"', /regex/
+#   python -m smartnotes search --rank "exam revision"  # best matches first (BM25)
+#   python -m smartnotes similar school/2026-03-02_notes.txt:4
+#   python -m smartnotes today
+#   python -m smartnotes show last week               # notes in a day range
+#   python -m smartnotes cal March 2026               # notes per day, month grid
+#   python -m smartnotes stats --json
+#   python -m smartnotes export all_notes.md all_notes.csv
+#   python -m smartnotes backup
+#   python -m smartnotes snapshots                    # the backups taken so far
+#   python -m smartnotes restore 2026-03-02T09-30-00-000000 --to old_notes
+#   python -m smartnotes pack --older-than 90         # archive old day files
+#   python -m smartnotes unpack 2025-03 -c school     # and put a month back
+#   python -m smartnotes serve --port 8765            # share the notebook over HTTP
+#   python -m smartnotes --server http://host:8765 search milk
+#   python -m smartnotes --perf profile search milk   # record timings/profiles
+#   python -m smartnotes perf                          # latency percentiles
+#
+# --flat works on the smartnotebook.py layout (notes/<date>_notes.txt).
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m smartnotes",
+                                     description="Smart Notebook from the command line")
+    parser.add_argument("--notes-dir", default="notes")
+    parser.add_argument("--backup-dir", default="backups")
+    parser.add_argument("--store", choices=STORES,
+                        default=os.environ.get("SMART_NOTEBOOK_STORE", "files"))
+    parser.add_argument("--flat", action="store_true",
+                        help="notes kept directly in the notes folder, without categories")
+    parser.add_argument("--perf", choices=perf.MODES,
+                        help="record timings (and profiles or memory snapshots) under perf/")
+    parser.add_argument("--server", default=os.environ.get("SMART_NOTEBOOK_SERVER"),
+                        help="use the notebook of a notes server (URL) instead of the local folder")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add a note (reads stdin lines when TEXT is -)")
+    add.add_argument("text")
+    add.add_argument("-c", "--category", choices=CATEGORIES)
+
+    search = commands.add_parser("search", help="print lines containing a keyword")
+    search.add_argument("keyword", help='a keyword, "a | b", "a & b", \'"a phrase"\' or /regex/')
+    search.add_argument("--date", help="YYYY-MM-DD or FROM..TO")
+    search.add_argument("-c", "--category", action="append", choices=CATEGORIES)
+    search.add_argument("--scan", action="store_true", help="read the files even if there is an index")
+    search.add_argument("--rank", action="store_true", help="the best matches for the words, best first")
+    search.add_argument("-k", type=int, default=20, help="how many ranked results")
+
+    similar = commands.add_parser("similar", help="notes most like a given note")
+    similar.add_argument("note", help="RELPATH:LINE, as printed by search --rank")
+    similar.add_argument("-c", "--category", action="append", choices=CATEGORIES)
+    similar.add_argument("-k", type=int, default=10)
+
+    today = commands.add_parser("today", help="print today's notes")
+    today.add_argument("-c", "--category", action="append", choices=CATEGORIES)
+
+    show = commands.add_parser("show", help="print the notes of a day or range of days")
+    show.add_argument("range", nargs="*", help='e.g. yesterday, "this week", "March 2026", 2026-03-01..2026-03-15')
+    show.add_argument("-c", "--category", action="append", choices=CATEGORIES)
+
+    cal = commands.add_parser("cal", help="notes and words per day, as a calendar")
+    cal.add_argument("range", nargs="*", help="as for show (default: this month)")
+    cal.add_argument("-c", "--category", action="append", choices=CATEGORIES)
+    cal.add_argument("--days", action="store_true", help="one line per day instead of a month grid")
+    cal.add_argument("--json", action="store_true")
+
+    stats = commands.add_parser("stats", help="print notebook statistics")
+    stats.add_argument("--top", type=int, default=10)
+    stats.add_argument("--json", action="store_true")
+
+    export = commands.add_parser("export", help="export every note (.txt, .jsonl, .md or .csv)")
+    export.add_argument("paths", nargs="+")
+
+    commands.add_parser("backup", help="store a backup snapshot of the notes folder")
+    commands.add_parser("snapshots", help="list the backup snapshots, oldest first")
+
+    restore = commands.add_parser("restore", help="rebuild a backup snapshot in a folder of its own")
+    restore.add_argument("name", nargs="?", help="a snapshot as listed by snapshots (default: the latest)")
+    restore.add_argument("--to", metavar="DIR", help="where to rebuild it (default: restored/NAME)")
+
+    pack = commands.add_parser("pack", help="move old day files into compressed monthly or yearly archives")
+    pack.add_argument("--older-than", type=int, default=90, metavar="DAYS",
+                      help="pack months (or years) that ended more than DAYS ago")
+    pack.add_argument("--by", choices=("month", "year"), default="month")
+    pack.add_argument("--codec", choices=("xz", "zlib"), default="xz")
+
+    unpack = commands.add_parser("unpack", help="put an archive's day files back")
+    unpack.add_argument("name", help="YYYY-MM or YYYY")
+    unpack.add_argument("-c", "--category", choices=CATEGORIES)
+
+    serve = commands.add_parser("serve", help="share the notebook over an HTTP/JSON API")
+    serve.add_argument("--host", default="127.0.0.1", help="0.0.0.0 to accept other machines")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--verbose", action="store_true", help="log every request")
+
+    report = commands.add_parser("perf", help="show recorded latencies")
+    report.add_argument("--op", help="only this operation (search, stats, ...)")
+    report.add_argument("--last", type=int, default=perf.RING_SIZE, help="newest N samples")
+    return parser
+
+
+def print_stats(stats):
+    print(f"Total notes: {stats['total_notes']}")
+    print(f"Most used word: {stats['most_used'] or 'N/A'}")
+    print("Top words: " + (", ".join(f"{w} ({n})" for w, n in stats["top_words"]) or "N/A"))
+    for cat, n in stats["per_category"].items():
+        print(f"  {cat or 'notes'}: {n}")
+    print(f"Days with notes: {len(stats['per_day'])}")
+
+
+def print_calendar(days, first, last):
+    # a month grid per month in first..last, with each day's note count
+    import calendar
+    from smartnotes.dates import MONTHS
+    if not days:
+        print("No notes in that range.")
+        return
+    first = datetime.date.fromisoformat(max(first, min(days)))
+    last = datetime.date.fromisoformat(min(last, max(days)))
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        print(f"{MONTHS[month - 1].title()} {year}")
+        print("".join(f"{name:<7}" for name in ("Mo", "Tu", "We", "Th", "Fr", "Sa", "Su")).rstrip())
+        for week in calendar.monthcalendar(year, month):
+            cells = []
+            for day in week:
+                notes = days.get(f"{year:04d}-{month:02d}-{day:02d}", {}).get("notes")
+                cells.append(f"{day:>2} {notes or '':<4}" if day else " " * 7)
+            print("".join(cells).rstrip())
+        print()
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    print(f"{sum(d['notes'] for d in days.values())} notes, "
+          f"{sum(d['words'] for d in days.values())} words on {len(days)} days")
+
+
+def print_days(days):
+    for date, day in days.items():
+        cats = ", ".join(f"{cat or 'notes'} {n}" for cat, n in day["categories"].items())
+        print(f"{date}  {day['notes']:>4} notes  {day['words']:>6} words  ({cats})")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "perf":
+        print(perf.report(perf.load(last=args.last), args.op))
+        return
+    if args.perf:
+        perf.enable(args.perf)
+    if args.server and args.command != "serve":
+        from smartnotes.client import RemoteNotebook
+        if args.command in ("backup", "snapshots", "restore", "pack", "unpack"):
+            sys.exit(f"error: {args.command} runs on the server")
+        try:
+            notebook = RemoteNotebook(args.server)
+        except OSError as e:
+            sys.exit(f"error: can't reach {args.server}: {e}")
+    elif args.flat:
+        notebook = Notebook(args.notes_dir, [""], args.store, args.backup_dir, timestamps=False)
+    else:
+        notebook = Notebook(args.notes_dir, CATEGORIES, args.store, args.backup_dir)
+
+    try:
+        if args.command == "add":
+            category = None if args.flat else args.category or "personal"
+            texts = [line.rstrip("\n") for line in sys.stdin] if args.text == "-" else [args.text]
+            # one commit however many lines come in
+            path = notebook.add_notes([text for text in texts if text], category)
+            if path:
+                print(f"Saved to {path}")
+        elif args.command == "search":
+            categories = None if args.flat else args.category
+            try:
+                if args.rank:
+                    for score, rel, lineno, line in notebook.ranked(args.keyword, categories, args.date, args.k):
+                        print(f"{score:6.2f}  {rel}:{lineno}: {line}")
+                else:
+                    for rel, line in notebook.search(args.keyword, categories, args.date, args.scan):
+                        print(f"{rel}: {line}")
+            except ValueError as e:
+                sys.exit(f"error: {e}")
+        elif args.command == "similar":
+            rel, _, lineno = args.note.rpartition(":")
+            if not rel or not lineno.isdigit():
+                sys.exit(f"error: expected RELPATH:LINE, got {args.note!r}")
+            try:
+                results = notebook.similar(rel, int(lineno), args.k, None if args.flat else args.category)
+            except ValueError as e:
+                sys.exit(f"error: {e}")
+            for score, rel, lineno, line in results:
+                print(f"{score:6.2f}  {rel}:{lineno}: {line}")
+        elif args.command == "today":
+            for rel, line in notebook.today(None if args.flat else args.category):
+                print(f"{rel}: {line}")
+        elif args.command in ("show", "cal"):
+            from smartnotes.dates import parse_range
+            default = "today" if args.command == "show" else "this month"
+            try:
+                first, last = parse_range(" ".join(args.range) or default)
+            except ValueError as e:
+                sys.exit(f"error: {e}")
+            categories = None if args.flat else args.category
+            if args.command == "show":
+                for rel, line in notebook.days(first, last, categories):
+                    print(f"{rel}: {line}")
+            else:
+                days = notebook.rollup(first, last, categories)
+                if args.json:
+                    json.dump(days, sys.stdout, indent=2)
+                    print()
+                elif args.days:
+                    print_days(days)
+                else:
+                    print_calendar(days, first, last)
+        elif args.command == "stats":
+            stats = notebook.summary(top=args.top)
+            if args.json:
+                json.dump(stats, sys.stdout, indent=2)
+                print()
+            else:
+                print_stats(stats)
+        elif args.command == "export":
+            from smartnotes.export import format_for
+            notebook.export({path: format_for(path) for path in args.paths})
+            print(f"Exported to {', '.join(args.paths)}")
+        elif args.command == "serve":
+            from smartnotes.server import serve
+            print(f"Serving {args.notes_dir} on http://{args.host}:{args.port} (Ctrl+C to stop)")
+            try:
+                serve(notebook, args.host, args.port, args.verbose)
+            except KeyboardInterrupt:
+                pass
+        elif args.command == "backup":
+            print(f"Backup snapshot: {notebook.backup()}")
+        elif args.command == "snapshots":
+            for name in notebook.snapshots():
+                print(name)
+        elif args.command == "restore":
+            try:
+                dest = notebook.restore(args.name, args.to)
+            except ValueError as e:
+                sys.exit(f"error: {e}")
+            print(f"Restored to {dest}")
+        elif args.command == "pack":
+            paths = notebook.pack(args.older_than, args.by, args.codec)
+            print(f"Packed {len(paths)} day files")
+        elif args.command == "unpack":
+            try:
+                paths = notebook.unpack(args.name, None if args.flat else args.category)
+            except ValueError as e:
+                sys.exit(f"error: {e}")
+            print(f"Restored {len(paths)} day files")
+    finally:
+        notebook.close()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except BrokenPipeError:
+        # e.g. piped into head
+        sys.stderr.close()
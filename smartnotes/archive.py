@@ -0,0 +1,307 @@
+import contextlib
+import datetime
+import io
+import json
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+
+from smartnotes import perf
+from smartnotes.journal import replace_file
+
+# ---------------------------------------------------
+# Cold storage: old day files packed into archives
+# ---------------------------------------------------
+# pack() moves the day files of every month (or year) that ended more than
+# N days ago into one compressed file next to them, e.g.
+# notes/school/2025-03_notes.nar or notes/school/2025_notes.nar:
+#
+#   b"SNAR1\n"
+#   index length       4 bytes, little-endian
+#   index              JSON {"codec": "xz" | "zlib",
+#                            "members": {name: [offset, size, mtime_ns]}}
+#   body               the members back to back, compressed as one stream
+#
+# Listing an archive reads the index only. Members keep the mtime and
+# size their file had, so the caches see nothing change when a file is
+# packed. Readers go through note_files(), open_note() and stat_note(): a
+# day file that is not on disk is looked up in its month's archive, then
+# its year's; a file on disk always wins over an archived copy.
+# unpack() puts an archive's files back (to edit them, say).
+
+ARCHIVE_MAGIC = b"SNAR1\n"
+ARCHIVE_HEADER = struct.Struct("<I")
+ARCHIVE_RE = re.compile(r"^(\d{4}(?:-\d{2})?)_notes\.nar$")
+# a day file's name; smartnotes.index re-exports it for everything else
+DATE_RE = re.compile(r"(\d{4}-\d{2}-\d{2})_notes\.txt$")
+PERIODS = ("month", "year")
+CODECS = ("xz", "zlib")
+# decompressed archives kept in memory; readers go through a month's files in order
+CACHED_BODIES = 4
+
+_lock = threading.Lock()
+_indexes = {}
+_bodies = OrderedDict()
+
+
+class MemberStat:
+    # what stat_note() gives for an archived file
+    __slots__ = ("st_mtime_ns", "st_size", "st_mtime")
+
+    def __init__(self, mtime_ns, size):
+        self.st_mtime_ns = mtime_ns
+        self.st_size = size
+        self.st_mtime = mtime_ns / 1e9
+
+
+class ArchivedEntry:
+    # stands in for an os.DirEntry in note_files()
+    __slots__ = ("name", "path", "archive", "_stat")
+
+    def __init__(self, folder, name, archive, meta):
+        self.name = name
+        self.path = os.path.join(folder, name)
+        self.archive = archive
+        self._stat = MemberStat(meta[2], meta[1])
+
+    def is_file(self):
+        return True
+
+    def stat(self):
+        return self._stat
+
+
+class MemberFile(io.BytesIO):
+    def __init__(self, data, stat):
+        super().__init__(data)
+        self.stat = stat
+
+
+def fstat(f):
+    # os.fstat() for files from open_note()
+    return f.stat if isinstance(f, MemberFile) else os.fstat(f.fileno())
+
+
+# ---------------------------------------------------
+# Reading
+# ---------------------------------------------------
+def read_index(path):
+    # {"codec", "members", "body": offset of the body}; cached per mtime/size
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        hit = _indexes.get(path)
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    with open(path, "rb") as f:
+        if f.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            raise ValueError(f"{path} is not a notes archive")
+        (length,) = ARCHIVE_HEADER.unpack(f.read(ARCHIVE_HEADER.size))
+        index = json.loads(f.read(length))
+    index["body"] = len(ARCHIVE_MAGIC) + ARCHIVE_HEADER.size + length
+    index["key"] = (path, *key)
+    with _lock:
+        _indexes[path] = (key, index)
+    return index
+
+
+def read_body(path):
+    index = read_index(path)
+    key = index["key"]
+    with _lock:
+        body = _bodies.get(key)
+        if body is not None:
+            _bodies.move_to_end(key)
+            return body
+    with open(path, "rb") as f:
+        f.seek(index["body"])
+        packed = f.read()
+    perf.read(len(packed))
+    if index["codec"] == "xz":
+        import lzma
+        body = lzma.decompress(packed)
+    else:
+        import zlib
+        body = zlib.decompress(packed)
+    with _lock:
+        _bodies[key] = body
+        while len(_bodies) > CACHED_BODIES:
+            _bodies.popitem(last=False)
+    return body
+
+
+def read_member(path, name):
+    offset, size, mtime = read_index(path)["members"][name]
+    return read_body(path)[offset:offset + size]
+
+
+def find_member(path):
+    # day file path -> (archive path, member name), or None
+    folder, name = os.path.split(path)
+    m = DATE_RE.search(name)
+    if not m:
+        return None
+    for period in (m[1][:7], m[1][:4]):
+        archive = os.path.join(folder, f"{period}_notes.nar")
+        try:
+            members = read_index(archive)["members"]
+        except FileNotFoundError:
+            continue
+        if name in members:
+            return archive, name
+    return None
+
+
+def open_note(path):
+    # open(path, "rb"), falling back to the file's archived copy
+    try:
+        return open(path, "rb")
+    except FileNotFoundError:
+        found = find_member(path)
+        if found is None:
+            raise
+    return MemberFile(read_member(*found), stat_note(path))
+
+
+def stat_note(path):
+    # os.stat(path), falling back to the file's archived copy
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        found = find_member(path)
+        if found is None:
+            raise
+    meta = read_index(found[0])["members"][found[1]]
+    return MemberStat(meta[2], meta[1])
+
+
+def archived_files(folder, archives, present):
+    # ArchivedEntry for each member of the archives (names in folder) that
+    # is not in present; month archives before year archives
+    seen = set(present)
+    for name in sorted(archives, key=lambda n: (-len(n), n)):
+        archive = os.path.join(folder, name)
+        try:
+            members = read_index(archive)["members"]
+        except (OSError, ValueError):
+            continue
+        for member, meta in sorted(members.items()):
+            if member not in seen:
+                seen.add(member)
+                yield ArchivedEntry(folder, member, archive, meta)
+
+
+# ---------------------------------------------------
+# Packing
+# ---------------------------------------------------
+def write_archive(path, members, codec="xz"):
+    # members: {name: (data, mtime_ns)}
+    body = []
+    index = {}
+    offset = 0
+    for name in sorted(members):
+        data, mtime = members[name]
+        index[name] = [offset, len(data), mtime]
+        body.append(data)
+        offset += len(data)
+    body = b"".join(body)
+    if codec == "xz":
+        import lzma
+        packed = lzma.compress(body, preset=6)
+    else:
+        import zlib
+        packed = zlib.compress(body, 9)
+    header = json.dumps({"codec": codec, "members": index}, separators=(",", ":")).encode()
+    replace_file(path, ARCHIVE_MAGIC + ARCHIVE_HEADER.pack(len(header)) + header + packed)
+
+
+def period_end(key):
+    # "2025-03" -> "2025-03-31", "2025" -> "2025-12-31"
+    if len(key) == 4:
+        return f"{key}-12-31"
+    first = datetime.date(int(key[:4]), int(key[5:]), 1)
+    return ((first.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+            - datetime.timedelta(days=1)).isoformat()
+
+
+def pack(notes_dir, categories=("",), older_than=90, period="month", codec="xz", today=None,
+         lock=contextlib.nullcontext):
+    # Packs the day files of each month/year that ended more than
+    # older_than days ago; returns the paths of the files packed (they now
+    # read from the archive). Each month (or year) is packed inside lock(),
+    # which holds off writers to its files (Notebook passes its journal's
+    # exclusive()).
+    if period not in PERIODS:
+        raise ValueError(f"unknown period {period!r}, expected one of {', '.join(PERIODS)}")
+    if codec not in CODECS:
+        raise ValueError(f"unknown codec {codec!r}, expected one of {', '.join(CODECS)}")
+    cutoff = ((today or datetime.date.today()) - datetime.timedelta(days=older_than)).isoformat()
+    packed = []
+    for cat in categories:
+        folder = os.path.join(notes_dir, cat)
+        groups = {}
+        try:
+            names = os.listdir(folder)
+        except FileNotFoundError:
+            continue
+        for name in names:
+            m = DATE_RE.search(name)
+            if name.startswith(".") or not m:
+                continue
+            key = m[1][:7] if period == "month" else m[1][:4]
+            if period_end(key) < cutoff:
+                groups.setdefault(key, []).append(name)
+        for key, names in sorted(groups.items()):
+            with lock():
+                packed += _pack_group(folder, key, names, codec)
+    return packed
+
+
+def _pack_group(folder, key, names, codec):
+    archive = os.path.join(folder, f"{key}_notes.nar")
+    members = {}
+    if os.path.exists(archive):
+        for name, meta in read_index(archive)["members"].items():
+            members[name] = (read_member(archive, name), meta[2])
+    stats = {}
+    for name in names:
+        path = os.path.join(folder, name)
+        try:
+            with open(path, "rb") as f:
+                stats[name] = os.fstat(f.fileno())
+                members[name] = (f.read(), stats[name].st_mtime_ns)
+        except FileNotFoundError:
+            continue
+    write_archive(archive, members, codec)
+    packed = []
+    for name in stats:
+        path = os.path.join(folder, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        # changed by someone not holding the lock (another process) while
+        # we packed: the file on disk wins anyway
+        if (st.st_mtime_ns, st.st_size) != (stats[name].st_mtime_ns, stats[name].st_size):
+            continue
+        os.remove(path)
+        packed.append(path)
+    return packed
+
+
+def unpack(archive):
+    # Writes an archive's files back next to it (keeping their mtimes) and
+    # removes it; files already on disk are kept. Returns the paths written.
+    folder = os.path.dirname(archive)
+    written = []
+    for name, meta in sorted(read_index(archive)["members"].items()):
+        path = os.path.join(folder, name)
+        if os.path.exists(path):
+            continue
+        replace_file(path, read_member(archive, name))
+        os.utime(path, ns=(meta[2], meta[2]))
+        written.append(path)
+    os.remove(archive)
+    return written
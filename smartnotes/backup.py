@@ -0,0 +1,139 @@
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+
+from smartnotes import perf
+
+# ---------------------------------------------------
+# Incremental, content-addressed backups
+# ---------------------------------------------------
+# backups/objects/ab/abcd...   zlib-compressed file contents, keyed by sha256
+# backups/snapshots/<time>.json  {relpath: {"hash", "size", "mtime"}}
+#
+# A snapshot only hashes files whose mtime/size moved since the previous
+# snapshot, and a file body is stored once however many snapshots use it.
+
+BUFFER_SIZE = 64 * 1024
+COMPRESS_LEVEL = 6
+
+
+def walk_files(notes_dir):
+    # (relpath, path, stat) for every file under notes/, skipping dot-files
+    stack = [notes_dir]
+    while stack:
+        folder = stack.pop()
+        for entry in os.scandir(folder):
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir():
+                stack.append(entry.path)
+            elif entry.is_file():
+                rel = os.path.relpath(entry.path, notes_dir).replace(os.sep, "/")
+                yield rel, entry.path, entry.stat()
+
+
+class BackupStore:
+    def __init__(self, backup_dir="backups"):
+        self.backup_dir = backup_dir
+        self.objects_dir = os.path.join(backup_dir, "objects")
+        self.snapshots_dir = os.path.join(backup_dir, "snapshots")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+
+    def snapshots(self):
+        return sorted(f[:-5] for f in os.listdir(self.snapshots_dir) if f.endswith(".json"))
+
+    def manifest(self, name):
+        with open(os.path.join(self.snapshots_dir, f"{name}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    # ---------------------------------------------------
+    # Backup
+    # ---------------------------------------------------
+    def backup(self, notes_dir, progress=None):
+        names = self.snapshots()
+        previous = self.manifest(names[-1]) if names else {}
+
+        manifest = {}
+        changed = []
+        for rel, path, st in walk_files(notes_dir):
+            old = previous.get(rel)
+            if old and old["mtime"] == st.st_mtime_ns and old["size"] == st.st_size:
+                manifest[rel] = old
+            else:
+                changed.append((rel, path, st))
+
+        for done, (rel, path, st) in enumerate(changed, 1):
+            manifest[rel] = {"hash": self._store(path), "size": st.st_size,
+                             "mtime": st.st_mtime_ns}
+            if progress:
+                progress(done, len(changed))
+
+        if names and manifest == previous:
+            return names[-1]
+
+        name = datetime.datetime.now().strftime("%Y-%m-%dT%H-%M-%S-%f")
+        tmp = os.path.join(self.snapshots_dir, f".{name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, os.path.join(self.snapshots_dir, f"{name}.json"))
+        return name
+
+    def _store(self, path):
+        # hashed and compressed in the same read; the compressed copy is
+        # kept only if no object with that hash is stored yet; each call
+        # has a temp file of its own, so backups can run side by side
+        digest = hashlib.sha256()
+        compressor = zlib.compressobj(COMPRESS_LEVEL)
+        fd, tmp = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=self.objects_dir)
+        try:
+            with os.fdopen(fd, "wb") as out, open(path, "rb") as src:
+                for chunk in iter(lambda: src.read(BUFFER_SIZE), b""):
+                    digest.update(chunk)
+                    out.write(compressor.compress(chunk))
+                out.write(compressor.flush())
+                perf.read(src.tell())
+        except BaseException:
+            os.remove(tmp)
+            raise
+        digest = digest.hexdigest()
+
+        target = self.object_path(digest)
+        if os.path.exists(target):
+            os.remove(tmp)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp, target)
+        return digest
+
+    # ---------------------------------------------------
+    # Restore
+    # ---------------------------------------------------
+    def restore(self, name=None, dest=None):
+        # Rebuilds snapshot `name` (default: latest) under `dest`
+        # (default: restored/<name>); returns dest
+        names = self.snapshots()
+        if name is None:
+            if not names:
+                raise ValueError(f"no snapshots in {self.backup_dir}")
+            name = names[-1]
+        elif name not in names:
+            raise ValueError(f"no snapshot {name!r} in {self.backup_dir}")
+        if dest is None:
+            dest = os.path.join("restored", name)
+        for rel, meta in self.manifest(name).items():
+            target = os.path.join(dest, *rel.split("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            decompressor = zlib.decompressobj()
+            with open(self.object_path(meta["hash"]), "rb") as src, open(target, "wb") as out:
+                for chunk in iter(lambda: src.read(BUFFER_SIZE), b""):
+                    out.write(decompressor.decompress(chunk))
+                out.write(decompressor.flush())
+        return dest
+
@@ -0,0 +1,767 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from smartnotes import perf
+from smartnotes.core import CATEGORIES
+from smartnotes.journal import Conflict
+
+# ---------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------
+#   python -m smartnotes.bench run --sizes 1000,10000,100000 --out results.json
+#   python -m smartnotes.bench compare old.json new.json
+#   python -m smartnotes.bench startup
+#   python -m smartnotes.bench load --notes 10000 --clients 8 --seconds 10
+#
+# "run" generates a reproducible synthetic notebook per size (notes spread
+# over the four categories and several years of day files), then times
+# every operation in a fresh interpreter so each one starts from the
+# state on disk and reports its own peak RSS. The original full-scan code
+# paths run next to the indexed/cached ones ("search.scan" vs
+# "search.index.warm" ...). Results are JSON so runs from two commits can
+# be compared.
+#
+# "startup" times CLI commands in fresh interpreters against an empty
+# notebook and fails (exit status 1) when the median is over budget or a
+# command pulled in a module the CLI is meant to import lazily.
+#
+# "load" starts a notes server on a copy of a synthetic notebook (or uses
+# --url) and has N clients send it a mix of requests back to back for a
+# while, then reports throughput and p50/p99 latency per request type.
+
+STARTUP_BUDGET_MS = 100
+STARTUP_RUNS = 7
+STARTUP_COMMANDS = [["--help"], ["add", "benchmark note"], ["today"], ["stats"]]
+# too slow to import for commands that do not need them
+LAZY_MODULES = ["tkinter", "zipfile", "sqlite3", "multiprocessing", "smartnotes.backup"]
+# so the commands can run from a scratch directory
+ENV = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# corpus shape; the last day is fixed so runs on different days match
+CORPUS_END = datetime.date(2026, 1, 1)
+CORPUS_YEARS = 3
+VOCABULARY = 5000
+KEYWORD = "meeting"
+REGRESSION_RATIO = 1.25
+# request type: weight, for "load"
+LOAD_MIX = "add:2,search:4,rank:1,today:2,stats:1,edit:1"
+LOAD_OPS = ("add", "search", "rank", "today", "stats", "edit")
+
+
+# ---------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------
+def vocabulary(rng, size=VOCABULARY):
+    # pronounceable made-up words, plus a few real ones to search for
+    syllables = [c + v for c in "bcdfghklmnprstvz" for v in "aeiou"]
+    words = {"".join(rng.choices(syllables, k=rng.randint(1, 4))) for _ in range(size * 2)}
+    words = sorted(words)[:size - 8]
+    rng.shuffle(words)
+    return ["the", "and", "todo", "idea", "exam", "call", "buy", KEYWORD] + words
+
+
+def make_corpus(notes_dir, notes, seed=0, years=CORPUS_YEARS, categories=CATEGORIES):
+    # Writes `notes` notes under notes_dir/<category>/<date>_notes.txt.
+    # The same arguments always produce the same bytes; an existing corpus
+    # with the same parameters is reused.
+    params = {"notes": notes, "seed": seed, "years": years, "categories": list(categories)}
+    marker = os.path.join(notes_dir, ".corpus.json")
+    try:
+        with open(marker, "r", encoding="utf-8") as f:
+            if json.load(f) == params:
+                return notes_dir
+    except (OSError, ValueError):
+        pass
+    shutil.rmtree(notes_dir, ignore_errors=True)
+
+    rng = random.Random(seed)
+    words = vocabulary(rng)
+    # Zipf-like: a few words are everywhere, most are rare
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    cum_weights = [0.0] * len(words)
+    total = 0.0
+    for i, w in enumerate(weights):
+        total += w
+        cum_weights[i] = total
+
+    days = [CORPUS_END - datetime.timedelta(days=d) for d in range(years * 365)]
+    files = [(cat, day) for cat in categories for day in days]
+    counts = [0] * len(files)
+    for _ in range(notes):
+        counts[rng.randrange(len(files))] += 1
+
+    for cat in categories:
+        os.makedirs(os.path.join(notes_dir, cat), exist_ok=True)
+    for (cat, day), n in zip(files, counts):
+        if not n:
+            continue
+        lines = []
+        for minute in sorted(rng.randrange(1440) for _ in range(n)):
+            text = " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(3, 15)))
+            if rng.random() < 0.1:
+                text += " #" + rng.choice(words)
+            lines.append(f"[{minute // 60:02d}:{minute % 60:02d}] {text}\n")
+        with open(os.path.join(notes_dir, cat, f"{day.isoformat()}_notes.txt"), "w", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+    return notes_dir
+
+
+# ---------------------------------------------------
+# Operations
+# ---------------------------------------------------
+# Each runs in its own interpreter: op(ctx) -> a small result (a count)
+# that is also a sanity check across implementations. PREPARE[name] runs
+# in the parent first to set up (or remove) the caches it measures.
+def note_paths(notes_dir):
+    for cat in CATEGORIES:
+        folder = os.path.join(notes_dir, cat)
+        for file in os.listdir(folder):
+            if file.endswith(".txt"):
+                yield cat, file, os.path.join(folder, file)
+
+
+def op_search_scan(ctx):
+    # the original search_notes loop
+    results = ""
+    for cat, file, path in note_paths(ctx["notes"]):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if KEYWORD.lower() in line.lower():
+                    results += f"{cat}/{file}: {line}"
+    return results.count("\n")
+
+
+def op_search_grep(ctx):
+    from smartnotes.grep import grep_notes
+    return sum(1 for _ in grep_notes(ctx["notes"], KEYWORD, CATEGORIES))
+
+
+def op_search_index(ctx):
+    from smartnotes.index import NoteIndex
+    return len(NoteIndex(ctx["notes"]).search(KEYWORD, CATEGORIES))
+
+
+def op_search_sqlite(ctx):
+    from smartnotes.sqlite_store import SQLiteStore
+    db = SQLiteStore(ctx["db"])
+    found = len(db.search(KEYWORD, CATEGORIES))
+    db.close()
+    return found
+
+
+def op_search_rank(ctx):
+    # load (or build) the BM25 index, then ten ranked queries
+    from smartnotes.rank import RankIndex
+    ranks = RankIndex(ctx["notes"])
+    return sum(len(ranks.search(f"{KEYWORD} {word}", 20)) for word in ("the", "todo", "idea", "exam", "call",
+                                                                        "buy", "and", "the idea", "call exam", KEYWORD))
+
+
+MONTH = ("2025-12-01", "2025-12-31")
+
+
+def op_month_scan(ctx):
+    # the original today_notes loop, for every day of a month
+    notes = 0
+    for cat in CATEGORIES:
+        folder = os.path.join(ctx["notes"], cat)
+        for file in sorted(os.listdir(folder)):
+            if MONTH[0] <= file[:10] <= MONTH[1] and file.endswith("_notes.txt"):
+                with open(os.path.join(folder, file), "r", encoding="utf-8") as f:
+                    notes += len(f.readlines())
+    return notes
+
+
+def op_month_dates(ctx):
+    from smartnotes.dates import DateIndex
+    notes = 0
+    for day, cat, rel, size in DateIndex(ctx["notes"], CATEGORIES).days(*MONTH):
+        with open(os.path.join(ctx["notes"], rel), "r", encoding="utf-8") as f:
+            notes += len(f.readlines())
+    return notes
+
+
+def op_stats_scan(ctx):
+    # the original show_stats loop
+    total_notes = 0
+    word_count = {}
+    for cat, file, path in note_paths(ctx["notes"]):
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+            total_notes += len(lines)
+            for line in lines:
+                for word in line.split():
+                    word = word.strip("#.,!?").lower()
+                    if word:
+                        word_count[word] = word_count.get(word, 0) + 1
+    max(word_count, key=word_count.get)
+    return total_notes
+
+
+def op_stats_cache(ctx):
+    from smartnotes.stats import NoteStats
+    return NoteStats(ctx["notes"]).summary(CATEGORIES)["total_notes"]
+
+
+def op_stats_sqlite(ctx):
+    from smartnotes.sqlite_store import SQLiteStore
+    db = SQLiteStore(ctx["db"])
+    total = db.stats(CATEGORIES)["total_notes"]
+    db.close()
+    return total
+
+
+def op_export_scan(ctx):
+    # the original export_all: the whole export built in one string
+    all_notes = ""
+    for cat, file, path in note_paths(ctx["notes"]):
+        with open(path, "r", encoding="utf-8") as f:
+            all_notes += f"--- {cat}/{file} ---\n"
+            all_notes += f.read() + "\n\n"
+    with open(os.path.join(ctx["work"], "export-scan.txt"), "w", encoding="utf-8") as f:
+        f.write(all_notes)
+    return len(all_notes)
+
+
+def op_export(fmt):
+    def run(ctx):
+        from smartnotes.export import export_notes
+        target = os.path.join(ctx["work"], f"export.{fmt}")
+        export_notes(ctx["notes"], {target: fmt}, CATEGORIES)
+        return os.path.getsize(target)
+    return run
+
+
+def op_backup_zip(ctx):
+    # the original exit_app backup: every file into a new zip
+    import zipfile
+    target = os.path.join(ctx["work"], "backup.zip")
+    with zipfile.ZipFile(target, "w") as zipf:
+        for cat, file, path in note_paths(ctx["notes"]):
+            zipf.write(path)
+    return os.path.getsize(target)
+
+
+def op_backup(ctx):
+    from smartnotes.backup import BackupStore
+    store = BackupStore(ctx["backups"])
+    return len(store.manifest(store.backup(ctx["notes"])))
+
+
+def tk_root():
+    import tkinter as tk
+    root = tk.Tk()
+    root.withdraw()
+    return root
+
+
+def op_gradient_lines(ctx):
+    # the original draw_gradient: one canvas line per pixel row
+    import tkinter as tk
+    root = tk_root()
+    canvas = tk.Canvas(root, width=650, height=750)
+    r1, g1, b1 = (c >> 8 for c in root.winfo_rgb("#ffcfcf"))
+    r2, g2, b2 = (c >> 8 for c in root.winfo_rgb("#ffffff"))
+    for _ in range(ctx["redraws"]):
+        canvas.delete("gradient")
+        for i in range(750):
+            r = int(r1 + (r2 - r1) * i / 750)
+            g = int(g1 + (g2 - g1) * i / 750)
+            b = int(b1 + (b2 - b1) * i / 750)
+            canvas.create_line(0, i, 650, i, tags=("gradient",), fill=f"#{r:02x}{g:02x}{b:02x}")
+        root.update_idletasks()
+    root.destroy()
+    return ctx["redraws"]
+
+
+def op_gradient_image(ctx):
+    import tkinter as tk
+    from smartnotes import gradient
+    root = tk_root()
+    canvas = tk.Canvas(root, width=650, height=750)
+    item = canvas.create_image(0, 0, anchor="nw")
+    for i in range(ctx["redraws"]):
+        # a new size every time, so the cache never answers
+        canvas.itemconfigure(item, image=gradient.gradient_image(canvas, 650 + i, 750, "#ffcfcf", "#ffffff"))
+        root.update_idletasks()
+    root.destroy()
+    return ctx["redraws"]
+
+
+OPS = {
+    "search.scan": op_search_scan,
+    "search.grep": op_search_grep,
+    "search.index.cold": op_search_index,
+    "search.index.warm": op_search_index,
+    "search.sqlite": op_search_sqlite,
+    "search.rank.cold": op_search_rank,
+    "search.rank.warm": op_search_rank,
+    "month.scan": op_month_scan,
+    "month.dates.cold": op_month_dates,
+    "month.dates.warm": op_month_dates,
+    "stats.scan": op_stats_scan,
+    "stats.cache.cold": op_stats_cache,
+    "stats.cache.warm": op_stats_cache,
+    "stats.sqlite": op_stats_sqlite,
+    "export.scan": op_export_scan,
+    "export.txt": op_export("txt"),
+    "export.jsonl": op_export("jsonl"),
+    "backup.zip": op_backup_zip,
+    "backup.full": op_backup,
+    "backup.incremental": op_backup,
+    "gradient.lines": op_gradient_lines,
+    "gradient.image": op_gradient_image,
+}
+
+
+def remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def build_index(ctx):
+    from smartnotes.index import NoteIndex
+    NoteIndex(ctx["notes"]).save()
+
+
+def build_ranks(ctx):
+    from smartnotes.rank import RankIndex
+    RankIndex(ctx["notes"]).save()
+
+
+def build_stats(ctx):
+    from smartnotes.stats import NoteStats
+    NoteStats(ctx["notes"]).save()
+
+
+def build_dates(ctx):
+    from smartnotes.dates import DateIndex
+    DateIndex(ctx["notes"], CATEGORIES).save()
+
+
+def build_db(ctx):
+    from smartnotes.sqlite_store import SQLiteStore
+    if not os.path.exists(ctx["db"]):
+        db = SQLiteStore(ctx["db"])
+        db.import_tree(ctx["notes"], CATEGORIES)
+        db.close()
+
+
+def build_backup(ctx):
+    from smartnotes.backup import BackupStore
+    if not os.path.isdir(os.path.join(ctx["backups"], "snapshots")):
+        BackupStore(ctx["backups"]).backup(ctx["notes"])
+
+
+PREPARE = {
+    "search.index.cold": lambda ctx: remove(os.path.join(ctx["notes"], ".index.json")),
+    "search.index.warm": build_index,
+    "search.sqlite": build_db,
+    "search.rank.cold": lambda ctx: remove(os.path.join(ctx["notes"], ".rank.bin")),
+    "search.rank.warm": build_ranks,
+    "month.dates.cold": lambda ctx: remove(os.path.join(ctx["notes"], ".dates.json")),
+    "month.dates.warm": build_dates,
+    "stats.cache.cold": lambda ctx: remove(os.path.join(ctx["notes"], ".stats.json")),
+    "stats.cache.warm": build_stats,
+    "stats.sqlite": build_db,
+    "backup.full": lambda ctx: remove(ctx["backups"]),
+    "backup.incremental": build_backup,
+}
+
+
+def peak_rss_kb():
+    # VmHWM where there is /proc: ru_maxrss on Linux carries the parent's
+    # peak over fork, which would hide the operation's own
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_op(name, ctx):
+    # in the child: time one operation and report it as JSON on stdout
+    func = OPS[name]
+    start = time.perf_counter()
+    try:
+        result = func(ctx)
+    except Exception as e:
+        # e.g. no display for the Tk operations
+        print(json.dumps({"skipped": f"{type(e).__name__}: {e}"}))
+        return
+    seconds = time.perf_counter() - start
+    print(json.dumps({"seconds": seconds, "peak_rss_kb": peak_rss_kb(), "result": result}))
+
+
+def measure(name, ctx, repeat):
+    # in the parent: prepare, then run the operation `repeat` times
+    runs = []
+    for _ in range(repeat):
+        if name in PREPARE:
+            PREPARE[name](ctx)
+        out = subprocess.run([sys.executable, "-m", "smartnotes.bench", "op", name, json.dumps(ctx)],
+                             env=ENV, check=True, stdout=subprocess.PIPE, text=True).stdout
+        run = json.loads(out.splitlines()[-1])
+        if "skipped" in run:
+            return run
+        runs.append(run)
+    return {"seconds": statistics.median(r["seconds"] for r in runs),
+            "min_seconds": min(r["seconds"] for r in runs),
+            "peak_rss_kb": max((r["peak_rss_kb"] or 0) for r in runs) or None,
+            "result": runs[-1]["result"]}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], check=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_run(sizes, ops, corpus_dir, repeat=3, seed=0, redraws=20):
+    report = {"commit": git_commit(), "python": platform.python_version(),
+              "platform": platform.platform(), "cpus": os.cpu_count(),
+              "created": datetime.datetime.now().isoformat(timespec="seconds"),
+              "seed": seed, "repeat": repeat, "results": []}
+    # empty interpreter, to read the RSS figures against
+    base = subprocess.run([sys.executable, "-c", "from smartnotes.bench import peak_rss_kb; print(peak_rss_kb())"],
+                          env=ENV, check=True, stdout=subprocess.PIPE, text=True)
+    report["baseline_rss_kb"] = json.loads(base.stdout)
+
+    print(f"baseline: {report['baseline_rss_kb']} KiB peak RSS for an idle interpreter")
+    for size in sizes:
+        work = os.path.join(corpus_dir, f"work-{size}-{seed}")
+        os.makedirs(work, exist_ok=True)
+        start = time.perf_counter()
+        notes = make_corpus(os.path.join(corpus_dir, f"notes-{size}-{seed}"), size, seed)
+        print(f"corpus: {size} notes ({time.perf_counter() - start:.1f} s)")
+        ctx = {"notes": notes, "work": work, "db": os.path.join(work, "notebook.db"),
+               "backups": os.path.join(work, "backups"), "redraws": redraws}
+        for name in ops:
+            result = measure(name, ctx, repeat)
+            result.update(op=name, notes=size)
+            report["results"].append(result)
+            if "skipped" in result:
+                print(f"  {name:<20} skipped ({result['skipped']})")
+            else:
+                rss = f"{result['peak_rss_kb'] / 1024:8.1f} MiB" if result["peak_rss_kb"] else ""
+                print(f"  {name:<20} {result['seconds'] * 1000:10.1f} ms {rss}")
+    return report
+
+
+def compare(old, new, threshold=REGRESSION_RATIO):
+    # Prints new/old time per (size, operation); False if anything got
+    # slower than `threshold`
+    before = {(r["notes"], r["op"]): r for r in old["results"] if "seconds" in r}
+    ok = True
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    for r in new["results"]:
+        prev = before.get((r["notes"], r["op"]))
+        if prev is None or "seconds" not in r:
+            continue
+        ratio = r["seconds"] / prev["seconds"] if prev["seconds"] else float("inf")
+        flag = "  SLOWER" if ratio > threshold else ""
+        ok = ok and not flag
+        print(f"{r['notes']:>9} {r['op']:<20} {prev['seconds'] * 1000:10.1f} ms "
+              f"{r['seconds'] * 1000:10.1f} ms  x{ratio:.2f}{flag}")
+    return ok
+
+
+# ---------------------------------------------------
+# CLI startup
+# ---------------------------------------------------
+def time_command(cmd, cwd, runs=STARTUP_RUNS):
+    # median wall time of a command, in ms
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=cwd, env=ENV, stdout=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def imported_modules(args, cwd):
+    # modules from LAZY_MODULES that `python -m smartnotes <args>` imported
+    code = ("import runpy, sys\n"
+            f"sys.argv = ['smartnotes'] + {list(args)!r}\n"
+            "try:\n"
+            "    runpy.run_module('smartnotes', run_name='__main__')\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            f"print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules), file=sys.stderr)\n")
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=ENV, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return result.stderr.split()
+
+
+def bench_startup(budget_ms=STARTUP_BUDGET_MS):
+    ok = True
+    with tempfile.TemporaryDirectory() as cwd:
+        # the bare interpreter, for reference
+        ms = time_command([sys.executable, "-c", "pass"], cwd)
+        print(f"{'(python -c pass)':<28} {ms:7.1f} ms")
+        for args in STARTUP_COMMANDS:
+            ms = time_command([sys.executable, "-m", "smartnotes", *args], cwd)
+            heavy = imported_modules(args, cwd)
+            status = "ok" if ms <= budget_ms and not heavy else "FAIL"
+            ok = ok and status == "ok"
+            extra = f"  imported {', '.join(heavy)}" if heavy else ""
+            print(f"{' '.join(args):<28} {ms:7.1f} ms  {status}{extra}")
+    print(f"budget {budget_ms} ms")
+    return ok
+
+
+# ---------------------------------------------------
+# Server load
+# ---------------------------------------------------
+def load_ops(notebook, rng, state):
+    # request type -> a function sending one; returns False for a refused
+    # (conflicting) edit
+    words = ["todo", "idea", "exam", "call", KEYWORD]
+
+    def add():
+        state["path"] = notebook.add(f"load test {rng.choice(words)} {rng.random():.6f}",
+                                     rng.choice(notebook.categories))
+
+    def edit():
+        path = state.get("path") or notebook.add("load test edit", notebook.categories[0])
+        text, version = notebook.read_file(path)
+        try:
+            notebook.edit_file(path, text + f"edited {rng.random():.6f}\n", version)
+        except Conflict:
+            return False
+
+    return {"add": add,
+            "search": lambda: notebook.search(rng.choice(words)),
+            "rank": lambda: notebook.ranked(" ".join(rng.sample(words, 2)), k=10),
+            "today": lambda: notebook.today(),
+            "stats": lambda: notebook.summary(),
+            "edit": edit}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(notes_dir, store, port, timeout=60):
+    # a `python -m smartnotes serve` process, once it answers
+    from smartnotes.client import RemoteNotebook
+    proc = subprocess.Popen([sys.executable, "-m", "smartnotes", "--notes-dir", notes_dir, "--store", store,
+                             "serve", "--port", str(port)], env=ENV, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            RemoteNotebook(f"127.0.0.1:{port}").close()
+            return proc
+        except OSError:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                proc.kill()
+                raise RuntimeError("the notes server did not start")
+            time.sleep(0.1)
+
+
+def load_client(url, mix, seconds, seed, records):
+    from smartnotes.client import RemoteNotebook
+    notebook = RemoteNotebook(url)
+    rng = random.Random(seed)
+    ops = load_ops(notebook, rng, {})
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    deadline = time.perf_counter() + seconds
+    try:
+        while True:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            if start >= deadline:
+                break
+            try:
+                status = "conflict" if ops[name]() is False else "ok"
+            except Exception as e:
+                status = f"{type(e).__name__}: {e}"
+            records.append((name, (time.perf_counter() - start) * 1000, status))
+    finally:
+        notebook.close()
+
+
+def load_report(records, seconds, clients):
+    report = {"clients": clients, "seconds": seconds, "requests": len(records),
+              "throughput": len(records) / seconds, "ops": {}}
+    by_op = {}
+    for name, ms, status in records:
+        by_op.setdefault(name, []).append((ms, status))
+    for name, rs in sorted(by_op.items()) + [("all", [(ms, status) for _, ms, status in records])]:
+        ms = sorted(m for m, _ in rs)
+        report["ops"][name] = {"count": len(rs), "throughput": len(rs) / seconds,
+                               "p50": perf.percentile(ms, 50), "p99": perf.percentile(ms, 99),
+                               "max": ms[-1] if ms else 0.0,
+                               "conflicts": sum(1 for _, s in rs if s == "conflict"),
+                               "errors": sum(1 for _, s in rs if s not in ("ok", "conflict"))}
+    return report
+
+
+def bench_load(notes, clients, seconds, mix, corpus_dir, store="files", url=None, seed=0):
+    # Closed loop: every client sends its next request as soon as the last
+    # one is answered, so throughput is what the server keeps up with
+    proc = work = None
+    if url is None:
+        corpus = make_corpus(os.path.join(corpus_dir, f"notes-{notes}-{seed}"), notes, seed)
+        work = tempfile.mkdtemp(prefix="load-", dir=corpus_dir)
+        shutil.copytree(corpus, os.path.join(work, "notes"))
+        port = free_port()
+        proc = start_server(os.path.join(work, "notes"), store, port)
+        url = f"127.0.0.1:{port}"
+    try:
+        # one of each first, so the caches the server builds are not timed
+        from smartnotes.client import RemoteNotebook
+        notebook = RemoteNotebook(url)
+        ops = load_ops(notebook, random.Random(seed), {})
+        for name in mix:
+            ops[name]()
+        notebook.close()
+        records = []
+        threads = [threading.Thread(target=load_client, args=(url, mix, seconds, seed + i + 1, records))
+                   for i in range(clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        if work is not None:
+            shutil.rmtree(work, ignore_errors=True)
+    report = load_report(records, seconds, clients)
+    report.update(notes=notes, store=store, mix=mix, commit=git_commit(), cpus=os.cpu_count())
+    print(f"{clients} clients, {seconds} s, {notes} notes, store {store}")
+    for name, r in report["ops"].items():
+        extra = f"  {r['conflicts']} conflicts" if r["conflicts"] else ""
+        extra += f"  {r['errors']} errors" if r["errors"] else ""
+        print(f"  {name:<8} {r['count']:7d} req {r['throughput']:8.1f} req/s  p50 {r['p50']:7.1f} ms  "
+              f"p99 {r['p99']:7.1f} ms  max {r['max']:7.1f} ms{extra}")
+    errors = [status for _, _, status in records if status not in ("ok", "conflict")]
+    if errors:
+        print(f"first error: {errors[0]}")
+    return report
+
+
+def parse_mix(text):
+    # "add:2,search:4" -> {"add": 2, "search": 4}
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition(":")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m smartnotes.bench")
+    commands = parser.add_subparsers(dest="command")
+
+    run = commands.add_parser("run", help="time operations on synthetic notebooks")
+    run.add_argument("--sizes", default="1000,10000",
+                     help="comma-separated note counts, e.g. 1000,10000,100000,1000000")
+    run.add_argument("--ops", default=",".join(OPS),
+                     help="comma-separated operations (default: all); a prefix such as 'search' works")
+    run.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "smartnotes-bench"),
+                     help="where corpora are generated and kept for reuse")
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--redraws", type=int, default=20, help="gradient redraws per run")
+    run.add_argument("--out", help="write results as JSON here")
+
+    corpus = commands.add_parser("corpus", help="only generate a synthetic notebook")
+    corpus.add_argument("notes_dir")
+    corpus.add_argument("notes", type=int)
+    corpus.add_argument("--seed", type=int, default=0)
+
+    cmp_ = commands.add_parser("compare", help="compare two result files")
+    cmp_.add_argument("old")
+    cmp_.add_argument("new")
+    cmp_.add_argument("--threshold", type=float, default=REGRESSION_RATIO)
+
+    commands.add_parser("startup", help="check CLI startup time")
+
+    load = commands.add_parser("load", help="throughput and latency of a notes server under load")
+    load.add_argument("--notes", type=int, default=10000, help="size of the synthetic notebook served")
+    load.add_argument("--clients", type=int, default=8)
+    load.add_argument("--seconds", type=float, default=10)
+    load.add_argument("--mix", default=LOAD_MIX, help=f"request types and weights (default {LOAD_MIX})")
+    load.add_argument("--store", choices=("files", "sqlite"), default="files")
+    load.add_argument("--url", help="load this running server instead (it gets the adds and edits)")
+    load.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "smartnotes-bench"))
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--out", help="write results as JSON here")
+
+    op = commands.add_parser("op")  # internal: one measured run
+    op.add_argument("name", choices=OPS)
+    op.add_argument("ctx")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        wanted = args.ops.split(",")
+        ops = [name for name in OPS if any(name == w or name.startswith(w + ".") for w in wanted)]
+        sizes = [int(s) for s in args.sizes.split(",")]
+        report = bench_run(sizes, ops, args.corpus_dir, args.repeat, args.seed, args.redraws)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=1)
+        return 0
+    if args.command == "corpus":
+        make_corpus(args.notes_dir, args.notes, args.seed)
+        return 0
+    if args.command == "compare":
+        with open(args.old, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, "r", encoding="utf-8") as f:
+            new = json.load(f)
+        return 0 if compare(old, new, args.threshold) else 1
+    if args.command == "load":
+        mix = parse_mix(args.mix)
+        unknown = sorted(set(mix) - set(LOAD_OPS))
+        if unknown:
+            parser.error(f"unknown request types: {', '.join(unknown)}")
+        report = bench_load(args.notes, args.clients, args.seconds, mix, args.corpus_dir,
+                            args.store, args.url, args.seed)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=1)
+        return 1 if any(r["errors"] for r in report["ops"].values()) else 0
+    if args.command == "op":
+        run_op(args.name, json.loads(args.ctx))
+        return 0
+    return 0 if bench_startup() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+import http.client
+import json
+import os
+import select
+import shutil
+import threading
+from urllib.parse import urlencode, urlsplit
+
+from smartnotes.journal import Conflict
+from smartnotes.notecache import NoteFile
+
+# ---------------------------------------------------
+# Client for the notes server
+# ---------------------------------------------------
+# RemoteNotebook has the Notebook methods the apps use and sends each one
+# to a server started with `python -m smartnotes serve`. Every thread
+# keeps its own keep-alive connection. One the server closed while it sat
+# idle is noticed and reopened before a request goes out; a request that
+# fails after it was sent is tried again only if that can't apply it
+# twice (reads, and edits made against a version). Server errors come back
+# as ValueError (400), FileNotFoundError (404) or Conflict (409, an edit
+# made on a version of the file that was changed since).
+#
+#   notebook = RemoteNotebook("http://127.0.0.1:8765")
+#   notebook.add("buy milk", "personal")
+
+TIMEOUT = 30
+
+
+class RemoteNotebook:
+    store = None
+    db = None
+
+    def __init__(self, url, notes_dir="notes", timeout=TIMEOUT):
+        parts = urlsplit(url if "//" in url else f"http://{url}")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        # paths handed in and out look like local ones (notes/<category>/...)
+        self.notes_dir = notes_dir
+        self.local = threading.local()
+        self.categories = self.request("GET", "/api/health")["categories"]
+
+    # ---------------------------------------------------
+    # HTTP
+    # ---------------------------------------------------
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None and conn.sock is not None and select.select([conn.sock], [], [], 0)[0]:
+            # an idle connection has nothing to read unless the server closed it
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def send(self, method, path, params=None, body=None):
+        # -> the response, its body still to be read
+        if params:
+            path += "?" + urlencode({k: v for k, v in params.items() if v not in (None, "", False)},
+                                    doseq=True)
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload else {}
+        # an add sent twice would be saved twice; an edit with a version
+        # can't be, the second try gets a Conflict
+        repeatable = method == "GET" or (method == "PUT" and (body or {}).get("version") is not None)
+        for attempt in (1, 2):
+            conn = self.connection()
+            sent = False
+            try:
+                conn.request(method, path, payload, headers)
+                sent = True
+                return conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # a kept-alive connection the server dropped; try a fresh one
+                conn.close()
+                self.local.conn = None
+                if attempt == 2 or (sent and not repeatable):
+                    raise
+
+    def request(self, method, path, params=None, body=None):
+        response = self.send(method, path, params, body)
+        data = json.loads(response.read() or b"{}")
+        if response.status == 409:
+            raise Conflict(data.get("error", "conflict"))
+        if response.status == 404:
+            raise FileNotFoundError(data.get("error", path))
+        if response.status >= 400:
+            raise ValueError(data.get("error", f"HTTP {response.status}"))
+        return data
+
+    def rel(self, path):
+        return os.path.relpath(path, self.notes_dir).replace(os.sep, "/")
+
+    # ---------------------------------------------------
+    # Notebook methods
+    # ---------------------------------------------------
+    def add(self, text, category=None, when=None):
+        return self.add_notes([text], category, when)
+
+    def add_notes(self, texts, category=None, when=None):
+        texts = list(texts)
+        if not texts:
+            return None
+        body = {"texts": texts, "category": category, "when": when.isoformat() if when else None}
+        return os.path.join(self.notes_dir, self.request("POST", "/api/notes", body=body)["path"])
+
+    def search(self, keyword, categories=None, date=None, scan=False):
+        params = {"q": keyword, "category": categories, "date": date, "scan": scan and 1}
+        return [tuple(r) for r in self.request("GET", "/api/search", params)["results"]]
+
+    def ranked(self, text, categories=None, date=None, k=20):
+        params = {"q": text, "category": categories, "date": date, "rank": 1, "k": k}
+        return [tuple(r) for r in self.request("GET", "/api/search", params)["results"]]
+
+    def similar(self, rel, lineno, k=10, categories=None):
+        params = {"path": rel, "line": lineno, "k": k, "category": categories}
+        return [tuple(r) for r in self.request("GET", "/api/similar", params)["results"]]
+
+    def today(self, categories=None):
+        return [tuple(r) for r in self.request("GET", "/api/today", {"category": categories})["results"]]
+
+    def days(self, first, last, categories=None):
+        params = {"from": first, "to": last, "category": categories}
+        return [tuple(r) for r in self.request("GET", "/api/days", params)["results"]]
+
+    def rollup(self, first, last, categories=None):
+        params = {"from": first, "to": last, "category": categories}
+        return self.request("GET", "/api/calendar", params)["days"]
+
+    def summary(self, categories=None, top=10):
+        return self.request("GET", "/api/stats", {"category": categories, "top": top})
+
+    def export(self, targets, categories=None, progress=None):
+        # targets: {path: format}; each is downloaded from the server
+        for done, (path, fmt) in enumerate(targets.items(), 1):
+            response = self.send("GET", "/api/export", {"format": fmt, "category": categories})
+            if response.status != 200:
+                raise ValueError(json.loads(response.read() or b"{}").get("error", f"HTTP {response.status}"))
+            with open(path, "wb") as out:
+                shutil.copyfileobj(response, out)
+            if progress:
+                progress(done, len(targets))
+
+    def list_files(self, category):
+        return self.request("GET", "/api/files", {"category": category})["files"]
+
+    def read_file(self, path):
+        data = self.request("GET", "/api/file", {"path": self.rel(path)})
+        return data["text"], data["version"]
+
+    def edit_file(self, path, text, version=None):
+        body = {"path": self.rel(path), "text": text, "version": version}
+        return self.request("PUT", "/api/file", body=body)["version"]
+
+    def note_file(self, path):
+        # the file as read now, with the server's version of it
+        text, version = self.read_file(path)
+        return NoteFile(path, None, text.encode("utf-8"), version)
+
+    # a file comes whole over HTTP, so there is nothing to page
+    open_lines = note_file
+
+    def edit_line(self, path, i, text, version=None):
+        # only the line is sent; the server swaps it in
+        body = {"path": self.rel(path), "line": i, "text": text, "version": version}
+        return self.request("PUT", "/api/line", body=body)["version"]
+
+    def delete_line(self, path, i, version=None):
+        body = {"path": self.rel(path), "line": i, "version": version}
+        return self.request("PUT", "/api/line", body=body)["version"]
+
+    def update_file(self, path):
+        # the server keeps its own caches
+        pass
+
+    def save(self):
+        pass
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
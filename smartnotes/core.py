@@ -0,0 +1,519 @@
+import datetime
+import os
+import threading
+
+from smartnotes import perf
+from smartnotes.index import DATE_RE
+from smartnotes.journal import Conflict, Journal, replace_file
+from smartnotes.scan import imap_chunks, read_chunk
+
+# ---------------------------------------------------
+# Notebook operations, without a GUI
+# ---------------------------------------------------
+# Both apps and the command line (python -m smartnotes) drive the notes
+# through a Notebook. Nothing here imports tkinter, and the caches, stores,
+# exporters and backups are only imported and loaded when first used, so a
+# one-off command stays quick.
+#
+#   notebook = Notebook("notes")
+#   notebook.add("buy milk", "personal")
+#   for rel, line in notebook.search("milk"):
+#       ...
+#   notebook.close()
+
+CATEGORIES = ["school", "personal", "ideas", "journal"]
+STORES = ("files", "sqlite")
+
+
+def record_rel(record):
+    # A store record's day file, as search and the day views name files
+    # (no category folder in the flat layout)
+    name = f"{record['date']}_notes.txt"
+    return f"{record['cat']}/{name}" if record["cat"] else name
+
+
+class Notebook:
+    def __init__(self, notes_dir="notes", categories=CATEGORIES, store="files",
+                 backup_dir="backups", timestamps=True):
+        # categories=[""] is the flat layout (notes/<date>_notes.txt);
+        # timestamps prefixes new notes with "[HH:MM] "
+        if store not in STORES:
+            raise ValueError(f"unknown store {store!r}, expected one of {', '.join(STORES)}")
+        self.notes_dir = notes_dir
+        self.categories = list(categories)
+        self.backup_dir = backup_dir
+        self.timestamps = timestamps
+        for cat in self.categories:
+            os.makedirs(os.path.join(notes_dir, cat), exist_ok=True)
+        # every append goes through the journal, which also finishes any
+        # batch a crash cut short
+        self.journal = Journal(notes_dir)
+        self.journal.before_create = self._restore_packed
+
+        self._index = None
+        self._stats = None
+        self._dates = None
+        self._ranks = None
+        self._backups = None
+        self._cache = None
+        self.lock = threading.Lock()
+
+        # "sqlite" also keeps every note as a record in notes/.notebook.db,
+        # which then answers search, today, stats and export
+        self.store = None
+        self.db = None
+        if store == "sqlite":
+            from smartnotes.sqlite_store import SQLiteStore
+            self.store = self.db = SQLiteStore(os.path.join(notes_dir, ".notebook.db"))
+        if self.store is not None:
+            if not len(self.store):
+                self.store.import_tree(notes_dir, self.categories)
+            # a batch of adds goes into the store in the same group commit
+            self.journal.on_commit = self.store.add_many
+
+    # ---------------------------------------------------
+    # Caches, loaded on first use
+    # ---------------------------------------------------
+    @property
+    def index(self):
+        with self.lock:
+            if self._index is None:
+                from smartnotes.index import NoteIndex
+                self._index = NoteIndex(self.notes_dir)
+            return self._index
+
+    @property
+    def stats(self):
+        with self.lock:
+            if self._stats is None:
+                from smartnotes.stats import NoteStats
+                self._stats = NoteStats(self.notes_dir)
+            return self._stats
+
+    @property
+    def dates(self):
+        with self.lock:
+            if self._dates is None:
+                from smartnotes.dates import DateIndex
+                self._dates = DateIndex(self.notes_dir, self.categories)
+            return self._dates
+
+    @property
+    def ranks(self):
+        with self.lock:
+            if self._ranks is None:
+                from smartnotes.rank import RankIndex
+                self._ranks = RankIndex(self.notes_dir)
+            return self._ranks
+
+    @property
+    def cache(self):
+        # parsed day files the app opened lately, see smartnotes.notecache
+        with self.lock:
+            if self._cache is None:
+                from smartnotes.notecache import NoteCache
+                self._cache = NoteCache()
+            return self._cache
+
+    @property
+    def backups(self):
+        with self.lock:
+            if self._backups is None:
+                from smartnotes.backup import BackupStore
+                self._backups = BackupStore(self.backup_dir)
+            return self._backups
+
+    def update_file(self, path):
+        # A cache that is not loaded yet catches up from mtimes when it is
+        if self._index is not None:
+            self._index.update_file(path)
+        if self._stats is not None:
+            self._stats.update_file(path)
+        if self._dates is not None:
+            self._dates.update_file(path)
+        if self._ranks is not None:
+            self._ranks.update_file(path)
+        if self._cache is not None:
+            self._cache.discard(path)
+
+    def save(self):
+        if self._index is not None:
+            self._index.save()
+        if self._stats is not None:
+            self._stats.save()
+        if self._dates is not None:
+            self._dates.save()
+        if self._ranks is not None:
+            self._ranks.save()
+
+    def close(self):
+        self.save()
+        if self.store is not None:
+            self.store.close()
+        perf.save()
+
+    # ---------------------------------------------------
+    # Notes
+    # ---------------------------------------------------
+    def day_path(self, category, date):
+        return os.path.join(self.notes_dir, category, f"{date}_notes.txt")
+
+    def add(self, text, category=None, when=None):
+        # Appends a note to its day file and returns the file's path
+        return self.add_notes([text], category, when)
+
+    def add_notes(self, texts, category=None, when=None):
+        # Appends every text as a note in one journal commit (one fsync for
+        # the lot, however many); returns the day file's path, or None
+        texts = list(texts)
+        if not texts:
+            return None
+        if category is None and len(self.categories) == 1:
+            category = self.categories[0]
+        if category not in self.categories:
+            raise ValueError(f"unknown category {category!r}")
+        # a note is one line of its day file
+        if any("\n" in text or "\r" in text for text in texts):
+            raise ValueError("a note can't span lines")
+        when = when or datetime.datetime.now()
+        date = when.strftime("%Y-%m-%d")
+        # the store keeps the note as its line reads: untimed without timestamps
+        time = when.strftime("%H:%M") if self.timestamps else ""
+
+        with perf.measure("add") as sample:
+            path = self.day_path(category, date)
+            items = [(path, (f"[{time}] {text}" if time else text) + "\n") for text in texts]
+            records = []
+            if self.store is not None:
+                records = [{"cat": category, "date": date, "time": time, "text": text} for text in texts]
+            self.journal.commit(items, records)
+            self.update_file(path)
+            sample.results = len(texts)
+        return path
+
+    def _unpack_day(self, path):
+        # A day that was packed gets its file back before it is edited or a
+        # note is added to it; a new file would hide the archived notes
+        with self.journal.exclusive():
+            if not os.path.exists(path):
+                self._restore_packed(path)
+
+    def _restore_packed(self, path):
+        # journal.before_create: runs inside the batch, so a pack can't
+        # land between this and the append
+        from smartnotes.archive import find_member, read_member
+        found = find_member(path)
+        if found is not None:
+            replace_file(path, read_member(*found))
+
+    def replace_file(self, path, text):
+        # Atomically rewrites a note file (an edit or delete) and updates the caches
+        self.journal.replace(path, text)
+        self.update_file(path)
+
+    def list_files(self, category):
+        # Names of the day files in a category (as the edit and delete
+        # dialogs offer them), oldest first. Packed ones are listed too:
+        # they read from their archive, and an edit writes the file back.
+        from smartnotes.archive import ARCHIVE_RE, archived_files
+        if category not in self.categories:
+            raise ValueError(f"unknown category {category!r}")
+        folder = os.path.join(self.notes_dir, category)
+        listed = os.listdir(folder)
+        names = [name for name in listed if DATE_RE.fullmatch(name)]
+        archives = [name for name in listed if ARCHIVE_RE.match(name)]
+        names += [entry.name for entry in archived_files(folder, archives, names)]
+        return sorted(names)
+
+    def note_file(self, path):
+        # The parsed file (a NoteFile), from memory when it has not changed
+        # since it was last opened; FileNotFoundError if there is none
+        return self.cache.get(path)
+
+    def open_lines(self, path):
+        # The file as the edit and delete dialogs page through it: mapped
+        # (a LineFile), so a big one costs the same to open as a small one
+        # and is never read whole; a packed day comes from its archive (a
+        # NoteFile). FileNotFoundError if there is none.
+        from smartnotes.notecache import LineFile
+        try:
+            return LineFile(path)
+        except FileNotFoundError:
+            return self.note_file(path)
+
+    def read_file(self, path):
+        # (text, version) of a note file
+        note = self.note_file(path)
+        return note.text(), note.version
+
+    def edit_file(self, path, text, version=None):
+        # Rewrites a day file with text (an edit or delete in the app) and
+        # returns its new version. Given the version read_file() returned,
+        # raises Conflict instead if the file changed since, so two people
+        # editing the same day can't overwrite each other.
+        text = text.strip()
+        with perf.measure("edit"):
+            return self._edit_file(path, text + "\n" if text else "", version)
+
+    def _edit_file(self, path, data, version):
+        # edit_file() without the timing or the trimming: data, anything
+        # replace_file() takes, is written as it is
+        rel = os.path.relpath(path, self.notes_dir).replace(os.sep, "/")
+        category, _, name = rel.rpartition("/")
+        day = DATE_RE.fullmatch(name)
+        with self.journal.exclusive():
+            if version is not None and self._version(path) != version:
+                raise Conflict(f"{rel} was changed by someone else")
+            # written to a temp file and swapped in, so a crash can't leave
+            # the day file half written
+            replace_file(path, data)
+            if self.store is not None and day:
+                # the store's records follow the file
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    self.store.replace_day(category, day.group(1), f)
+            version = self._version(path)
+        self.update_file(path)
+        return version
+
+    def _version(self, path):
+        # the file's version as read_file() gives it, None if there is no file
+        try:
+            lines = self.open_lines(path)
+        except FileNotFoundError:
+            return None
+        try:
+            return lines.version
+        finally:
+            lines.close()
+
+    def edit_line(self, path, i, text, version=None):
+        # Replaces line i of a day file (numbered as note_file() does) with
+        # text and returns the file's new version; delete_line() takes the
+        # line out. Only the new line is trimmed; the other lines are kept
+        # as they are on disk and the store's records reconciled with the
+        # result, so notes written while the notebook ran without its store
+        # survive.
+        if "\n" in text or "\r" in text:
+            raise ValueError("a note can't span lines")
+        text = text.strip()
+        with perf.measure("edit"):
+            return self._edit_line(path, i, text + "\n" if text else "", version)
+
+    def delete_line(self, path, i, version=None):
+        with perf.measure("delete"):
+            return self._edit_line(path, i, "", version)
+
+    def _edit_line(self, path, i, line, version):
+        # The other lines are copied over from a mapping of the file, so
+        # however big it is it is never in memory whole
+        from smartnotes.notecache import LineFile
+        # held across the read and the rewrite, so nothing lands in between
+        with self.journal.exclusive():
+            if not os.path.exists(path):
+                # a packed day is edited on disk, as edit_file() leaves it
+                self._unpack_day(path)
+            lines = LineFile(path)
+            try:
+                if version is not None and lines.version != version:
+                    rel = os.path.relpath(path, self.notes_dir).replace(os.sep, "/")
+                    raise Conflict(f"{rel} was changed by someone else")
+                return self._edit_file(path, lines.with_line(i, line.encode("utf-8")), None)
+            finally:
+                lines.close()
+
+    def search(self, keyword, categories=None, date=None, scan=False):
+        # Yields (relpath, line) for every line containing keyword; see
+        # smartnotes.grep for "a | b", "a & b", '"phrase"' and /regex/.
+        # date is a day or anything parse_range() takes ("this week",
+        # "March 2026", "FROM..TO"). With the SQLite store plain keywords
+        # are ranked. scan=True always reads the files.
+        return perf.measure_iter("search", self._search(keyword, categories, date, scan))
+
+    def _search(self, keyword, categories, date, scan):
+        from smartnotes.grep import Query, grep_notes
+        categories = categories or self.categories
+        query = Query(keyword)
+        date = self.date_filter(date)
+        if query.mode == "substring" and not scan:
+            date_from, dots, date_to = (date or "").partition("..")
+            if self.db is not None:
+                from smartnotes.store import format_record
+                if dots:
+                    rows = self.db.search(keyword, categories, date_from=date_from, date_to=date_to)
+                else:
+                    rows = self.db.search(keyword, categories, date)
+                for r in rows:
+                    yield record_rel(r), format_record(r)
+                return
+            if not dots and self.has_index():
+                for rel, line in self.index.iter_search(keyword, categories, date, self.cache):
+                    yield rel, line.rstrip("\r\n")
+                return
+        # no index: scan the files, a date range's straight from the date index
+        rels = None
+        if date and ".." in date:
+            first, _, last = date.partition("..")
+            rels = [rel for day, cat, rel, size in self.dates.days(first, last, categories)]
+        yield from grep_notes(self.notes_dir, query, categories, date, rels)
+
+    def ranked(self, text, categories=None, date=None, k=20):
+        # [(score, relpath, line number, line)]: the k notes that best match
+        # text's words (BM25, see smartnotes.rank), best first
+        categories = categories or self.categories
+        with perf.measure("rank") as sample:
+            results = self.ranks.search(text, k, categories, self.date_filter(date))
+            sample.results = len(results)
+        return results
+
+    def similar(self, rel, lineno, k=10, categories=None):
+        # As ranked(), for the notes most like the one on line lineno of rel
+        categories = categories or self.categories
+        with perf.measure("similar") as sample:
+            results = self.ranks.similar(rel, lineno, k, categories)
+            sample.results = len(results)
+        return results
+
+    def date_filter(self, date):
+        # "this week" -> "2026-03-02..2026-03-08"; a single day stays as it
+        # is, and text parse_range() doesn't know is kept as a file name filter
+        from smartnotes.dates import parse_range
+        if not date:
+            return date
+        try:
+            first, last = parse_range(date)
+        except ValueError:
+            return date
+        return first if first == last else f"{first}..{last}"
+
+    def has_index(self):
+        from smartnotes.index import INDEX_NAME
+        return self._index is not None or os.path.exists(os.path.join(self.notes_dir, INDEX_NAME))
+
+    def today(self, categories=None):
+        # Yields (relpath, line) for today's notes; the files are kept in
+        # the note cache, as the app reopens them every time they change
+        today = datetime.date.today().isoformat()
+        return perf.measure_iter("today", self._days(today, today, categories, cached=True))
+
+    def days(self, first, last, categories=None):
+        # Yields (relpath, line) for the notes written first..last (YYYY-MM-DD,
+        # see smartnotes.dates.parse_range), by day
+        return perf.measure_iter("days", self._days(first, last, categories))
+
+    def _days(self, first, last, categories, cached=False):
+        categories = categories or self.categories
+        if self.db is not None:
+            from smartnotes.store import format_record
+            rows = sorted(self.db.notes(categories, date_from=first, date_to=last),
+                          key=lambda r: r["date"])
+            for r in rows:
+                yield record_rel(r), format_record(r)
+            return
+        # no directory listing: the date index knows each day's files
+        paths = [os.path.join(self.notes_dir, rel)
+                 for day, cat, rel, size in self.dates.days(first, last, categories)]
+        if cached:
+            for path in paths:
+                try:
+                    note = self.note_file(path)
+                except FileNotFoundError:
+                    continue
+                rel = os.path.relpath(path, self.notes_dir).replace(os.sep, "/")
+                for line in note.lines(0, note.count()):
+                    yield rel, line.rstrip("\r\n")
+            return
+        for results in imap_chunks(read_chunk, paths):
+            for path, lines in results:
+                rel = os.path.relpath(path, self.notes_dir).replace(os.sep, "/")
+                for line in lines:
+                    yield rel, line.rstrip("\r\n")
+
+    def rollup(self, first, last, categories=None):
+        # {date: {"notes", "words", "categories": {category: notes}}} for the
+        # days in first..last that have notes
+        categories = categories or self.categories
+        with perf.measure("calendar") as sample:
+            if self.db is not None:
+                from smartnotes.stats import count_words
+                from smartnotes.store import format_record
+                days = {}
+                for r in self.db.notes(categories, date_from=first, date_to=last):
+                    day = days.setdefault(r["date"], {"notes": 0, "words": 0, "categories": {}})
+                    day["notes"] += 1
+                    day["words"] += sum(count_words(format_record(r)).values())
+                    day["categories"][r["cat"]] = day["categories"].get(r["cat"], 0) + 1
+                days = dict(sorted(days.items()))
+            else:
+                days = self.dates.rollup(first, last, categories)
+            sample.results = len(days)
+        return days
+
+    def summary(self, categories=None, top=10):
+        categories = categories or self.categories
+        with perf.measure("stats") as sample:
+            if self.db is not None:
+                summary = self.db.stats(categories, top=top)
+            else:
+                summary = self.stats.summary(categories, top=top)
+            sample.results = summary["total_notes"]
+        return summary
+
+    def export(self, targets, categories=None, progress=None):
+        # targets: {path: format}, see smartnotes.export.FORMATS
+        from smartnotes.export import export_notes, export_records
+        categories = categories or self.categories
+        with perf.measure("export") as sample:
+            if self.db is not None:
+                # category by category, in the order the files are exported in
+                records = (r for cat in categories for r in self.db.notes([cat]))
+                sample.results = export_records(records, targets)
+            else:
+                sample.results = export_notes(self.notes_dir, targets, categories, progress=progress)
+
+    def pack(self, older_than=90, period="month", codec="xz"):
+        # Moves day files of months (or years) that ended more than
+        # older_than days ago into compressed archives, which search, stats,
+        # export and the day views read through; returns the files packed
+        from smartnotes.archive import pack
+        with perf.measure("pack") as sample:
+            # each month packed with appends and rewrites held off, so none
+            # lands between a file's read and its removal
+            paths = pack(self.notes_dir, self.categories, older_than, period, codec,
+                         lock=self.journal.exclusive)
+            # the archived copies keep mtime and size, so this is only a stat each
+            for path in paths:
+                self.update_file(path)
+            sample.results = len(paths)
+        return paths
+
+    def unpack(self, name, category=None):
+        # Puts the files of an archive ("2025-03" or "2025") back on disk;
+        # returns them
+        from smartnotes.archive import unpack
+        if category is None and len(self.categories) == 1:
+            category = self.categories[0]
+        if category not in self.categories:
+            raise ValueError(f"unknown category {category!r}")
+        archive = os.path.join(self.notes_dir, category, f"{name}_notes.nar")
+        if not os.path.exists(archive):
+            raise ValueError(f"no archive {name!r} in {category or 'notes'}")
+        with self.journal.exclusive():
+            paths = unpack(archive)
+        for path in paths:
+            self.update_file(path)
+        return paths
+
+    def backup(self, progress=None):
+        # Returns the snapshot name; only changed files are stored
+        with perf.measure("backup"):
+            return self.backups.backup(self.notes_dir, progress)
+
+    def snapshots(self):
+        # Names of the backup snapshots, oldest first
+        return self.backups.snapshots()
+
+    def restore(self, name=None, dest=None):
+        # Rebuilds a snapshot (default: the latest) as a folder of its own,
+        # dest or restored/<name>, and returns it; the notes are left alone
+        with perf.measure("restore"):
+            return self.backups.restore(name, dest)
@@ -0,0 +1,265 @@
+import datetime
+import json
+import os
+import re
+import threading
+
+from smartnotes import perf
+from smartnotes.archive import ARCHIVE_RE, archived_files, fstat, open_note, stat_note
+from smartnotes.index import DATE_RE
+from smartnotes.scan import imap_chunks
+from smartnotes.stats import count_words
+
+# ---------------------------------------------------
+# Date index: day -> that day's file in each category
+# ---------------------------------------------------
+# date -> that day's files, each with the byte range it held when last
+# counted (0..size), its note and word counts and the mtime it was counted
+# at. Day views and rollups come from here:
+#
+#   - opening it stats the category folders only; a folder is listed
+#     again when its mtime moved (a day file was created or removed)
+#   - files are stat'ed when a view asks for their days, and recounted if
+#     they changed, so a view is right without walking the tree
+#   - the apps report their own writes through update_file()
+#   - day files packed into archives count as still being there
+#
+# parse_range() turns "today", "this week", "March 2026", "2026-03",
+# "last 7 days" or "FROM..TO" into (first day, last day).
+
+DATES_NAME = ".dates.json"
+DATES_VERSION = 2
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+
+
+def count_day(path):
+    # (notes, words, mtime, size) for one day file; notes are lines and
+    # words are counted by stats.count_words(), so a day adds up to what
+    # the stats show for it
+    with open_note(path) as f:
+        st = fstat(f)
+        data = f.read()
+    perf.read(len(data))
+    notes = data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
+    words = sum(count_words(data.decode("utf-8", "replace")).values())
+    return notes, words, st.st_mtime_ns, len(data)
+
+
+def count_chunk(rels, notes_dir):
+    results = []
+    for rel in rels:
+        try:
+            results.append((rel, count_day(os.path.join(notes_dir, rel))))
+        except FileNotFoundError:
+            pass
+    return results
+
+
+# ---------------------------------------------------
+# Ranges
+# ---------------------------------------------------
+def month_end(day):
+    next_month = (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return next_month - datetime.timedelta(days=1)
+
+
+def parse_range(text, today=None):
+    # -> (first, last) as YYYY-MM-DD strings; ValueError if not understood
+    today = today or datetime.date.today()
+    text = " ".join(text.lower().split())
+    if ".." in text:
+        first, _, last = text.partition("..")
+        return (parse_range(first, today)[0] if first else "0000-00-00",
+                parse_range(last, today)[1] if last else "9999-99-99")
+    first = last = None
+    if text in ("", "today"):
+        first = last = today
+    elif text == "yesterday":
+        first = last = today - datetime.timedelta(days=1)
+    elif text in ("this week", "last week"):
+        first = today - datetime.timedelta(days=today.weekday())
+        if text == "last week":
+            first -= datetime.timedelta(days=7)
+        last = first + datetime.timedelta(days=6)
+    elif text in ("this month", "last month"):
+        first = today.replace(day=1)
+        if text == "last month":
+            first = (first - datetime.timedelta(days=1)).replace(day=1)
+        last = month_end(first)
+    elif text in ("this year", "last year"):
+        year = today.year - (text == "last year")
+        first, last = datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+    elif re.fullmatch(r"(last|past) \d+ days", text):
+        first = today - datetime.timedelta(days=int(text.split()[1]) - 1)
+        last = today
+    elif re.fullmatch(r"\d{4}-\d{2}-\d{2}", text):
+        first = last = datetime.date.fromisoformat(text)
+    elif re.fullmatch(r"\d{4}-\d{2}", text):
+        first = datetime.date(int(text[:4]), int(text[5:]), 1)
+        last = month_end(first)
+    elif re.fullmatch(r"\d{4}", text):
+        first, last = datetime.date(int(text), 1, 1), datetime.date(int(text), 12, 31)
+    else:
+        # "march 2026", "mar 2026", "march" (this year)
+        m = re.fullmatch(r"([a-z]+)(?: (\d{4}))?", text)
+        months = [i for i, name in enumerate(MONTHS, 1) if m and len(m[1]) >= 3 and name.startswith(m[1])]
+        if len(months) == 1:
+            first = datetime.date(int(m[2] or today.year), months[0], 1)
+            last = month_end(first)
+    if first is None:
+        raise ValueError(f"unknown date or range {text!r}")
+    return first.isoformat(), last.isoformat()
+
+
+def split(rel):
+    # "school/2026-03-01_notes.txt" -> ("school", "2026-03-01")
+    cat, _, name = rel.rpartition("/")
+    return cat, DATE_RE.search(name)[1]
+
+
+class DateIndex:
+    # by_day: {date: {relpath: [mtime, size, notes, words]}}, saved as it
+    # is, so loading a decade of day files is a single json.load
+    def __init__(self, notes_dir="notes", categories=("",), path=None):
+        self.notes_dir = notes_dir
+        self.categories = list(categories)
+        self.path = path or os.path.join(notes_dir, DATES_NAME)
+        self.by_day = {}
+        self.dirs = {}
+        self.dirty = False
+        self.lock = threading.RLock()
+        self.load()
+        self.refresh()
+
+    # ---------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != DATES_VERSION:
+            return
+        self.dirs = data["dirs"]
+        self.by_day = data["days"]
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = self.path + ".tmp"
+        # written and marked clean under the lock, so an update made while
+        # saving is never marked clean without being written
+        with self.lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": DATES_VERSION, "dirs": self.dirs, "days": self.by_day}, f,
+                          separators=(",", ":"))
+            os.replace(tmp, self.path)
+            self.dirty = False
+
+    # ---------------------------------------------------
+    # Keeping the index in sync
+    # ---------------------------------------------------
+    def refresh(self):
+        # Lists only the category folders whose mtime moved
+        changed = []
+        with self.lock:
+            for cat in self.categories:
+                folder = os.path.join(self.notes_dir, cat)
+                try:
+                    mtime = os.stat(folder).st_mtime_ns
+                except FileNotFoundError:
+                    mtime = None
+                if self.dirs.get(cat) == mtime and mtime is not None:
+                    continue
+                present = set()
+                if mtime is not None:
+                    listed = os.listdir(folder)
+                    names = [n for n in listed if not n.startswith(".") and DATE_RE.search(n)]
+                    archives = [n for n in listed if ARCHIVE_RE.match(n)]
+                    names += [entry.name for entry in archived_files(folder, archives, names)]
+                    for name in names:
+                        rel = f"{cat}/{name}" if cat else name
+                        present.add(rel)
+                        if self.get(rel) is None:
+                            changed.append(rel)
+                for files in list(self.by_day.values()):
+                    for rel in list(files):
+                        if rel not in present and rel.rpartition("/")[0] == cat:
+                            self._drop(rel)
+                self.dirs[cat] = mtime
+                self.dirty = True
+            self._count(changed)
+
+    def _count(self, rels):
+        for results in imap_chunks(count_chunk, rels, self.notes_dir):
+            for rel, (notes, words, mtime, size) in results:
+                self.by_day.setdefault(split(rel)[1], {})[rel] = [mtime, size, notes, words]
+                self.dirty = True
+
+    def update_file(self, path):
+        rel = os.path.relpath(path, self.notes_dir).replace(os.sep, "/")
+        cat, _, name = rel.rpartition("/")
+        if cat not in self.categories or name.startswith(".") or not DATE_RE.search(name):
+            return
+        with self.lock:
+            self._check([rel])
+
+    def _check(self, rels):
+        # re-counts the files that moved on disk, forgets the ones gone
+        changed = []
+        for rel in rels:
+            row = self.get(rel)
+            try:
+                st = stat_note(os.path.join(self.notes_dir, rel))
+            except FileNotFoundError:
+                if row is not None:
+                    self._drop(rel)
+                continue
+            if row is None or row[0] != st.st_mtime_ns or row[1] != st.st_size:
+                changed.append(rel)
+        self._count(changed)
+
+    def get(self, rel):
+        # [mtime, size, notes, words] or None
+        return self.by_day.get(split(rel)[1], {}).get(rel)
+
+    def _drop(self, rel):
+        date = split(rel)[1]
+        day = self.by_day[date]
+        del day[rel]
+        if not day:
+            del self.by_day[date]
+        self.dirty = True
+
+    # ---------------------------------------------------
+    # Lookups
+    # ---------------------------------------------------
+    def days(self, first, last, categories=None):
+        # [(date, category, relpath, size)] for the day files in first..last,
+        # by date then category, each checked against the disk
+        categories = self.categories if categories is None else categories
+        with self.lock:
+            self.refresh()
+            wanted = []
+            for date in sorted(d for d in self.by_day if first <= d <= last):
+                rels = sorted(self.by_day[date])
+                for cat in categories:
+                    wanted += [(date, cat, rel) for rel in rels if rel.rpartition("/")[0] == cat]
+            self._check([rel for date, cat, rel in wanted])
+            return [(date, cat, rel, row[1]) for date, cat, rel in wanted
+                    for row in [self.get(rel)] if row is not None]
+
+    def rollup(self, first, last, categories=None):
+        # {date: {"notes", "words", "categories": {category: notes}}}
+        days = {}
+        with self.lock:
+            for date, cat, rel, size in self.days(first, last, categories):
+                mtime, size, notes, words = self.get(rel)
+                day = days.setdefault(date, {"notes": 0, "words": 0, "categories": {}})
+                day["notes"] += notes
+                day["words"] += words
+                day["categories"][cat] = day["categories"].get(cat, 0) + notes
+        return days
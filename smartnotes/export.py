@@ -0,0 +1,211 @@
+import contextlib
+import csv
+import json
+import os
+import re
+import shutil
+
+from smartnotes import perf
+from smartnotes.archive import open_note
+from smartnotes.index import DATE_RE, note_files
+from smartnotes.scan import imap_chunks
+
+# ---------------------------------------------------
+# Streaming export
+# ---------------------------------------------------
+# Each note file is written straight into every requested output as it is
+# read, so memory use is bounded by a few chunks of files whatever the size
+# of the notebook. Plain-text exports are copied byte for byte.
+
+BUFFER_SIZE = 64 * 1024
+TIME_RE = re.compile(r"\[(\d{1,2}:\d{2})\]\s?(.*)")
+FORMATS = {".txt": "txt", ".jsonl": "jsonl", ".md": "md", ".csv": "csv"}
+
+
+def format_for(path):
+    return FORMATS.get(os.path.splitext(path)[1].lower(), "txt")
+
+
+def parse_line(line):
+    # "[HH:MM] text" -> ("HH:MM", "text"); untimed lines have no time
+    line = line.rstrip("\r\n")
+    m = TIME_RE.match(line)
+    if m:
+        return m.group(1), m.group(2)
+    return "", line
+
+
+class TextWriter:
+    def __init__(self, path):
+        self.out = open(path, "wb", buffering=BUFFER_SIZE)
+
+    def start(self, rel, cat, date):
+        self.out.write(f"--- {rel} ---\n".encode("utf-8"))
+
+    def line(self, raw, cat, date, time, text):
+        self.out.write(raw)
+
+    def end(self):
+        self.out.write(b"\n\n")
+
+    def close(self):
+        self.out.close()
+
+
+class JsonLinesWriter:
+    def __init__(self, path):
+        self.out = open(path, "w", encoding="utf-8", buffering=BUFFER_SIZE)
+
+    def start(self, rel, cat, date):
+        self.file = rel
+
+    def line(self, raw, cat, date, time, text):
+        record = {"category": cat, "date": date, "time": time, "text": text, "file": self.file}
+        self.out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def end(self):
+        pass
+
+    def close(self):
+        self.out.close()
+
+
+class MarkdownWriter:
+    def __init__(self, path):
+        self.out = open(path, "w", encoding="utf-8", buffering=BUFFER_SIZE)
+        self.out.write("# Smart Notebook\n\n")
+
+    def start(self, rel, cat, date):
+        title = " · ".join(part for part in (cat, date) if part) or rel
+        self.out.write(f"## {title}\n\n")
+
+    def line(self, raw, cat, date, time, text):
+        if time:
+            self.out.write(f"- **{time}** {text}\n")
+        elif text:
+            self.out.write(f"- {text}\n")
+
+    def end(self):
+        self.out.write("\n")
+
+    def close(self):
+        self.out.close()
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self.out = open(path, "w", encoding="utf-8", newline="", buffering=BUFFER_SIZE)
+        self.writer = csv.writer(self.out)
+        self.writer.writerow(["category", "date", "time", "text"])
+
+    def start(self, rel, cat, date):
+        pass
+
+    def line(self, raw, cat, date, time, text):
+        self.writer.writerow([cat, date, time, text])
+
+    def end(self):
+        pass
+
+    def close(self):
+        self.out.close()
+
+
+def parse_chunk(sources):
+    # [(rel, cat, path)] -> [(rel, cat, date, [(raw, time, text)])]
+    parsed = []
+    for rel, cat, path in sources:
+        m = DATE_RE.search(rel)
+        with open_note(path) as f:
+            lines = [(raw, *parse_line(raw.decode("utf-8", "replace"))) for raw in f]
+        perf.read(sum(len(raw) for raw, time, text in lines))
+        parsed.append((rel, cat, m.group(1) if m else "", lines))
+    return parsed
+
+
+WRITERS = {"txt": TextWriter, "jsonl": JsonLinesWriter, "md": MarkdownWriter, "csv": CsvWriter}
+
+
+def open_writers(stack, targets):
+    # each writer is closed by the stack, so one that fails to open does not
+    # leave the ones before it open
+    writers = []
+    for path, fmt in targets.items():
+        w = WRITERS[fmt](path)
+        stack.callback(w.close)
+        writers.append(w)
+    return writers
+
+
+def export_notes(notes_dir, targets, categories=None, progress=None):
+    # targets: {path: format}. All outputs are produced from a single pass
+    # over the notes; returns the number of files exported. progress(done,
+    # total) is called after each file.
+    outputs = {os.path.realpath(path) for path in targets}
+    sources = []
+    for rel, cat, entry in note_files(notes_dir):
+        if categories is not None and cat not in categories:
+            continue
+        # never read back one of our own outputs
+        if os.path.realpath(entry.path) in outputs:
+            continue
+        sources.append((categories.index(cat) if categories else 0, rel, cat, entry.path))
+    sources = [(rel, cat, path) for _, rel, cat, path in sorted(sources)]
+
+    with contextlib.ExitStack() as stack:
+        writers = open_writers(stack, targets)
+        copy_raw = len(writers) == 1 and isinstance(writers[0], TextWriter)
+        if copy_raw:
+            # plain text is pure I/O, copy it through without parsing
+            parsed = ([(rel, cat, "", None)] for rel, cat, path in sources)
+        else:
+            # parsing for the structured formats is spread over the cores
+            parsed = imap_chunks(parse_chunk, sources)
+        done = 0
+        for chunk in parsed:
+            for rel, cat, date, lines in chunk:
+                for w in writers:
+                    w.start(rel, cat, date)
+                if lines is None:
+                    with open_note(os.path.join(notes_dir, rel)) as f:
+                        shutil.copyfileobj(f, writers[0].out, BUFFER_SIZE)
+                        perf.read(f.tell())
+                else:
+                    for raw, time, text in lines:
+                        for w in writers:
+                            w.line(raw, cat, date, time, text)
+                for w in writers:
+                    w.end()
+                done += 1
+                if progress:
+                    progress(done, len(sources))
+    return len(sources)
+
+
+def export_records(records, targets):
+    # Same outputs as export_notes, fed from note records ({"cat", "date",
+    # "time", "text"}) already ordered by category and date. Returns the
+    # number of day files exported.
+    current = None
+    days = 0
+    with contextlib.ExitStack() as stack:
+        writers = open_writers(stack, targets)
+        for r in records:
+            if (r["cat"], r["date"]) != current:
+                if current is not None:
+                    for w in writers:
+                        w.end()
+                current = (r["cat"], r["date"])
+                days += 1
+                rel = f"{r['date']}_notes.txt"
+                rel = f"{r['cat']}/{rel}" if r["cat"] else rel
+                for w in writers:
+                    w.start(rel, r["cat"], r["date"])
+            line = f"[{r['time']}] {r['text']}" if r["time"] else r["text"]
+            raw = (line + "\n").encode("utf-8")
+            for w in writers:
+                w.line(raw, r["cat"], r["date"], r["time"], r["text"])
+        if current is not None:
+            for w in writers:
+                w.end()
+    return days
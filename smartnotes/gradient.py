@@ -0,0 +1,79 @@
+import tkinter as tk
+from collections import OrderedDict
+
+from smartnotes import perf
+
+# ---------------------------------------------------
+# Gradient Background
+# ---------------------------------------------------
+# A vertical gradient is rendered once per size into a single PhotoImage:
+# one column is filled with a single bulk put() of every row colour and
+# then zoomed across to the full width. Recent sizes are kept in a small
+# LRU cache so resizing back and forth does not re-render.
+
+CACHE_SIZE = 4
+_cache = OrderedDict()
+
+
+def gradient_colors(widget, color1, color2, height):
+    r1, g1, b1 = (c >> 8 for c in widget.winfo_rgb(color1))
+    r2, g2, b2 = (c >> 8 for c in widget.winfo_rgb(color2))
+    colors = []
+    for i in range(height):
+        ratio = i / height
+        r = int(r1 + (r2 - r1) * ratio)
+        g = int(g1 + (g2 - g1) * ratio)
+        b = int(b1 + (b2 - b1) * ratio)
+        colors.append(f"#{r:02x}{g:02x}{b:02x}")
+    return colors
+
+
+def gradient_image(widget, width, height, color1, color2):
+    key = (width, height, color1, color2)
+    image = _cache.get(key)
+    if image is not None:
+        _cache.move_to_end(key)
+        return image
+
+    column = tk.PhotoImage(master=widget, width=1, height=height)
+    column.put(" ".join("{%s}" % c for c in gradient_colors(widget, color1, color2, height)))
+    image = column.zoom(width, 1)
+
+    _cache[key] = image
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return image
+
+
+class GradientBackground:
+    # Keeps one image item at the bottom of `canvas` and re-renders it at
+    # most once per `delay` ms while the window is being resized.
+    def __init__(self, canvas, color1, color2, delay=60, on_resize=None):
+        self.canvas = canvas
+        self.colors = (color1, color2)
+        self.delay = delay
+        self.on_resize = on_resize
+        self.size = None
+        self.image = None
+        self.pending = None
+        self.item = canvas.create_image(0, 0, anchor="nw")
+        canvas.tag_lower(self.item)
+        canvas.bind("<Configure>", self.schedule)
+
+    def schedule(self, event=None):
+        if self.pending is not None:
+            self.canvas.after_cancel(self.pending)
+        self.pending = self.canvas.after(self.delay, self.redraw)
+
+    def redraw(self):
+        self.pending = None
+        width = max(self.canvas.winfo_width(), 1)
+        height = max(self.canvas.winfo_height(), 1)
+        if (width, height) == self.size:
+            return
+        self.size = (width, height)
+        with perf.measure("gradient"):
+            self.image = gradient_image(self.canvas, width, height, *self.colors)
+            self.canvas.itemconfigure(self.item, image=self.image)
+            if self.on_resize:
+                self.on_resize(width, height)
@@ -0,0 +1,228 @@
+import mmap
+import os
+import re
+
+from smartnotes import perf
+from smartnotes.archive import ARCHIVE_RE, archived_files, find_member, read_member
+from smartnotes.index import DATE_RE
+from smartnotes.scan import imap_chunks
+
+# ---------------------------------------------------
+# Scan-mode search over the raw bytes
+# ---------------------------------------------------
+# Used when there is no index (and for queries an index can't answer).
+# Each file is lowercased as one buffer and the query, compiled once, is
+# matched across the whole buffer; only lines with a hit are cut out and
+# decoded. Query syntax:
+#
+#   milk              lines containing "milk" (any case)
+#   milk | bread      lines containing either (spaces around the | needed)
+#   milk & bread      lines containing both (spaces around the & needed)
+#   "rock & roll"     quoted, an operator is just part of the phrase
+#   "buy milk"        the words "buy milk", whole words, any spacing
+#   /mil+k\b/         a regular expression
+#
+# bytes.lower() only folds ASCII, so needles with other letters become a
+# small pattern that accepts both cases of those letters. Plain ASCII
+# needles go through bytes.find, which is several times faster than an
+# IGNORECASE regex.
+
+MMAP_MIN_BYTES = 1 << 20
+CHUNK_BYTES = 1 << 20
+MODES = ("substring", "any", "all", "phrase", "regex")
+READ_FLAGS = os.O_RDONLY | getattr(os, "O_BINARY", 0)
+# operators need a space on each side, so "Q&A" or "a|b" stay plain text
+OR_RE = re.compile(r"\s+\|\s+")
+AND_RE = re.compile(r"\s+&\s+")
+
+
+def parse_query(text):
+    # -> (mode, [terms])
+    stripped = text.strip()
+    if len(stripped) > 2 and stripped[0] == "/" and stripped[-1] == "/":
+        return "regex", [stripped[1:-1]]
+    if len(stripped) > 2 and stripped[0] == '"' and stripped[-1] == '"':
+        return "phrase", [stripped[1:-1]]
+    for sep, mode in ((OR_RE, "any"), (AND_RE, "all")):
+        terms = [t.strip() for t in sep.split(stripped) if t.strip()]
+        if len(terms) > 1:
+            return mode, terms
+    return "substring", [text]
+
+
+def fold(term):
+    # A needle for an ASCII-lowercased buffer: bytes when the term is ASCII,
+    # else a pattern matching either case of its other letters
+    term = term.lower()
+    if term.isascii():
+        return term.encode()
+    return re.compile(fold_pattern(term))
+
+
+def fold_pattern(term):
+    parts = []
+    for ch in term.lower():
+        # the other case only when it is one letter too ("ß" stays "ß")
+        variants = {ch, ch.upper()} if not ch.isascii() and len(ch.upper()) == 1 else {ch}
+        if len(variants) > 1:
+            parts.append(b"(?:" + b"|".join(re.escape(v.encode()) for v in sorted(variants)) + b")")
+        else:
+            parts.append(re.escape(ch.encode()))
+    return b"".join(parts)
+
+
+def find(needle, data, pos=0):
+    if type(needle) is bytes:
+        return data.find(needle, pos)
+    m = needle.search(data, pos)
+    return m.start() if m else -1
+
+
+class Query:
+    # Compiled once, then matched against many files (and pickled to the
+    # scan pool). A line is a hit when any `prefilter` needle is found in
+    # it and every `checks` needle too.
+    def __init__(self, text):
+        self.text = text
+        self.mode, terms = parse_query(text)
+        self.checks = []
+        if self.mode == "regex":
+            try:
+                pattern = re.compile(terms[0].encode(), re.IGNORECASE | re.MULTILINE)
+            except re.error as e:
+                raise ValueError(f"bad regular expression {terms[0]!r}: {e}") from None
+            self.prefilter = [pattern]
+        elif self.mode == "phrase":
+            words = terms[0].split()
+            pattern = re.compile(rb"(?<!\w)" + rb"[ \t]+".join(fold_pattern(w) for w in words) + rb"(?!\w)")
+            plain = [w.lower().encode() for w in words if w.isascii()]
+            if plain:
+                self.prefilter = [max(plain, key=len)]
+                self.checks = [pattern]
+            else:
+                self.prefilter = [pattern]
+        elif self.mode == "all":
+            # look for the longest term (likely the rarest), check the rest per line
+            needles = sorted((fold(t) for t in terms), key=lambda n: -len(n if type(n) is bytes else n.pattern))
+            self.prefilter = needles[:1]
+            self.checks = needles[1:]
+        else:
+            self.prefilter = [fold(t) for t in terms]
+
+    def spans(self, data):
+        # (start, end) of each matching line in an ASCII-lowercased buffer
+        if len(self.prefilter) == 1:
+            return self._spans(self.prefilter[0], data)
+        found = {}
+        for needle in self.prefilter:
+            found.update(self._spans(needle, data))
+        return sorted(found.items())
+
+    def _spans(self, needle, data):
+        # the hot loop: one find per hit plus two to find its line's ends
+        spans = []
+        checks = self.checks
+        dfind = data.find
+        rfind = data.rfind
+        size = len(data)
+        if type(needle) is bytes:
+            search = dfind
+        else:
+            def search(needle, pos=0):
+                m = needle.search(data, pos)
+                return m.start() if m else -1
+        i = search(needle)
+        while i >= 0:
+            start = rfind(b"\n", 0, i) + 1
+            end = dfind(b"\n", i)
+            if end < 0:
+                end = size
+            if not checks or all(find(c, data[start:end]) >= 0 for c in checks):
+                spans.append((start, end))
+            i = search(needle, end + 1)
+        return spans
+
+    def lines(self, raw):
+        # raw: whole lines of a file -> the matching ones, decoded
+        return [raw[s:e].decode("utf-8", "replace").rstrip("\r") for s, e in self.spans(raw.lower())]
+
+
+def grep_file(path, query):
+    # A bare descriptor: most day files are a few KiB and a file object
+    # costs more than reading them
+    fd = os.open(path, READ_FLAGS)
+    try:
+        size = os.fstat(fd).st_size
+        perf.read(size)
+        if size < MMAP_MIN_BYTES:
+            return query.lines(os.read(fd, size))
+        # Big files are mapped and matched a chunk of whole lines at a time.
+        # The apps only rewrite big files through os.replace, so the mapping
+        # never sees the file shrink under it.
+        found = []
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            pos = 0
+            while pos < size:
+                stop = pos + CHUNK_BYTES
+                if stop < size:
+                    nl = mm.find(b"\n", stop)
+                    stop = size if nl < 0 else nl + 1
+                found += query.lines(mm[pos:stop])
+                pos = stop
+        return found
+    finally:
+        os.close(fd)
+
+
+def grep_chunk(rels, notes_dir, query):
+    results = []
+    for rel in rels:
+        path = os.path.join(notes_dir, rel)
+        try:
+            lines = grep_file(path, query)
+        except FileNotFoundError:
+            # packed into an archive: already in memory once its archive is
+            found = find_member(path)
+            if found is None:
+                continue
+            lines = query.lines(read_member(*found))
+        results.extend((rel, line) for line in lines)
+    return results
+
+
+def note_paths(notes_dir, categories, date=None):
+    # Relative paths in category order, archived day files included. date
+    # is a substring of the file name, or a FROM..TO range of days (either
+    # end may be left open).
+    date_from, dots, date_to = (date or "").partition("..")
+    rels = []
+    for cat in categories:
+        folder = os.path.join(notes_dir, cat)
+        try:
+            listed = os.listdir(folder)
+        except FileNotFoundError:
+            continue
+        names = [n for n in listed if n.endswith(".txt") and not n.startswith(".")]
+        archives = [n for n in listed if ARCHIVE_RE.match(n)]
+        names += [entry.name for entry in archived_files(folder, archives, names)]
+        for name in sorted(names):
+            if dots:
+                day = DATE_RE.search(name)
+                if not day or not (date_from or day[1]) <= day[1] <= (date_to or day[1]):
+                    continue
+            elif date and date not in name:
+                continue
+            rels.append(f"{cat}/{name}" if cat else name)
+    return rels
+
+
+def grep_notes(notes_dir, query, categories=("",), date=None, rels=None):
+    # Yields (relpath, line) for every matching line; query is text or a
+    # Query. rels, when given, are the files to read (e.g. from the date index).
+    if not isinstance(query, Query):
+        query = Query(query)
+    if rels is None:
+        rels = note_paths(notes_dir, categories, date)
+    for results in imap_chunks(grep_chunk, rels, notes_dir, query):
+        yield from results
@@ -0,0 +1,349 @@
+import json
+import os
+import re
+import threading
+
+from smartnotes import perf
+from smartnotes.archive import ARCHIVE_RE, DATE_RE, archived_files, fstat, open_note, stat_note
+from smartnotes.scan import PARALLEL_MIN_FILES, imap_chunks
+
+# ---------------------------------------------------
+# Inverted index over the notes/ tree
+# ---------------------------------------------------
+# token -> {relative file path: [byte offset of each line holding it]}
+# Files are keyed as "<category>/<date>_notes.txt", or just the file name
+# for notes kept directly in notes/. The index is a cache: every file entry
+# remembers the mtime/size it was built from and is re-read only when
+# those change. Day files packed into archives (smartnotes.archive) are
+# listed and read as if they were still on disk.
+
+TOKEN_RE = re.compile(r"\w+")
+INDEX_NAME = ".index.json"
+INDEX_VERSION = 1
+# query tokens match inside index tokens ("eet" finds "meeting"); tokens
+# are found through their 3-letter pieces, not by scanning the vocabulary
+GRAM = 3
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def grams(token):
+    return {token[i:i + GRAM] for i in range(len(token) - GRAM + 1)}
+
+
+def read_postings(path):
+    # token -> [byte offset of each line holding it], plus line count and stat
+    postings = {}
+    offset = 0
+    lines = 0
+    with open_note(path) as f:
+        st = fstat(f)
+        for raw in f:
+            for token in set(tokenize(raw.decode("utf-8", "replace"))):
+                postings.setdefault(token, []).append(offset)
+            offset += len(raw)
+            lines += 1
+    perf.read(offset)
+    return postings, lines, st.st_mtime_ns, st.st_size
+
+
+def index_chunk(rels, notes_dir):
+    return [(rel, read_postings(os.path.join(notes_dir, rel))) for rel in rels]
+
+
+def match_chunk(candidates, notes_dir, needle):
+    # candidates: [(relpath, line offsets or None for "whole file")]
+    results = []
+    for rel, offsets in candidates:
+        try:
+            f = open_note(os.path.join(notes_dir, rel))
+        except FileNotFoundError:
+            continue
+        with f:
+            if offsets is None:
+                lines = f.readlines()
+            else:
+                lines = []
+                for offset in sorted(offsets):
+                    f.seek(offset)
+                    lines.append(f.readline())
+        perf.read(sum(len(raw) for raw in lines))
+        for raw in lines:
+            line = raw.decode("utf-8", "replace")
+            if needle in line.lower():
+                results.append((rel, line))
+    return results
+
+
+def match_cached(candidates, notes_dir, needle, cache):
+    # match_chunk() over the parsed files in a NoteCache
+    for rel, offsets in candidates:
+        try:
+            note = cache.get(os.path.join(notes_dir, rel))
+        except FileNotFoundError:
+            continue
+        if offsets is None:
+            lines = note.lines(0, note.count())
+        else:
+            lines = [note.line_at(offset) for offset in sorted(offsets)]
+        for line in lines:
+            if needle in line.lower():
+                yield rel, line
+
+
+def note_files(notes_dir):
+    # Yields (relpath, category, DirEntry) for notes/*.txt and notes/<category>/*.txt,
+    # then an ArchivedEntry for each archived day file not also on disk
+    if not os.path.isdir(notes_dir):
+        return
+    names = []
+    archives = []
+    for entry in os.scandir(notes_dir):
+        if entry.name.startswith("."):
+            continue
+        if entry.is_file() and entry.name.endswith(".txt"):
+            names.append(entry.name)
+            yield entry.name, "", entry
+        elif ARCHIVE_RE.match(entry.name):
+            archives.append(entry.name)
+        elif entry.is_dir():
+            yield from folder_files(entry.path, entry.name)
+    for sub in archived_files(notes_dir, archives, names):
+        yield sub.name, "", sub
+
+
+def folder_files(folder, cat):
+    names = []
+    archives = []
+    for sub in os.scandir(folder):
+        if sub.name.endswith(".txt") and sub.is_file():
+            names.append(sub.name)
+            yield f"{cat}/{sub.name}", cat, sub
+        elif ARCHIVE_RE.match(sub.name):
+            archives.append(sub.name)
+    for sub in archived_files(folder, archives, names):
+        yield f"{cat}/{sub.name}", cat, sub
+
+
+class NoteIndex:
+    def __init__(self, notes_dir="notes", path=None):
+        self.notes_dir = notes_dir
+        self.path = path or os.path.join(notes_dir, INDEX_NAME)
+        self.files = {}
+        self.postings = {}
+        self.by_date = {}
+        self.by_category = {}
+        # trigram -> tokens holding it; built on the first search
+        self.grams = None
+        self.dirty = False
+        # searches may run on a worker thread while the app updates files
+        self.lock = threading.RLock()
+        self.load()
+        self.refresh()
+
+    # ---------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        self.files = data["files"]
+        self.postings = data["postings"]
+        for rel, meta in self.files.items():
+            self._link(rel, meta)
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = self.path + ".tmp"
+        # written and marked clean under the lock, so an update made while
+        # saving is never marked clean without being written
+        with self.lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "files": self.files,
+                           "postings": self.postings}, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+            self.dirty = False
+
+    # ---------------------------------------------------
+    # Keeping the index in sync
+    # ---------------------------------------------------
+    def refresh(self):
+        # Only stats the tree; files are re-read when mtime or size moved,
+        # across all cores when there are many of them (first build).
+        seen = set()
+        changed = []
+        with self.lock:
+            for rel, cat, entry in note_files(self.notes_dir):
+                seen.add(rel)
+                st = entry.stat()
+                meta = self.files.get(rel)
+                if meta is None or meta["mtime"] != st.st_mtime_ns or meta["size"] != st.st_size:
+                    changed.append(rel)
+            for rel in list(self.files):
+                if rel not in seen:
+                    self._drop(rel)
+            for results in imap_chunks(index_chunk, changed, self.notes_dir):
+                for rel, postings in results:
+                    self._add(rel, rel.rpartition("/")[0], *postings)
+
+    def relpath(self, path):
+        return os.path.relpath(path, self.notes_dir).replace(os.sep, "/")
+
+    def update_file(self, path):
+        rel = self.relpath(path)
+        with self.lock:
+            try:
+                st = stat_note(path)
+            except FileNotFoundError:
+                if rel in self.files:
+                    self._drop(rel)
+                return
+            if not self.is_current(rel, st):
+                self._index(rel, rel.rpartition("/")[0])
+
+    def is_current(self, rel, st):
+        # already indexed at this mtime/size (e.g. the watcher reporting our own write)
+        meta = self.files.get(rel)
+        return meta is not None and meta["mtime"] == st.st_mtime_ns and meta["size"] == st.st_size
+
+    def _index(self, rel, cat):
+        self._add(rel, cat, *read_postings(os.path.join(self.notes_dir, rel)))
+
+    def _add(self, rel, cat, file_postings, lines, mtime, size):
+        if rel in self.files:
+            self._drop(rel)
+        for token, offsets in file_postings.items():
+            docs = self.postings.get(token)
+            if docs is None:
+                docs = self.postings[token] = {}
+                if self.grams is not None:
+                    self._link_grams(token)
+            docs[rel] = offsets
+        m = DATE_RE.search(rel)
+        meta = {"category": cat, "date": m.group(1) if m else None,
+                "mtime": mtime, "size": size, "lines": lines,
+                "tokens": list(file_postings)}
+        self.files[rel] = meta
+        self._link(rel, meta)
+        self.dirty = True
+
+    def _drop(self, rel):
+        meta = self.files.pop(rel)
+        for token in meta["tokens"]:
+            docs = self.postings.get(token)
+            if docs is not None:
+                docs.pop(rel, None)
+                if not docs:
+                    del self.postings[token]
+                    if self.grams is not None:
+                        self._unlink_grams(token)
+        self._unlink(rel, meta)
+        self.dirty = True
+
+    def _link(self, rel, meta):
+        self.by_category.setdefault(meta["category"], set()).add(rel)
+        if meta["date"]:
+            self.by_date.setdefault(meta["date"], set()).add(rel)
+
+    def _unlink(self, rel, meta):
+        self.by_category.get(meta["category"], set()).discard(rel)
+        if meta["date"]:
+            self.by_date.get(meta["date"], set()).discard(rel)
+
+    def _link_grams(self, token):
+        for gram in grams(token):
+            self.grams.setdefault(gram, set()).add(token)
+
+    def _unlink_grams(self, token):
+        for gram in grams(token):
+            tokens = self.grams.get(gram)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self.grams[gram]
+
+    # ---------------------------------------------------
+    # Lookups
+    # ---------------------------------------------------
+    def tokens_containing(self, qtok):
+        # Index tokens that qtok is part of. Looked up through the trigram
+        # map, checking only the tokens sharing qtok's rarest trigram; one
+        # or two letters match so much of the vocabulary that it is scanned.
+        if len(qtok) < GRAM:
+            return [token for token in self.postings if qtok in token]
+        if self.grams is None:
+            self.grams = {}
+            for token in self.postings:
+                self._link_grams(token)
+        pieces = [self.grams.get(gram, ()) for gram in grams(qtok)]
+        return [token for token in min(pieces, key=len) if qtok in token]
+
+    def files_for(self, categories=None, date=None):
+        # Files in category order; `date` keeps the old "substring of the
+        # file name" filter but a full YYYY-MM-DD is a direct lookup.
+        if categories is None:
+            categories = sorted(self.by_category)
+        if date and date in self.by_date:
+            wanted = self.by_date[date]
+        else:
+            wanted = None
+        rels = []
+        for cat in categories:
+            for rel in sorted(self.by_category.get(cat, ())):
+                if wanted is not None:
+                    if rel in wanted:
+                        rels.append(rel)
+                elif not date or date in rel.rpartition("/")[2]:
+                    rels.append(rel)
+        return rels
+
+    def search(self, keyword, categories=None, date=None):
+        return list(self.iter_search(keyword, categories, date))
+
+    def iter_search(self, keyword, categories=None, date=None, cache=None):
+        # Yields (relpath, line) for lines containing keyword (case-insensitive).
+        # With a NoteCache the candidate files are read through it, unless
+        # there are many: a broad search reads them the usual way rather than
+        # pushing the days the app has open out of the cache.
+        needle = keyword.lower()
+        with self.lock:
+            rels, hits = self._candidates(needle, categories, date)
+        candidates = [(rel, hits[rel]) for rel in rels if rel in hits]
+        if cache is not None and len(candidates) < PARALLEL_MIN_FILES:
+            yield from match_cached(candidates, self.notes_dir, needle, cache)
+            return
+        for results in imap_chunks(match_chunk, candidates, self.notes_dir, needle):
+            yield from results
+
+    def _candidates(self, needle, categories, date):
+        # Candidate files and, per file, the line offsets worth checking
+        # (None = no usable token, read the whole file)
+        rels = self.files_for(categories, date)
+        query = tokenize(needle)
+        if not query:
+            # Nothing indexable (e.g. "#"), fall back to reading the candidates.
+            return rels, {rel: None for rel in rels}
+        allowed = set(rels)
+        hits = None
+        for qtok in query:
+            found = {}
+            for token in self.tokens_containing(qtok):
+                for rel, offsets in self.postings[token].items():
+                    if rel in allowed:
+                        found.setdefault(rel, set()).update(offsets)
+            if hits is None:
+                hits = found
+            else:
+                hits = {rel: hits[rel] & offs for rel, offs in found.items()
+                        if rel in hits and hits[rel] & offs}
+            if not hits:
+                return rels, {}
+        return rels, hits
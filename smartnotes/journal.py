@@ -0,0 +1,186 @@
+import contextlib
+import json
+import os
+import threading
+
+# ---------------------------------------------------
+# Write-ahead journal for note appends
+# ---------------------------------------------------
+# Appends are queued and committed in batches ("group commit"): whoever
+# finds no commit running writes everything queued so far, and callers
+# that arrive meanwhile wait and go out together in the next batch. A
+# batch is
+#
+#   1. notes/.journal  one JSON line per day file: {"path", "at", "data"},
+#                      "at" being the file's size before the append, then
+#                      {"commit": <lines>}; fsynced
+#   2. the appends, each day file written once and fsynced
+#   3. the journal removed
+#
+# before_create(path) runs in the batch ahead of an append that would
+# create its day file, e.g. to bring a packed day back first.
+#
+# Records passed along with the appends (a store's rows for the same notes)
+# go to on_commit(records) once the day files are written, as part of the
+# batch: an edit waiting in exclusive() sees both or neither.
+#
+# recover() runs on the next start. A journal without its commit line is
+# dropped, since that batch never reached the day files. Otherwise files
+# ending in a partial (or no) copy of "data" past "at" are cut back to
+# "at" and written again; files changed in some other way are left alone.
+#
+# Whole-file rewrites (edits, deletes) go through replace_file(): a temp
+# file next to the original, fsynced, then os.replace(). exclusive() holds
+# off appends and other rewrites, e.g. while checking a file is still the
+# version an edit was based on (Conflict if not).
+
+JOURNAL_NAME = ".journal"
+
+
+def replace_file(path, data):
+    # Atomically replaces path with data (str, bytes, or an iterable of
+    # bytes chunks, written as they come)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if isinstance(data, bytes):
+        data = [data]
+    folder, name = os.path.split(path)
+    tmp = os.path.join(folder, f".{name}.tmp")
+    with open(tmp, "wb") as f:
+        for chunk in data:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Conflict(Exception):
+    # a rewrite based on a version of the file that is no longer current
+    pass
+
+
+class _Batch:
+    __slots__ = ("items", "records", "done", "error")
+
+    def __init__(self):
+        self.items = []
+        self.records = []
+        self.done = False
+        self.error = None
+
+
+class Journal:
+    def __init__(self, notes_dir="notes"):
+        self.notes_dir = notes_dir
+        self.path = os.path.join(notes_dir, JOURNAL_NAME)
+        self.cond = threading.Condition()
+        self.open = _Batch()
+        self.committing = False
+        self.batches = 0
+        # called with each batch's records, in the order they were committed
+        self.on_commit = None
+        self.before_create = None
+        self.recover()
+
+    def commit(self, items, records=()):
+        # items: [(path, text)]; returns once they are on disk (and the
+        # records handed to on_commit)
+        with self.cond:
+            batch = self.open
+            batch.items.extend(items)
+            batch.records.extend(records)
+            while not batch.done:
+                if self.committing:
+                    self.cond.wait()
+                    continue
+                # nobody is writing: take every queued item, ours included
+                current, self.open = self.open, _Batch()
+                self.committing = True
+                self.cond.release()
+                try:
+                    self._write(current.items)
+                    if current.records and self.on_commit is not None:
+                        self.on_commit(current.records)
+                except BaseException as e:
+                    current.error = e
+                finally:
+                    self.cond.acquire()
+                    current.done = True
+                    self.committing = False
+                    self.batches += 1
+                    self.cond.notify_all()
+        if batch.error is not None:
+            raise batch.error
+
+    def replace(self, path, data):
+        # replace_file(), ordered with the appends around it
+        with self.exclusive():
+            replace_file(path, data)
+
+    @contextlib.contextmanager
+    def exclusive(self):
+        # no batch is committing, and none starts, until the block is done
+        with self.cond:
+            while self.committing:
+                self.cond.wait()
+            yield
+
+    def _write(self, items):
+        texts = {}
+        for path, text in items:
+            texts.setdefault(path, []).append(text)
+        entries = []
+        for path, parts in texts.items():
+            rel = os.path.relpath(path, self.notes_dir).replace(os.sep, "/")
+            if self.before_create is not None and not os.path.exists(path):
+                self.before_create(path)
+            try:
+                at = os.path.getsize(path)
+            except FileNotFoundError:
+                at = 0
+            entries.append({"path": rel, "at": at, "data": "".join(parts)})
+        with open(self.path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.write(json.dumps({"commit": len(entries)}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        for entry in entries:
+            self._apply(entry)
+        os.remove(self.path)
+
+    def _apply(self, entry, check=False):
+        path = os.path.join(self.notes_dir, entry["path"])
+        data = entry["data"].encode("utf-8")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab+") as f:
+            if check:
+                f.seek(entry["at"])
+                tail = f.read()
+                if tail == data or not data.startswith(tail):
+                    # already there, or the file was changed since
+                    return False
+                f.truncate(entry["at"])
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return True
+
+    def recover(self):
+        # Finishes a batch cut short by a crash; returns the files repaired
+        try:
+            f = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return []
+        with f:
+            entries = []
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+        repaired = []
+        if entries and entries[-1].get("commit") == len(entries) - 1:
+            repaired = [e["path"] for e in entries[:-1] if self._apply(e, check=True)]
+        os.remove(self.path)
+        return repaired
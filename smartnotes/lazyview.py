@@ -0,0 +1,174 @@
+import tkinter as tk
+import tkinter.font as tkfont
+
+# ---------------------------------------------------
+# Virtualized line views
+# ---------------------------------------------------
+# Big note files are never loaded into a widget whole. A VirtualList draws
+# just the rows on screen from a "source":
+#
+#   source.count()       lines known so far (grows while scanning/streaming)
+#   source.estimate()    best guess of the final count, for the scrollbar
+#   source.lines(a, b)   text of lines a..b-1
+#
+# Notebook.open_lines() gives a file on disk as one (a LineFile, see
+# smartnotes.notecache, which maps the file and finds line offsets only as
+# far as the view has scrolled), ListSource lines that arrive from a
+# background job. Line edits go through Notebook.edit_line() and
+# delete_line(); the dialogs then reopen the file with open_lines().
+
+# files up to this size are still edited as plain text in one widget
+WHOLE_FILE_BYTES = 256 * 1024
+
+
+class ListSource:
+    def __init__(self, items=None):
+        self.items = list(items or [])
+
+    def add(self, items):
+        self.items.extend(items)
+
+    def clear(self):
+        self.items.clear()
+
+    def count(self):
+        return len(self.items)
+
+    estimate = count
+
+    def lines(self, start, stop):
+        return self.items[start:stop]
+
+    def line(self, i):
+        return self.items[i] if 0 <= i < len(self.items) else None
+
+    def delete(self, i):
+        del self.items[i]
+
+    def close(self):
+        pass
+
+
+class VirtualList(tk.Frame):
+    # A read-only list that only ever holds the visible rows in its Text
+    # widget. Click selects a row; on_activate(index) runs on double-click.
+    def __init__(self, master, source, rows=25, width=70, font=None, on_activate=None, **kw):
+        super().__init__(master, **kw)
+        self.source = source
+        self.rows = rows
+        self.top = 0
+        self.selected = None
+        self.on_activate = on_activate
+
+        self.text = tk.Text(self, width=width, height=rows, wrap="none", cursor="arrow",
+                            font=font, takefocus=True)
+        self.text.tag_configure("selected", background="#ffcfcf")
+        self.ybar = tk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.xbar = tk.Scrollbar(self, orient="horizontal", command=self.text.xview)
+        self.text.configure(xscrollcommand=self.xbar.set, state="disabled")
+        self.ybar.pack(side="right", fill="y")
+        self.xbar.pack(side="bottom", fill="x")
+        self.text.pack(side="left", fill="both", expand=True)
+        self.line_height = tkfont.Font(root=self, font=self.text.cget("font")).metrics("linespace")
+
+        self.text.bind("<Configure>", self._resized)
+        self.text.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units", 3))
+        self.text.bind("<Button-4>", lambda e: self.scroll(-1, "units", 3))
+        self.text.bind("<Button-5>", lambda e: self.scroll(1, "units", 3))
+        self.text.bind("<Up>", lambda e: self.move(-1))
+        self.text.bind("<Down>", lambda e: self.move(1))
+        self.text.bind("<Prior>", lambda e: self.scroll(-1, "pages"))
+        self.text.bind("<Next>", lambda e: self.scroll(1, "pages"))
+        self.text.bind("<Home>", lambda e: self.show(0))
+        # jumping to the end has to find every line once
+        self.text.bind("<End>", lambda e: self.show(1 << 62))
+        self.text.bind("<Button-1>", self._click)
+        self.text.bind("<Double-Button-1>", self._activate)
+        self.render()
+
+    def set_source(self, source):
+        self.source = source
+        self.top = 0
+        self.selected = None
+        self.render()
+
+    def selection(self):
+        return self.selected
+
+    def refresh(self):
+        # call after the source changed (new items, edits, deletes)
+        count = self.source.count()
+        if self.selected is not None and self.selected >= count:
+            self.selected = None
+        self.render()
+
+    # ---------------------------------------------------
+    # Scrolling
+    # ---------------------------------------------------
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.show(int(float(args[1]) * self.source.estimate()))
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]), args[2])
+
+    def scroll(self, n, what, step=1):
+        self.show(self.top + n * (self.rows if what == "pages" else step))
+        return "break"
+
+    def show(self, top):
+        self.top = max(0, top)
+        self.render()
+        return "break"
+
+    def move(self, step):
+        row = (self.top if self.selected is None else self.selected) + step
+        row = max(0, min(row, self.source.count() - 1))
+        self.selected = row if row >= 0 else None
+        if row < self.top:
+            self.top = row
+        elif row >= self.top + self.rows:
+            self.top = row - self.rows + 1
+        self.render()
+        return "break"
+
+    def _resized(self, event):
+        rows = max(1, event.height // self.line_height)
+        if rows != self.rows:
+            self.rows = rows
+            self.render()
+
+    def _row_at(self, event):
+        row = self.top + int(self.text.index(f"@{event.x},{event.y}").split(".")[0]) - 1
+        return row if row < self.source.count() else None
+
+    def _click(self, event):
+        self.text.focus_set()
+        self.selected = self._row_at(event)
+        self.render()
+        return "break"
+
+    def _activate(self, event):
+        row = self._row_at(event)
+        if row is not None and self.on_activate:
+            self.on_activate(row)
+        return "break"
+
+    # ---------------------------------------------------
+    # Drawing
+    # ---------------------------------------------------
+    def render(self):
+        lines = self.source.lines(self.top, self.top + self.rows)
+        if len(lines) < self.rows and self.top:
+            # scrolled past the end: pull the window back
+            self.top = max(0, self.source.count() - self.rows)
+            lines = self.source.lines(self.top, self.top + self.rows)
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", "\n".join(line.rstrip("\r\n") for line in lines))
+        if self.selected is not None and self.top <= self.selected < self.top + len(lines):
+            row = self.selected - self.top + 1
+            self.text.tag_add("selected", f"{row}.0", f"{row + 1}.0")
+        self.text.configure(state="disabled")
+
+        total = max(self.source.estimate(), 1)
+        self.ybar.set(self.top / total, min(1.0, (self.top + len(lines)) / total))
@@ -0,0 +1,275 @@
+import array
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+from smartnotes import perf
+from smartnotes.archive import fstat, open_note, stat_note
+
+# ---------------------------------------------------
+# Note cache: recently opened day files, parsed
+# ---------------------------------------------------
+# Opening the same day again (edit, delete, today's notes, the files a
+# narrow search hits) is served from memory. Each file is one NoteFile: its
+# bytes as a single buffer and an array of where each line starts, built on
+# first use; lines are decoded one at a time as they are asked for.
+#
+# get() stats the file every time and reads it again if its mtime or size
+# moved; the apps also drop a file they wrote (discard()), for writes
+# inside one mtime tick. Least recently used files go once the cache holds
+# more than its byte budget; a file bigger than a quarter of the budget is
+# parsed for the caller but not kept.
+#
+# Files too big to hold open as a LineFile instead: the file is mapped and
+# line offsets found only as far as the caller has asked for, so opening
+# one costs the same whatever its size. Notebook.open_lines() hands out
+# either, as a lazyview source.
+
+CACHE_BYTES = 32 << 20
+# a LineFile rewrite copies the unchanged bytes this much at a time
+CHUNK_BYTES = 1 << 20
+# rough fixed cost of a cached file: the record, its arrays and the dict entry
+RECORD_BYTES = 300
+
+
+def file_version(data):
+    # what Notebook.read_file() hands out and edit_file() checks against
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+class NoteFile:
+    # also a lazyview source (count/estimate/lines), so a VirtualList can
+    # show one as it is
+    __slots__ = ("path", "stamp", "data", "nlines", "_starts", "_version")
+
+    def __init__(self, path, stamp, data, version=None):
+        self.path = path
+        self.stamp = stamp
+        self.data = data
+        self.nlines = data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
+        self._starts = None
+        self._version = version
+
+    @property
+    def nbytes(self):
+        # including the line starts, built or not
+        return len(self.data) + 4 * self.nlines + RECORD_BYTES
+
+    @property
+    def starts(self):
+        # starts[i] is where line i begins, found the first time a line is
+        # asked for by number (search hits come as offsets and need none).
+        # bytes.find, not re.finditer: match objects are tracked by the
+        # garbage collector, which then sweeps the whole heap.
+        if self._starts is None:
+            data = self.data
+            starts = array.array("I", [0] if data else [])
+            end = data.find(b"\n")
+            while 0 <= end < len(data) - 1:
+                starts.append(end + 1)
+                end = data.find(b"\n", end + 1)
+            self._starts = starts
+        return self._starts
+
+    @property
+    def version(self):
+        # hashed once per read of the file
+        if self._version is None:
+            self._version = file_version(self.data)
+        return self._version
+
+    def count(self):
+        return self.nlines
+
+    estimate = count
+
+    def bounds(self, i):
+        starts = self.starts
+        return starts[i], starts[i + 1] if i + 1 < len(starts) else len(self.data)
+
+    def lines(self, start, stop):
+        # text of lines start..stop-1, newlines kept
+        stop = min(stop, self.nlines)
+        return [self.data[slice(*self.bounds(i))].decode("utf-8", "replace") for i in range(start, stop)]
+
+    def line(self, i):
+        return self.data[slice(*self.bounds(i))].decode("utf-8", "replace") if 0 <= i < self.nlines else None
+
+    def line_at(self, offset):
+        # the line starting at byte offset
+        end = self.data.find(b"\n", offset)
+        return self.data[offset:end + 1 if end >= 0 else len(self.data)].decode("utf-8", "replace")
+
+    def text(self):
+        return self.data.decode("utf-8", "replace")
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    def close(self):
+        pass
+
+
+class LineFile:
+    # a read-only lazyview source over a file on disk, mapped
+    def __init__(self, path):
+        self.path = path
+        self.map = None
+        self.open()
+
+    def open(self):
+        self.close()
+        with open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if st.st_size:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.stamp = (st.st_mtime_ns, st.st_size)
+        self.size = st.st_size
+        self._version = None
+        # offsets[i] is where line i starts; only what was scanned so far
+        self.offsets = array.array("Q", [0])
+        self.scanned = 0
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def check(self):
+        # Re-maps the file if it was rewritten behind our back; reading a
+        # mapping past a truncated end would crash the process.
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self.close()
+            self.size = 0
+            self.offsets = array.array("Q", [0])
+            self.scanned = 0
+            return
+        if (st.st_mtime_ns, st.st_size) != self.stamp:
+            self.open()
+
+    def complete(self):
+        return self.scanned >= self.size
+
+    def count(self):
+        if not self.size:
+            return 0
+        return len(self.offsets) if self.complete() else len(self.offsets) - 1
+
+    def estimate(self):
+        if self.complete() or not self.scanned:
+            return max(self.count(), 1 if self.size else 0)
+        return max(self.count(), int(self.count() * self.size / self.scanned))
+
+    def scan(self, lines):
+        # Finds line starts until `lines` lines are known or the file ends
+        while not self.complete() and self.count() < lines:
+            end = self.map.find(b"\n", self.scanned)
+            if end < 0:
+                self.scanned = self.size
+            else:
+                self.scanned = end + 1
+                if self.scanned < self.size:
+                    self.offsets.append(self.scanned)
+
+    def bounds(self, i):
+        self.scan(i + 1)
+        start = self.offsets[i]
+        end = self.offsets[i + 1] if i + 1 < len(self.offsets) else self.scanned
+        return start, end
+
+    def lines(self, start, stop):
+        self.check()
+        self.scan(stop)
+        stop = min(stop, self.count())
+        return [self.map[slice(*self.bounds(i))].decode("utf-8", "replace")
+                for i in range(start, stop)]
+
+    def line(self, i):
+        lines = self.lines(i, i + 1)
+        return lines[0] if lines else None
+
+    @property
+    def version(self):
+        # as NoteFile.version, of the file as mapped; the mapping is hashed
+        # (paged in by the OS), not copied
+        if self._version is None:
+            self._version = file_version(self.map if self.map is not None else b"")
+        return self._version
+
+    def with_line(self, i, line=b""):
+        # The file's bytes with line i swapped for line (b"" takes it out),
+        # as chunks copied from the mapping while they are consumed. The
+        # mapping is closed after the last one, before the caller replaces
+        # the file: a mapped file can't be replaced on Windows.
+        self.scan(i + 1)
+        if not 0 <= i < self.count():
+            raise IndexError(f"{os.path.basename(self.path)} has no line {i + 1}")
+        start, end = self.bounds(i)
+        return self._spliced(start, end, line)
+
+    def _spliced(self, start, end, line):
+        yield from self._chunks(0, start)
+        yield line
+        yield from self._chunks(end, self.size)
+        self.close()
+
+    def _chunks(self, start, stop):
+        for pos in range(start, stop, CHUNK_BYTES):
+            yield self.map[pos:min(pos + CHUNK_BYTES, stop)]
+
+
+class NoteCache:
+    def __init__(self, budget=CACHE_BYTES):
+        self.budget = budget
+        self.files = OrderedDict()
+        self.used = 0
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        # NoteFile for path as it is on disk (or in its archive);
+        # FileNotFoundError if there is no such file
+        path = os.path.normpath(path)
+        with self.lock:
+            note = self.files.get(path)
+        if note is not None:
+            st = stat_note(path)
+            if note.stamp == (st.st_mtime_ns, st.st_size):
+                with self.lock:
+                    if path in self.files:
+                        self.files.move_to_end(path)
+                    self.hits += 1
+                return note
+        with open_note(path) as f:
+            st = fstat(f)
+            data = f.read()
+        perf.read(len(data))
+        note = NoteFile(path, (st.st_mtime_ns, st.st_size), data)
+        with self.lock:
+            self.misses += 1
+            self._drop(path)
+            if note.nbytes <= self.budget // 4:
+                self.files[path] = note
+                self.used += note.nbytes
+                while self.used > self.budget:
+                    self._drop(next(iter(self.files)))
+        return note
+
+    def discard(self, path):
+        with self.lock:
+            self._drop(os.path.normpath(path))
+
+    def _drop(self, path):
+        note = self.files.pop(path, None)
+        if note is not None:
+            self.used -= note.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.files.clear()
+            self.used = 0
@@ -0,0 +1,301 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# ---------------------------------------------------
+# Instrumentation
+# ---------------------------------------------------
+# Off unless SMARTNOTES_PERF is set (or enable() is called):
+#   SMARTNOTES_PERF=1        time every operation into a ring buffer
+#   SMARTNOTES_PERF=profile  ... and dump a cProfile per operation
+#   SMARTNOTES_PERF=memory   ... and a tracemalloc snapshot per operation
+# Dumps and saved samples go to SMARTNOTES_PERF_DIR (default "perf").
+#
+#   with perf.measure("search") as sample:
+#       sample.results = len(found)
+#
+# Readers call perf.read(nbytes) for each file they read, which counts
+# towards the innermost measured operation on that thread. Disabled,
+# measure() hands back a shared do-nothing sample and read() is a
+# thread-local lookup.
+
+RING_SIZE = 2000
+SAMPLES_NAME = "samples.jsonl"
+# latency histogram buckets, upper bounds in ms
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+MODES = ("on", "profile", "memory")
+
+_mode = None
+_dir = os.environ.get("SMARTNOTES_PERF_DIR", "perf")
+_ring = deque(maxlen=RING_SIZE)
+_unsaved = []
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class Sample:
+    __slots__ = ("name", "start", "seconds", "files", "bytes", "results", "error", "parent")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.time()
+        self.seconds = 0.0
+        self.files = 0
+        self.bytes = 0
+        self.results = 0
+        self.error = None
+        self.parent = None
+
+    def as_dict(self):
+        return {"op": self.name, "start": self.start, "ms": self.seconds * 1000,
+                "files": self.files, "bytes": self.bytes, "results": self.results,
+                "error": self.error}
+
+
+class NullSample:
+    # what measure() yields while disabled; writes are dropped
+    __slots__ = ()
+    files = bytes = results = 0
+
+    def __setattr__(self, name, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL = NullSample()
+
+
+def enable(mode="on", directory=None):
+    global _mode, _dir
+    if mode not in MODES:
+        raise ValueError(f"unknown perf mode {mode!r}, expected one of {', '.join(MODES)}")
+    if directory:
+        _dir = directory
+    if mode == "memory":
+        import tracemalloc
+        tracemalloc.start()
+    _mode = mode
+
+
+def disable():
+    global _mode
+    if _mode == "memory":
+        import tracemalloc
+        tracemalloc.stop()
+    _mode = None
+
+
+def enabled():
+    return _mode is not None
+
+
+def measure(name):
+    if _mode is None:
+        return NULL
+    return _Measure(name)
+
+
+def measure_iter(name, iterable):
+    # For generators: the operation lasts until the caller stops iterating,
+    # and every item counts as a result
+    if _mode is None:
+        return iterable
+    return _measure_iter(name, iterable)
+
+
+def _measure_iter(name, iterable):
+    # The sample is the thread's current one only while the generator runs;
+    # at each yield the caller gets its own back, so reads made between two
+    # items (or by another measured generator iterated alongside) are not
+    # counted here
+    iterator = iter(iterable)
+    with _Measure(name) as sample:
+        while True:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            sample.results += 1
+            _local.sample = sample.parent
+            try:
+                yield item
+            finally:
+                sample.parent = getattr(_local, "sample", None)
+                _local.sample = sample
+
+
+def read(nbytes, files=1):
+    sample = getattr(_local, "sample", None)
+    if sample is not None:
+        sample.files += files
+        sample.bytes += nbytes
+
+
+class counting:
+    # Collects read() counts on this thread whether or not perf is
+    # enabled; used to carry counts back from pool processes
+    def __enter__(self):
+        self.sample = Sample("")
+        self.sample.parent = getattr(_local, "sample", None)
+        _local.sample = self.sample
+        return self.sample
+
+    def __exit__(self, *exc):
+        _local.sample = self.sample.parent
+        return False
+
+
+class _Measure:
+    def __init__(self, name):
+        self.sample = Sample(name)
+        self.profiler = None
+
+    def __enter__(self):
+        sample = self.sample
+        sample.parent = getattr(_local, "sample", None)
+        _local.sample = sample
+        if _mode == "profile" and not getattr(_local, "profiling", False):
+            import cProfile
+            _local.profiling = True
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif _mode == "memory":
+            import tracemalloc
+            tracemalloc.reset_peak()
+        self.t0 = time.perf_counter()
+        return sample
+
+    def __exit__(self, exc_type, exc, tb):
+        sample = self.sample
+        sample.seconds = time.perf_counter() - self.t0
+        if exc_type is not None and exc_type is not GeneratorExit:
+            sample.error = exc_type.__name__
+        _local.sample = sample.parent
+        if sample.parent is not None:
+            sample.parent.files += sample.files
+            sample.parent.bytes += sample.bytes
+        sample.parent = None
+        if self.profiler is not None:
+            self.profiler.disable()
+            _local.profiling = False
+            self.profiler.dump_stats(dump_path(sample, "prof"))
+        elif _mode == "memory":
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                tracemalloc.take_snapshot().dump(dump_path(sample, "tracemalloc"))
+        with _lock:
+            _ring.append(sample)
+            _unsaved.append(sample)
+        return False
+
+
+def dump_path(sample, ext):
+    os.makedirs(_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(sample.start))
+    return os.path.join(_dir, f"{sample.name}-{stamp}-{int(sample.start * 1000) % 1000:03d}.{ext}")
+
+
+# ---------------------------------------------------
+# Reporting
+# ---------------------------------------------------
+def samples(name=None):
+    with _lock:
+        return [s.as_dict() for s in _ring if name is None or s.name == name]
+
+
+def save(path=None):
+    # Appends samples recorded since the last save to perf/samples.jsonl
+    with _lock:
+        pending = _unsaved[:]
+        _unsaved.clear()
+    if not pending:
+        return
+    path = path or os.path.join(_dir, SAMPLES_NAME)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for sample in pending:
+            f.write(json.dumps(sample.as_dict()) + "\n")
+
+
+def load(path=None, last=RING_SIZE):
+    path = path or os.path.join(_dir, SAMPLES_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in deque(f, maxlen=last)]
+    except FileNotFoundError:
+        return []
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(records):
+    # {op: {"count", "p50", "p90", "p99", "max", "files", "bytes", "results", "errors"}}
+    by_op = {}
+    for r in records:
+        by_op.setdefault(r["op"], []).append(r)
+    summary = {}
+    for op, rs in sorted(by_op.items()):
+        ms = sorted(r["ms"] for r in rs)
+        summary[op] = {"count": len(rs), "p50": percentile(ms, 50), "p90": percentile(ms, 90),
+                       "p99": percentile(ms, 99), "max": ms[-1],
+                       "files": sum(r["files"] for r in rs) / len(rs),
+                       "bytes": sum(r["bytes"] for r in rs) / len(rs),
+                       "results": sum(r["results"] for r in rs) / len(rs),
+                       "errors": sum(1 for r in rs if r["error"])}
+    return summary
+
+
+def histogram(values_ms, width=40):
+    # text histogram over BUCKETS_MS, one line per non-empty bucket
+    counts = [0] * (len(BUCKETS_MS) + 1)
+    for v in values_ms:
+        i = 0
+        while i < len(BUCKETS_MS) and v > BUCKETS_MS[i]:
+            i += 1
+        counts[i] += 1
+    top = max(counts) or 1
+    lines = []
+    for i, n in enumerate(counts):
+        if not n:
+            continue
+        label = f"<= {BUCKETS_MS[i]} ms" if i < len(BUCKETS_MS) else f"> {BUCKETS_MS[-1]} ms"
+        lines.append(f"{label:>11} {'#' * max(1, n * width // top):<{width}} {n}")
+    return lines
+
+
+def report(records, op=None):
+    # The text shown by the CLI and the in-app panel
+    if op:
+        records = [r for r in records if r["op"] == op]
+    if not records:
+        return "No samples yet. Set SMARTNOTES_PERF=1 to record them."
+    out = [f"{'operation':<12} {'count':>6} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} "
+           f"{'files':>7} {'KiB read':>9} {'results':>8}"]
+    summary = summarize(records)
+    for name, s in summary.items():
+        out.append(f"{name:<12} {s['count']:>6} {s['p50']:>7.1f}ms {s['p90']:>7.1f}ms "
+                   f"{s['p99']:>7.1f}ms {s['max']:>7.1f}ms {s['files']:>7.0f} "
+                   f"{s['bytes'] / 1024:>9.1f} {s['results']:>8.0f}")
+    for name in summary:
+        out.append("")
+        out.append(f"{name}:")
+        out += histogram([r["ms"] for r in records if r["op"] == name])
+    return "\n".join(out)
+
+
+if os.environ.get("SMARTNOTES_PERF", "") not in ("", "0"):
+    enable(os.environ["SMARTNOTES_PERF"] if os.environ["SMARTNOTES_PERF"] in MODES else "on")
@@ -0,0 +1,414 @@
+import array
+import heapq
+import json
+import math
+import os
+import struct
+import sys
+import threading
+
+from smartnotes import perf
+from smartnotes.archive import fstat, open_note, stat_note
+from smartnotes.export import parse_line
+from smartnotes.index import DATE_RE, note_files
+from smartnotes.scan import imap_chunks
+from smartnotes.stats import count_words
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# ---------------------------------------------------
+# Relevance-ranked search (BM25) and similar notes
+# ---------------------------------------------------
+# Every note (a non-blank line) is a document of words, split the way
+# stats counts them and without the "[HH:MM]" stamp. Per word, the ids of
+# the notes holding it and how often (array('i') / array('H')); per note
+# its file, line number, byte offset and length. A query scores only the
+# notes on its words' lists, as BM25:
+#
+#   idf(w) * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average length))
+#
+# With NumPy each word's list is scored as one vector and the totals are
+# summed with bincount; without it the same sums run in a dict. similar()
+# uses a note's own words as the query.
+#
+# A rewritten file adds its notes again under new ids and leaves the old
+# ones dead in the lists (skipped when scoring) until they pass
+# COMPACT_SHARE of all notes and the lists are rebuilt. Like the other
+# caches it is saved under notes/ and checked against file mtimes/sizes.
+
+RANK_NAME = ".rank.bin"
+RANK_VERSION = 1
+RANK_MAGIC = b"SNRK1\n"
+RANK_HEADER = struct.Struct("<I")
+K1 = 1.2
+B = 0.75
+COMPACT_SHARE = 0.25
+# per-note columns: file slot, line number, byte offset, length in words
+COLUMNS = (("doc_file", "i"), ("doc_line", "i"), ("doc_offset", "q"), ("doc_len", "i"))
+
+
+def words(text):
+    # {word: count} for a line, as stats counts them, without its [HH:MM]
+    return count_words(parse_line(text)[1])
+
+
+def read_terms(path):
+    # [(line number, byte offset, {word: count})] for the file's notes, plus stat
+    notes = []
+    offset = 0
+    with open_note(path) as f:
+        st = fstat(f)
+        for lineno, raw in enumerate(f, 1):
+            counts = words(raw.decode("utf-8", "replace"))
+            if counts:
+                notes.append((lineno, offset, dict(counts)))
+            offset += len(raw)
+    perf.read(offset)
+    return notes, st.st_mtime_ns, st.st_size
+
+
+def terms_chunk(rels, notes_dir):
+    results = []
+    for rel in rels:
+        try:
+            results.append((rel, read_terms(os.path.join(notes_dir, rel))))
+        except FileNotFoundError:
+            pass
+    return results
+
+
+def in_range(rel, date):
+    # date: None, a FROM..TO range (either end open) or a file name substring
+    if not date:
+        return True
+    date_from, dots, date_to = date.partition("..")
+    if not dots:
+        return date in rel.rpartition("/")[2]
+    day = DATE_RE.search(rel)
+    return bool(day) and (date_from or day[1]) <= day[1] <= (date_to or day[1])
+
+
+class RankIndex:
+    def __init__(self, notes_dir="notes", path=None, vectorized=None):
+        # vectorized: score with NumPy (default: when it is installed)
+        self.notes_dir = notes_dir
+        self.path = path or os.path.join(notes_dir, RANK_NAME)
+        self.vectorized = np is not None if vectorized is None else vectorized and np is not None
+        self.lock = threading.RLock()
+        self.clear()
+        self.load()
+        self.refresh()
+
+    def clear(self):
+        self.files = {}         # relpath -> [mtime, size, first note id, notes]
+        self.names = []         # file slot -> relpath
+        self.slots = {}         # relpath -> file slot
+        for name, code in COLUMNS:
+            setattr(self, name, array.array(code))
+        self.alive = bytearray()
+        self.postings = {}      # word -> (array("i") note ids, array("H") counts)
+        self.live = 0
+        self.total_len = 0
+        self.dirty = False
+
+    # ---------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------
+    def load(self):
+        # header JSON, then the note columns, alive flags, and every word's
+        # ids and counts back to back, in machine byte order
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        try:
+            if not data.startswith(RANK_MAGIC):
+                return
+            pos = len(RANK_MAGIC)
+            (length,) = RANK_HEADER.unpack_from(data, pos)
+            pos += RANK_HEADER.size
+            meta = json.loads(data[pos:pos + length])
+            pos += length
+            if meta.get("version") != RANK_VERSION or meta.get("byteorder") != sys.byteorder:
+                return
+            view = memoryview(data)
+            notes = meta["notes"]
+            for name, code in COLUMNS:
+                column = array.array(code)
+                column.frombytes(view[pos:pos + notes * column.itemsize])
+                pos += notes * column.itemsize
+                setattr(self, name, column)
+            self.alive = bytearray(view[pos:pos + notes])
+            pos += notes
+            counts = meta["counts"]
+            id_size, tf_size = array.array("i").itemsize, array.array("H").itemsize
+            id_pos, tf_pos = pos, pos + sum(counts) * id_size
+            for word, n in zip(meta["words"], counts):
+                ids, tfs = array.array("i"), array.array("H")
+                ids.frombytes(view[id_pos:id_pos + n * id_size])
+                tfs.frombytes(view[tf_pos:tf_pos + n * tf_size])
+                id_pos += n * id_size
+                tf_pos += n * tf_size
+                self.postings[word] = (ids, tfs)
+        except (ValueError, KeyError, struct.error):
+            self.clear()
+            return
+        self.files = meta["files"]
+        self.names = meta["names"]
+        self.slots = {rel: slot for slot, rel in enumerate(self.names)}
+        self.live = meta["live"]
+        self.total_len = meta["total_len"]
+
+    def save(self):
+        if not self.dirty:
+            return
+        with self.lock:
+            self.compact()
+            vocab = list(self.postings)
+            meta = {"version": RANK_VERSION, "byteorder": sys.byteorder, "files": self.files,
+                    "names": self.names, "notes": len(self.alive), "live": self.live,
+                    "total_len": self.total_len, "words": vocab,
+                    "counts": [len(self.postings[w][0]) for w in vocab]}
+            header = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(RANK_MAGIC + RANK_HEADER.pack(len(header)) + header)
+                for name, code in COLUMNS:
+                    getattr(self, name).tofile(f)
+                f.write(self.alive)
+                for w in vocab:
+                    self.postings[w][0].tofile(f)
+                for w in vocab:
+                    self.postings[w][1].tofile(f)
+            os.replace(tmp, self.path)
+            self.dirty = False
+
+    # ---------------------------------------------------
+    # Keeping the index in sync
+    # ---------------------------------------------------
+    def refresh(self):
+        seen = set()
+        changed = []
+        with self.lock:
+            for rel, cat, entry in note_files(self.notes_dir):
+                seen.add(rel)
+                st = entry.stat()
+                meta = self.files.get(rel)
+                if meta is None or meta[0] != st.st_mtime_ns or meta[1] != st.st_size:
+                    changed.append(rel)
+            for rel in list(self.files):
+                if rel not in seen:
+                    self._drop(rel)
+            for results in imap_chunks(terms_chunk, changed, self.notes_dir):
+                for rel, (notes, mtime, size) in results:
+                    self._add(rel, notes, mtime, size)
+
+    def update_file(self, path):
+        rel = os.path.relpath(path, self.notes_dir).replace(os.sep, "/")
+        with self.lock:
+            try:
+                st = stat_note(path)
+            except FileNotFoundError:
+                if rel in self.files:
+                    self._drop(rel)
+                return
+            meta = self.files.get(rel)
+            if meta is None or meta[0] != st.st_mtime_ns or meta[1] != st.st_size:
+                self._add(rel, *read_terms(path))
+
+    def _add(self, rel, notes, mtime, size):
+        if rel in self.files:
+            self._drop(rel)
+        slot = self.slots.get(rel)
+        if slot is None:
+            slot = self.slots[rel] = len(self.names)
+            self.names.append(rel)
+        first = len(self.alive)
+        for doc, (lineno, offset, counts) in enumerate(notes, first):
+            length = sum(counts.values())
+            self.doc_file.append(slot)
+            self.doc_line.append(lineno)
+            self.doc_offset.append(offset)
+            self.doc_len.append(length)
+            self.alive.append(1)
+            self.total_len += length
+            for word, n in counts.items():
+                posting = self.postings.get(word)
+                if posting is None:
+                    posting = self.postings[word] = (array.array("i"), array.array("H"))
+                posting[0].append(doc)
+                posting[1].append(min(n, 0xFFFF))
+        self.live += len(notes)
+        self.files[rel] = [mtime, size, first, len(notes)]
+        self.dirty = True
+
+    def _drop(self, rel):
+        mtime, size, first, count = self.files.pop(rel)
+        for doc in range(first, first + count):
+            self.alive[doc] = 0
+            self.total_len -= self.doc_len[doc]
+        self.live -= count
+        self.dirty = True
+
+    def compact(self):
+        # renumbers the live notes once the dead ones pass COMPACT_SHARE
+        with self.lock:
+            dead = len(self.alive) - self.live
+            if not dead or dead < COMPACT_SHARE * len(self.alive):
+                return
+            new_id = array.array("i", [-1]) * len(self.alive)
+            keep = [doc for doc, flag in enumerate(self.alive) if flag]
+            for new, doc in enumerate(keep):
+                new_id[doc] = new
+            for name, code in COLUMNS:
+                old = getattr(self, name)
+                setattr(self, name, array.array(code, [old[doc] for doc in keep]))
+            self.alive = bytearray(b"\x01") * len(keep)
+            for rel, meta in self.files.items():
+                meta[2] = new_id[meta[2]] if meta[3] else len(keep)
+            for word in list(self.postings):
+                ids, tfs = self.postings[word]
+                pairs = [(new_id[doc], n) for doc, n in zip(ids, tfs) if new_id[doc] >= 0]
+                if pairs:
+                    self.postings[word] = (array.array("i", [p[0] for p in pairs]),
+                                           array.array("H", [p[1] for p in pairs]))
+                else:
+                    del self.postings[word]
+            self.dirty = True
+
+    # ---------------------------------------------------
+    # Scoring
+    # ---------------------------------------------------
+    def top(self, weights, k=20, categories=None, date=None, exclude=None):
+        # [(score, note id)] best first for {word: weight}
+        with self.lock:
+            if not self.live or not weights:
+                return []
+            slots = None
+            if categories is not None or date:
+                slots = {self.slots[rel] for rel in self.files
+                         if (categories is None or rel.rpartition("/")[0] in categories)
+                         and in_range(rel, date)}
+            if self.vectorized:
+                return self._top_numpy(weights, k, slots, exclude)
+            return self._top_python(weights, k, slots, exclude)
+
+    def _idf(self, df):
+        return math.log(1 + (self.live - df + 0.5) / (df + 0.5))
+
+    def _top_python(self, weights, k, slots, exclude):
+        scores = {}
+        alive = self.alive
+        doc_len = self.doc_len
+        dead = len(alive) > self.live
+        norm = K1 * B / (self.total_len / self.live)
+        base = K1 * (1 - B)
+        for word, weight in weights.items():
+            posting = self.postings.get(word)
+            if posting is None:
+                continue
+            ids, tfs = posting
+            df = sum(alive[doc] for doc in ids) if dead else len(ids)
+            if not df:
+                continue
+            scale = self._idf(df) * weight * (K1 + 1)
+            get = scores.get
+            for doc, tf in zip(ids, tfs):
+                if alive[doc]:
+                    scores[doc] = get(doc, 0.0) + scale * tf / (tf + base + norm * doc_len[doc])
+        if exclude is not None:
+            scores.pop(exclude, None)
+        if slots is not None:
+            doc_file = self.doc_file
+            scores = {doc: s for doc, s in scores.items() if doc_file[doc] in slots}
+        best = heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(score, doc) for doc, score in best]
+
+    def _top_numpy(self, weights, k, slots, exclude):
+        alive = np.frombuffer(self.alive, dtype=np.uint8)
+        doc_len = np.frombuffer(self.doc_len, dtype=np.int32)
+        norm = K1 * B / (self.total_len / self.live)
+        base = K1 * (1 - B)
+        all_ids = []
+        all_scores = []
+        for word, weight in weights.items():
+            posting = self.postings.get(word)
+            if posting is None:
+                continue
+            ids = np.frombuffer(posting[0], dtype=np.int32)
+            tf = np.frombuffer(posting[1], dtype=np.uint16).astype(np.float64)
+            live = alive[ids]
+            df = int(live.sum())
+            if not df:
+                continue
+            scale = self._idf(df) * weight * (K1 + 1)
+            all_ids.append(ids)
+            all_scores.append(live * (scale * tf / (tf + base + norm * doc_len[ids])))
+        if not all_ids:
+            return []
+        scores = np.bincount(np.concatenate(all_ids), weights=np.concatenate(all_scores),
+                             minlength=len(self.alive))
+        if exclude is not None:
+            scores[exclude] = 0
+        if slots is not None:
+            wanted = np.zeros(len(self.names), dtype=bool)
+            wanted[list(slots)] = True
+            scores[~wanted[np.frombuffer(self.doc_file, dtype=np.int32)]] = 0
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > k:
+            # everything tied with the k-th best, so ties break as below
+            kth = -np.partition(-scores[hits], k - 1)[k - 1]
+            hits = hits[scores[hits] >= kth]
+        # best first, ties in index order
+        hits = hits[np.lexsort((hits, -scores[hits]))][:k]
+        return [(float(scores[doc]), int(doc)) for doc in hits]
+
+    # ---------------------------------------------------
+    # Lookups
+    # ---------------------------------------------------
+    def search(self, text, k=20, categories=None, date=None):
+        # [(score, relpath, line number, line)] for the k best notes for text
+        return self.lines(self.top(dict(words(text)), k, categories, date))
+
+    def similar(self, rel, lineno, k=10, categories=None):
+        # the k notes sharing the most (and rarest) words with the note on
+        # line lineno of rel; ValueError when there is no note there
+        with self.lock:
+            doc = self.find(rel, lineno)
+            if doc is None:
+                raise ValueError(f"no note on line {lineno} of {rel}")
+            line = self.read_line(rel, self.doc_offset[doc])
+            return self.lines(self.top(dict(words(line)), k, categories, exclude=doc))
+
+    def find(self, rel, lineno):
+        meta = self.files.get(rel)
+        if meta is None:
+            return None
+        for doc in range(meta[2], meta[2] + meta[3]):
+            if self.doc_line[doc] == lineno:
+                return doc
+        return None
+
+    def read_line(self, rel, offset):
+        with open_note(os.path.join(self.notes_dir, rel)) as f:
+            f.seek(offset)
+            raw = f.readline()
+        perf.read(len(raw))
+        return raw.decode("utf-8", "replace").rstrip("\r\n")
+
+    def lines(self, best):
+        # (score, note id) -> (score, relpath, line number, line)
+        results = []
+        with self.lock:
+            found = [(score, self.names[self.doc_file[doc]], self.doc_line[doc], self.doc_offset[doc])
+                     for score, doc in best]
+        for score, rel, lineno, offset in found:
+            try:
+                results.append((score, rel, lineno, self.read_line(rel, offset)))
+            except FileNotFoundError:
+                continue
+        return results
@@ -0,0 +1,96 @@
+import atexit
+import io
+import os
+from collections import deque
+
+from smartnotes import perf
+from smartnotes.archive import open_note
+
+# ---------------------------------------------------
+# Parallel scan pipeline
+# ---------------------------------------------------
+# Per-file work (tokenizing, matching, counting) is cut into chunks of
+# files and fanned out to a process pool; results come back per chunk, in
+# order, for the caller to merge. Small jobs stay in-process, where
+# shipping work to other processes costs more than it saves.
+#
+# Chunk functions must be module-level (picklable) and take the chunk as
+# their first argument:  func(chunk, *args) -> partial result
+
+CHUNK_FILES = 32
+PARALLEL_MIN_FILES = 256
+WORKERS = os.cpu_count() or 1
+
+_pool = None
+
+
+def pool():
+    global _pool
+    if _pool is None:
+        # imported here: multiprocessing is slow to import and most runs
+        # never need it
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # not fork: the apps and the server call this with other threads
+        # running, and a forked child can inherit a lock one of them held
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(WORKERS, mp_context=multiprocessing.get_context(method))
+        atexit.register(_pool.shutdown, cancel_futures=True)
+    return _pool
+
+
+def chunked(items, size=CHUNK_FILES):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def imap_chunks(func, items, *args, parallel=None):
+    # Yields func(chunk, *args) for each chunk of `items`, in order. At most
+    # two chunks per worker are in flight, so memory stays bounded however
+    # many files there are.
+    items = list(items)
+    if parallel is None:
+        parallel = WORKERS > 1 and len(items) >= PARALLEL_MIN_FILES
+    if not parallel:
+        for chunk in chunked(items):
+            yield func(chunk, *args)
+        return
+
+    executor = pool()
+    pending = deque()
+    chunks = iter(chunked(items))
+    # the pool processes count their reads for the measured operation here
+    get = counted_result if perf.enabled() else lambda future: future.result()
+    if perf.enabled():
+        func, args = counted, (func, *args)
+    try:
+        for chunk in chunks:
+            pending.append(executor.submit(func, chunk, *args))
+            if len(pending) >= 2 * WORKERS:
+                yield get(pending.popleft())
+        while pending:
+            yield get(pending.popleft())
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def counted(chunk, func, *args):
+    with perf.counting() as sample:
+        result = func(chunk, *args)
+    return result, sample.files, sample.bytes
+
+
+def counted_result(future):
+    result, files, nbytes = future.result()
+    perf.read(nbytes, files)
+    return result
+
+
+def read_chunk(paths):
+    # [path] -> [(path, [lines])]
+    results = []
+    for path in paths:
+        with io.TextIOWrapper(open_note(path), encoding="utf-8", errors="replace") as f:
+            results.append((path, f.readlines()))
+            perf.read(f.buffer.tell())
+    return results
@@ -0,0 +1,345 @@
+import datetime
+import json
+import os
+import shutil
+import sys
+import tempfile
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from smartnotes.index import DATE_RE
+from smartnotes.journal import Conflict
+
+# ---------------------------------------------------
+# Notes server: one notebook shared over HTTP/JSON
+# ---------------------------------------------------
+#   python -m smartnotes serve --port 8765          # --host 0.0.0.0 to share it
+#   SMART_NOTEBOOK_SERVER=http://host:8765 python smart_notebook.py
+#
+# A single Notebook behind a threaded HTTP/1.1 server (keep-alive, so a
+# client reuses its connections). Every write goes through the notebook's
+# journal, so adds from concurrent requests are committed together, one
+# fsync per batch, and rewrites are ordered with them. Edits carry the
+# version of the file they were made on and are refused (409) if someone
+# changed it since. With --store sqlite, queries run on a pool of read
+# connections next to the one writer.
+#
+#   GET  /api/health                         {"categories": [...]}
+#   POST /api/notes     {"text" | "texts", "category", "when"}   -> {"path"}
+#   GET  /api/search    ?q=&category=&date=&scan=1 | &rank=1&k=20
+#   GET  /api/similar   ?path=&line=&k=
+#   GET  /api/today     ?category=
+#   GET  /api/days      ?from=&to=&category=
+#   GET  /api/calendar  ?from=&to=&category=
+#   GET  /api/stats     ?top=&category=
+#   GET  /api/export    ?format=txt|jsonl|md|csv&category=   (the file itself)
+#   GET  /api/files     ?category=                            {"files": [...]}
+#   GET  /api/file      ?path=                                {"text", "version"}
+#   PUT  /api/file      {"path", "text", "version"}           -> {"version"}
+#   PUT  /api/line      {"path", "line", "text", "version"}   -> {"version"}
+#                       (no "text" takes the line out)
+#
+# Paths are relative to notes/ ("school/2026-03-02_notes.txt"). Errors are
+# {"error": message} with 400, 404 or 409, or 500 for a failure in the
+# server itself, which is logged to stderr with its traceback.
+
+DEFAULT_PORT = 8765
+MAX_BODY = 16 << 20
+EXPORT_TYPES = {"txt": "text/plain; charset=utf-8", "jsonl": "application/x-ndjson",
+                "md": "text/markdown; charset=utf-8", "csv": "text/csv; charset=utf-8"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+class NotesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "SmartNotes"
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def dispatch(self, method):
+        url = urlsplit(self.path)
+        route = ROUTES.get((method, url.path))
+        try:
+            body = self.read_body()
+            if route is None:
+                raise HTTPError(404, f"no {method} {url.path}")
+            result = route(self.server, Request(parse_qs(url.query), body))
+        except HTTPError as e:
+            return self.send_json({"error": str(e), **e.extra}, e.status)
+        except Conflict as e:
+            return self.send_json({"error": str(e)}, 409)
+        except FileNotFoundError as e:
+            return self.send_json({"error": f"not found: {e.filename or e}"}, 404)
+        except (ValueError, KeyError) as e:
+            return self.send_json({"error": str(e)}, 400)
+        except Exception:
+            # a bug rather than a bad request: logged whatever --verbose says,
+            # and the client still gets an answer on its connection
+            sys.stderr.write(f"[{self.log_date_time_string()}] {method} {self.path} failed\n"
+                             f"{traceback.format_exc()}")
+            return self.send_json({"error": "internal server error"}, 500)
+        if isinstance(result, Download):
+            return self.send_file(result)
+        self.send_json(result)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            self.close_connection = True
+            raise HTTPError(400, "request too large")
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            raise HTTPError(400, "body is not a JSON object")
+        return body
+
+    def send_json(self, data, status=200):
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_file(self, download):
+        try:
+            with open(download.path, "rb") as f:
+                self.send_response(200)
+                self.send_header("Content-Type", download.content_type)
+                self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+                self.end_headers()
+                shutil.copyfileobj(f, self.wfile)
+        finally:
+            download.cleanup()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class Request:
+    def __init__(self, query, body):
+        self.query = query
+        self.body = body
+
+    def get(self, name, default=None):
+        values = self.query.get(name)
+        return values[-1] if values else self.body.get(name, default)
+
+    def get_str(self, name, default=None):
+        value = self.get(name, default)
+        if value is not None and not isinstance(value, str):
+            raise HTTPError(400, f"{name} must be a string")
+        return value
+
+    def get_list(self, name):
+        # ?category=a&category=b, or a JSON string or list of strings
+        values = self.query.get(name) or self.body.get(name) or None
+        if isinstance(values, str):
+            return [values]
+        if values is not None and not (isinstance(values, list) and all(isinstance(v, str) for v in values)):
+            raise HTTPError(400, f"{name} must be a string or a list of strings")
+        return values
+
+    def get_int(self, name, default):
+        value = self.get(name)
+        try:
+            return default if value in (None, "") else int(value)
+        except (TypeError, ValueError):
+            raise HTTPError(400, f"{name} must be a number") from None
+
+    def require(self, name):
+        value = self.get_str(name)
+        if value in (None, ""):
+            raise HTTPError(400, f"missing {name}")
+        return value
+
+
+class Download:
+    # a temporary file to send back, removed once sent
+    def __init__(self, folder, path, content_type):
+        self.folder = folder
+        self.path = path
+        self.content_type = content_type
+
+    def cleanup(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+
+class NotesServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, notebook, verbose=False):
+        super().__init__(address, NotesHandler)
+        self.notebook = notebook
+        self.verbose = verbose
+
+    def note_path(self, rel):
+        # "school/2026-03-02_notes.txt" -> its path under notes/; nothing else
+        category, _, name = rel.rpartition("/")
+        if category not in self.notebook.categories or not DATE_RE.fullmatch(name):
+            raise HTTPError(400, f"not a day file: {rel!r}")
+        return os.path.join(self.notebook.notes_dir, category, name)
+
+    def categories(self, req):
+        categories = req.get_list("category")
+        for cat in categories or ():
+            if cat not in self.notebook.categories:
+                raise HTTPError(400, f"unknown category {cat!r}")
+        return categories
+
+
+# ---------------------------------------------------
+# Routes
+# ---------------------------------------------------
+def health(server, req):
+    return {"categories": server.notebook.categories}
+
+
+def add(server, req):
+    texts = req.get("texts")
+    if texts is None:
+        texts = [req.require("text")]
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        raise HTTPError(400, "texts must be a list of strings")
+    when = req.get_str("when")
+    when = datetime.datetime.fromisoformat(when) if when else None
+    path = server.notebook.add_notes([t for t in texts if t], req.get_str("category"), when)
+    if path is None:
+        raise HTTPError(400, "nothing to add")
+    return {"path": os.path.relpath(path, server.notebook.notes_dir).replace(os.sep, "/")}
+
+
+def search(server, req):
+    categories = server.categories(req)
+    if req.get("rank"):
+        results = server.notebook.ranked(req.require("q"), categories, req.get_str("date"), req.get_int("k", 20))
+        return {"results": [list(r) for r in results]}
+    results = server.notebook.search(req.require("q"), categories, req.get_str("date"), bool(req.get("scan")))
+    return {"results": [list(r) for r in results]}
+
+
+def similar(server, req):
+    rel = req.require("path")
+    server.note_path(rel)
+    results = server.notebook.similar(rel, req.get_int("line", 0), req.get_int("k", 10),
+                                      server.categories(req))
+    return {"results": [list(r) for r in results]}
+
+
+def today(server, req):
+    return {"results": [list(r) for r in server.notebook.today(server.categories(req))]}
+
+
+def days(server, req):
+    results = server.notebook.days(req.require("from"), req.require("to"), server.categories(req))
+    return {"results": [list(r) for r in results]}
+
+
+def calendar(server, req):
+    return {"days": server.notebook.rollup(req.require("from"), req.require("to"), server.categories(req))}
+
+
+def stats(server, req):
+    return server.notebook.summary(server.categories(req), top=req.get_int("top", 10))
+
+
+def export(server, req):
+    fmt = req.get_str("format") or "txt"
+    if fmt not in EXPORT_TYPES:
+        raise HTTPError(400, f"unknown format {fmt!r}")
+    folder = tempfile.mkdtemp(prefix="smartnotes-export-")
+    path = os.path.join(folder, f"all_notes.{fmt}")
+    try:
+        server.notebook.export({path: fmt}, server.categories(req))
+    except BaseException:
+        shutil.rmtree(folder, ignore_errors=True)
+        raise
+    return Download(folder, path, EXPORT_TYPES[fmt])
+
+
+def files(server, req):
+    return {"files": server.notebook.list_files(req.require("category"))}
+
+
+def read_file(server, req):
+    text, version = server.notebook.read_file(server.note_path(req.require("path")))
+    return {"text": text, "version": version}
+
+
+def write_file(server, req):
+    path = server.note_path(req.require("path"))
+    text = req.get("text")
+    if not isinstance(text, str):
+        raise HTTPError(400, "text must be a string")
+    try:
+        version = server.notebook.edit_file(path, text, req.get_str("version"))
+    except Conflict as e:
+        # with the version that is there now, so the client can reload
+        raise HTTPError(409, str(e), version=server.notebook.read_file(path)[1]) from None
+    return {"version": version}
+
+
+def write_line(server, req):
+    path = server.note_path(req.require("path"))
+    line = req.get_int("line", None)
+    if line is None:
+        raise HTTPError(400, "missing line")
+    text = req.get_str("text")
+    version = req.get_str("version")
+    try:
+        if text is None:
+            version = server.notebook.delete_line(path, line, version)
+        else:
+            version = server.notebook.edit_line(path, line, text, version)
+    except Conflict as e:
+        raise HTTPError(409, str(e), version=server.notebook.read_file(path)[1]) from None
+    except IndexError as e:
+        raise HTTPError(400, str(e)) from None
+    return {"version": version}
+
+
+ROUTES = {
+    ("GET", "/api/health"): health,
+    ("POST", "/api/notes"): add,
+    ("GET", "/api/search"): search,
+    ("GET", "/api/similar"): similar,
+    ("GET", "/api/today"): today,
+    ("GET", "/api/days"): days,
+    ("GET", "/api/calendar"): calendar,
+    ("GET", "/api/stats"): stats,
+    ("GET", "/api/export"): export,
+    ("GET", "/api/files"): files,
+    ("GET", "/api/file"): read_file,
+    ("PUT", "/api/file"): write_file,
+    ("PUT", "/api/line"): write_line,
+}
+
+
+def serve(notebook, host="127.0.0.1", port=DEFAULT_PORT, verbose=False, ready=None):
+    # Runs until interrupted; ready(server) is called once it listens
+    server = NotesServer((host, port), notebook, verbose)
+    if ready is not None:
+        ready(server)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
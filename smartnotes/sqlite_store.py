@@ -0,0 +1,319 @@
+import contextlib
+import queue
+import sqlite3
+import threading
+from collections import Counter
+
+from smartnotes.export import parse_line
+from smartnotes.stats import count_words, take
+from smartnotes.store import format_record, tree_records, write_day_file
+
+# ---------------------------------------------------
+# SQLite note store
+# ---------------------------------------------------
+# One row per note with indexed category/date columns, plus an FTS5
+# trigram table over the note text kept in step by triggers: a keyword
+# matches anywhere in a note ("ilk" finds "milk"), as it does in the files,
+# and the trigrams narrow the notes down before any text is compared. The
+# trigram tokenizer needs SQLite 3.34 or newer. The database runs in WAL
+# mode so readers never wait on the writer: writes go through the one
+# connection under the store's lock, queries through a small pool of read
+# connections, so concurrent searches (the notes server) don't queue on it.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    cat TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL DEFAULT '',
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_date ON notes (date);
+CREATE INDEX IF NOT EXISTS notes_cat_date ON notes (cat, date);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_tri USING fts5 (
+    text, content='notes', content_rowid='id', tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS notes_tri_ai AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_tri (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_tri_ad AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_tri (notes_tri, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_tri_au AFTER UPDATE OF text ON notes BEGIN
+    INSERT INTO notes_tri (notes_tri, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO notes_tri (rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+# the word index earlier versions kept; dropped when such a database is opened
+OLD_SCHEMA = """
+DROP TRIGGER IF EXISTS notes_ai;
+DROP TRIGGER IF EXISTS notes_ad;
+DROP TRIGGER IF EXISTS notes_au;
+DROP TABLE IF EXISTS notes_vocab;
+DROP TABLE IF EXISTS notes_fts;
+"""
+
+# read connections kept open; more are opened (and closed) under load
+READERS = 4
+# trigram queries need this many characters; shorter keywords are compared
+# against every note
+TRIGRAM = 3
+
+
+def fts_query(keyword):
+    # "buy mil" -> '"buy mil"': the keyword as one string, anywhere in a note
+    return '"' + keyword.replace('"', '""') + '"'
+
+
+def in_clause(column, values):
+    return f"{column} IN ({', '.join('?' * len(values))})", list(values)
+
+
+class SQLiteStore:
+    def __init__(self, path="notes/.notebook.db"):
+        self.path = path
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        built = self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'notes_tri'").fetchone()
+        self.db.executescript(OLD_SCHEMA + SCHEMA)
+        if not built:
+            # a new database, or one from before the trigram index
+            with self.db:
+                self.db.execute("INSERT INTO notes_tri (notes_tri) VALUES ('rebuild')")
+        # per-category word counts for stats(), see _words()
+        self.words = {}
+        self.readers = queue.LifoQueue()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+        while not self.readers.empty():
+            self.readers.get_nowait().close()
+
+    @contextlib.contextmanager
+    def reader(self):
+        # a pooled read-only connection
+        try:
+            conn = self.readers.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA query_only=ON")
+        try:
+            yield conn
+        finally:
+            if self.readers.qsize() < READERS:
+                self.readers.put(conn)
+            else:
+                conn.close()
+
+    # self.db is shared by the server's threads: reads on it take the lock
+    # as writes do (queries that may run beside writes use reader())
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT count(*) FROM notes").fetchone()[0]
+
+    def __iter__(self):
+        with self.lock:
+            rows = self.db.execute("SELECT * FROM notes ORDER BY id").fetchall()
+        for row in rows:
+            yield dict(row)
+
+    # ---------------------------------------------------
+    # Records
+    # ---------------------------------------------------
+    def add(self, category, text, date, time=""):
+        with self.lock:
+            with self.db:
+                cur = self.db.execute("INSERT INTO notes (cat, date, time, text) VALUES (?, ?, ?, ?)",
+                                      (category, date, time, text))
+            self._count([{"cat": category, "time": time, "text": text}], 1)
+            return cur.lastrowid
+
+    def add_many(self, records):
+        # records: [{"cat", "date", "time", "text"}], in one transaction
+        records = list(records)
+        with self.lock:
+            with self.db:
+                cur = self.db.executemany(
+                    "INSERT INTO notes (cat, date, time, text) VALUES (:cat, :date, :time, :text)", records)
+            self._count(records, 1)
+        return cur.rowcount
+
+    def get(self, note_id):
+        with self.lock:
+            row = self.db.execute("SELECT * FROM notes WHERE id = ?", (note_id,)).fetchone()
+        return dict(row) if row else None
+
+    def update(self, note_id, text, time=None):
+        with self.lock:
+            old = self.get(note_id)
+            if old is None:
+                raise KeyError(note_id)
+            with self.db:
+                self.db.execute("UPDATE notes SET text = ?, time = coalesce(?, time) WHERE id = ?",
+                                (text, time, note_id))
+            self._count([old], -1)
+            self._count([{**old, "text": text, "time": old["time"] if time is None else time}], 1)
+
+    def delete(self, note_id):
+        with self.lock:
+            old = self.get(note_id)
+            if old is None:
+                raise KeyError(note_id)
+            with self.db:
+                self.db.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+            self._count([old], -1)
+
+    def day_notes(self, date, category=None):
+        sql = "SELECT * FROM notes WHERE date = ?"
+        args = [date]
+        if category is not None:
+            sql += " AND cat = ?"
+            args.append(category)
+        with self.lock:
+            rows = self.db.execute(sql + " ORDER BY id", args).fetchall()
+        return [dict(row) for row in rows]
+
+    def replace_day(self, category, date, lines):
+        lines = [parse_line(line) for line in lines if line.strip()]
+        with self.lock:
+            records = self.day_notes(date, category)
+            with self.db:
+                for i, (time, text) in enumerate(lines):
+                    if i >= len(records):
+                        self.db.execute("INSERT INTO notes (cat, date, time, text) VALUES (?, ?, ?, ?)",
+                                        (category, date, time, text))
+                    elif (records[i]["time"], records[i]["text"]) != (time, text):
+                        self.db.execute("UPDATE notes SET text = ?, time = ? WHERE id = ?",
+                                        (text, time, records[i]["id"]))
+                self.db.executemany("DELETE FROM notes WHERE id = ?",
+                                    [(r["id"],) for r in records[len(lines):]])
+            self._count(records, -1)
+            self._count([{"cat": category, "time": time, "text": text} for time, text in lines], 1)
+
+    def write_day(self, notes_dir, category, date):
+        return write_day_file(notes_dir, category, date, self.day_notes(date, category))
+
+    # ---------------------------------------------------
+    # Migration
+    # ---------------------------------------------------
+    def import_tree(self, notes_dir, categories=None):
+        # One transaction for the whole notes/ tree
+        with self.lock:
+            with self.db:
+                cur = self.db.executemany(
+                    "INSERT INTO notes (cat, date, time, text) VALUES (:cat, :date, :time, :text)",
+                    tree_records(notes_dir, categories))
+                self.db.execute("INSERT INTO notes_tri (notes_tri) VALUES ('optimize')")
+            self.words.clear()
+        return cur.rowcount
+
+    # ---------------------------------------------------
+    # Queries
+    # ---------------------------------------------------
+    def _filters(self, categories=None, date=None, date_from=None, date_to=None):
+        where, args = [], []
+        if categories is not None:
+            sql, values = in_clause("notes.cat", categories)
+            where.append(sql)
+            args += values
+        if date:
+            if len(date) == 10:
+                where.append("notes.date = ?")
+                args.append(date)
+            else:
+                where.append("notes.date LIKE ?")
+                args.append(f"%{date}%")
+        if date_from:
+            where.append("notes.date >= ?")
+            args.append(date_from)
+        if date_to:
+            where.append("notes.date <= ?")
+            args.append(date_to)
+        return where, args
+
+    def search(self, keyword, categories=None, date=None, date_from=None, date_to=None,
+               limit=None):
+        # Notes containing keyword (any case), best bm25 match first
+        where, args = self._filters(categories, date, date_from, date_to)
+        if len(keyword) >= TRIGRAM:
+            sql = ("SELECT notes.* FROM notes_tri JOIN notes ON notes.id = notes_tri.rowid "
+                   "WHERE notes_tri MATCH ?")
+            args.insert(0, fts_query(keyword))
+            order = "bm25(notes_tri), notes.date DESC, notes.id"
+        else:
+            sql = "SELECT notes.* FROM notes WHERE instr(lower(text), lower(?)) > 0"
+            args.insert(0, keyword)
+            order = "notes.date DESC, notes.id"
+        for clause in where:
+            sql += f" AND {clause}"
+        sql += f" ORDER BY {order}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self.reader() as conn:
+            return [dict(row) for row in conn.execute(sql, args)]
+
+    def notes(self, categories=None, date=None, date_from=None, date_to=None):
+        # Cursor over matching notes in category/date order. It streams from
+        # its own read connection, so a long export never holds up writes.
+        where, args = self._filters(categories, date, date_from, date_to)
+        sql = "SELECT * FROM notes"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self.reader() as conn:
+            for row in conn.execute(sql + " ORDER BY cat, date, id", args):
+                yield dict(row)
+
+    def stats(self, categories=None, top=10):
+        with self.reader() as conn:
+            return self._stats(conn, categories, top)
+
+    def _stats(self, conn, categories, top):
+        where, args = self._filters(categories)
+        where = (" WHERE " + " AND ".join(where)) if where else ""
+        per_category = dict(conn.execute(
+            f"SELECT cat, count(*) FROM notes{where} GROUP BY cat", args).fetchall())
+        per_day = dict(conn.execute(
+            f"SELECT date, count(*) FROM notes{where} GROUP BY date ORDER BY date", args).fetchall())
+        words = Counter()
+        with self.lock:
+            for cat in categories or per_category:
+                words.update(self._words(cat))
+        top_words = words.most_common(top)
+        return {
+            "total_notes": sum(per_category.values()),
+            "most_used": top_words[0][0] if top_words else None,
+            "top_words": top_words,
+            "per_category": {cat: per_category.get(cat, 0) for cat in (categories or per_category)},
+            "per_day": per_day,
+        }
+
+    def _words(self, category):
+        # A category's word counts, taken as NoteStats takes them
+        # (count_words() over each note as its line reads in the file).
+        # Counted once, then kept up to date by every write; the caller
+        # holds the lock.
+        words = self.words.get(category)
+        if words is None:
+            words = self.words[category] = Counter()
+            for row in self.db.execute("SELECT time, text FROM notes WHERE cat = ?", (category,)):
+                words.update(count_words(format_record(row)))
+        return words
+
+    def _count(self, records, sign):
+        # records added (sign 1) or taken out (-1) of the word counts
+        for r in records:
+            words = self.words.get(r["cat"])
+            if words is not None:
+                counts = count_words(format_record(r))
+                if sign > 0:
+                    words.update(counts)
+                else:
+                    take(words, counts)
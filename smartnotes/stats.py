@@ -0,0 +1,181 @@
+import io
+import json
+import os
+import threading
+from collections import Counter
+
+from smartnotes import perf
+from smartnotes.archive import fstat, open_note, stat_note
+from smartnotes.index import DATE_RE, note_files
+from smartnotes.scan import imap_chunks
+
+# ---------------------------------------------------
+# Cached notebook statistics
+# ---------------------------------------------------
+# Every note file keeps its own line count and word Counter, tagged with
+# the mtime/size it was read at. Running totals per category are kept in
+# step as files change, so a summary never has to touch the disk.
+
+STATS_NAME = ".stats.json"
+STATS_VERSION = 1
+
+
+def count_words(line):
+    words = Counter()
+    for word in line.split():
+        word = word.strip("#.,!?").lower()
+        if word:
+            words[word] += 1
+    return words
+
+
+def read_counts(path):
+    words = Counter()
+    lines = 0
+    with io.TextIOWrapper(open_note(path), encoding="utf-8", errors="replace") as f:
+        st = fstat(f.buffer)
+        for line in f:
+            lines += 1
+            words.update(count_words(line))
+    perf.read(st.st_size)
+    return lines, dict(words), st.st_mtime_ns, st.st_size
+
+
+def count_chunk(rels, notes_dir):
+    return [(rel, read_counts(os.path.join(notes_dir, rel))) for rel in rels]
+
+
+def take(counter, counts):
+    # Counter.subtract() without leaving zero entries behind
+    for key, n in counts.items():
+        left = counter[key] - n
+        if left > 0:
+            counter[key] = left
+        else:
+            counter.pop(key, None)
+
+
+class NoteStats:
+    def __init__(self, notes_dir="notes", path=None):
+        self.notes_dir = notes_dir
+        self.path = path or os.path.join(notes_dir, STATS_NAME)
+        self.files = {}
+        self.words = {}
+        self.lines = Counter()
+        self.days = {}
+        self.dirty = False
+        self.lock = threading.RLock()
+        self.load()
+        self.refresh()
+
+    # ---------------------------------------------------
+    # Persistence
+    # ---------------------------------------------------
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != STATS_VERSION:
+            return
+        self.files = data["files"]
+        for meta in self.files.values():
+            self._add(meta)
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = self.path + ".tmp"
+        # written and marked clean under the lock, so an update made while
+        # saving is never marked clean without being written
+        with self.lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": STATS_VERSION, "files": self.files}, f,
+                          separators=(",", ":"))
+            os.replace(tmp, self.path)
+            self.dirty = False
+
+    # ---------------------------------------------------
+    # Keeping the cache in sync
+    # ---------------------------------------------------
+    def refresh(self):
+        seen = set()
+        changed = []
+        with self.lock:
+            for rel, cat, entry in note_files(self.notes_dir):
+                seen.add(rel)
+                st = entry.stat()
+                meta = self.files.get(rel)
+                if meta is None or meta["mtime"] != st.st_mtime_ns or meta["size"] != st.st_size:
+                    changed.append(rel)
+            for rel in list(self.files):
+                if rel not in seen:
+                    self._drop(rel)
+            for results in imap_chunks(count_chunk, changed, self.notes_dir):
+                for rel, counts in results:
+                    self._store(rel, rel.rpartition("/")[0], *counts)
+
+    def update_file(self, path):
+        rel = os.path.relpath(path, self.notes_dir).replace(os.sep, "/")
+        with self.lock:
+            try:
+                st = stat_note(path)
+            except FileNotFoundError:
+                if rel in self.files:
+                    self._drop(rel)
+                return
+            meta = self.files.get(rel)
+            if meta is None or meta["mtime"] != st.st_mtime_ns or meta["size"] != st.st_size:
+                self._read(rel, rel.rpartition("/")[0])
+
+    def _read(self, rel, cat):
+        self._store(rel, cat, *read_counts(os.path.join(self.notes_dir, rel)))
+
+    def _store(self, rel, cat, lines, words, mtime, size):
+        if rel in self.files:
+            self._drop(rel)
+        m = DATE_RE.search(rel)
+        meta = {"category": cat, "date": m.group(1) if m else None,
+                "mtime": mtime, "size": size, "lines": lines, "words": words}
+        self.files[rel] = meta
+        self._add(meta)
+        self.dirty = True
+
+    def _drop(self, rel):
+        meta = self.files.pop(rel)
+        cat = meta["category"]
+        take(self.words[cat], meta["words"])
+        self.lines[cat] -= meta["lines"]
+        if meta["date"]:
+            take(self.days[cat], {meta["date"]: meta["lines"]})
+        self.dirty = True
+
+    def _add(self, meta):
+        cat = meta["category"]
+        self.words.setdefault(cat, Counter()).update(meta["words"])
+        self.lines[cat] += meta["lines"]
+        if meta["date"]:
+            self.days.setdefault(cat, Counter())[meta["date"]] += meta["lines"]
+
+    # ---------------------------------------------------
+    # Results
+    # ---------------------------------------------------
+    def summary(self, categories=None, top=10):
+        if categories is None:
+            categories = sorted(self.lines)
+        words = Counter()
+        per_day = Counter()
+        with self.lock:
+            for cat in categories:
+                words.update(self.words.get(cat, {}))
+                per_day.update(self.days.get(cat, {}))
+            per_category = {cat: self.lines[cat] for cat in categories}
+        top_words = words.most_common(top)
+        return {
+            "total_notes": sum(per_category.values()),
+            "most_used": top_words[0][0] if top_words else None,
+            "top_words": top_words,
+            "per_category": per_category,
+            "per_day": dict(sorted(per_day.items())),
+        }
@@ -0,0 +1,40 @@
+import io
+import os
+
+from smartnotes.archive import open_note
+from smartnotes.export import parse_line
+from smartnotes.index import DATE_RE, note_files
+from smartnotes.journal import replace_file
+
+# ---------------------------------------------------
+# Day-file layout helpers for note records
+# ---------------------------------------------------
+# A record is one note, {"cat", "date", "time", "text"}, as the SQLite
+# store (smartnotes.sqlite_store) keeps them; these turn day files into
+# records and records back into day files.
+
+
+def format_record(record):
+    return f"[{record['time']}] {record['text']}" if record["time"] else record["text"]
+
+
+def tree_records(notes_dir, categories=None):
+    # Records for notes/<category>/<date>_notes.txt (and flat notes/*.txt)
+    for rel, cat, entry in sorted(note_files(notes_dir), key=lambda f: f[0]):
+        m = DATE_RE.search(rel)
+        if not m or (categories is not None and cat not in categories):
+            continue
+        with io.TextIOWrapper(open_note(entry.path), encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if line.strip():
+                    time, text = parse_line(line)
+                    yield {"cat": cat, "date": m.group(1), "time": time, "text": text}
+
+
+def write_day_file(notes_dir, category, date, records):
+    # Atomically rewrites one day file; returns its path
+    folder = os.path.join(notes_dir, category) if category else notes_dir
+    path = os.path.join(folder, f"{date}_notes.txt")
+    os.makedirs(folder, exist_ok=True)
+    replace_file(path, "".join(format_record(record) + "\n" for record in records))
+    return path
@@ -0,0 +1,219 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import threading
+
+from smartnotes.index import note_files
+
+# ---------------------------------------------------
+# Change tracking for the notes/ tree
+# ---------------------------------------------------
+# Emits ("added" | "modified" | "deleted", relpath) events for note files,
+# including edits made outside the app. On Linux the kernel reports
+# changes through inotify, so a tick costs only as much as what changed;
+# elsewhere (or if inotify is unavailable) the tree is polled with an
+# os.scandir mtime/size snapshot and diffed.
+#
+#   watcher = NotesWatcher("notes", interval=1000)
+#   watcher.subscribe(callback)   # callback(events) with a list of events
+#   watcher.attach(root)          # tick from the Tk loop, or start() a thread
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_Q_OVERFLOW = 0x4000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT = struct.Struct("iIII")
+
+
+def snapshot(notes_dir):
+    files = {}
+    for rel, cat, entry in note_files(notes_dir):
+        st = entry.stat()
+        files[rel] = (st.st_mtime_ns, st.st_size)
+    return files
+
+
+def diff(old, new):
+    # events turning snapshot old into snapshot new
+    events = []
+    for rel, sig in new.items():
+        if rel not in old:
+            events.append(("added", rel))
+        elif old[rel] != sig:
+            events.append(("modified", rel))
+    events += [("deleted", rel) for rel in old if rel not in new]
+    return events
+
+
+def is_note(name):
+    return name.endswith(".txt") and not name.startswith(".")
+
+
+class PollingBackend:
+    def __init__(self, notes_dir):
+        self.notes_dir = notes_dir
+        self.files = snapshot(notes_dir)
+
+    def changes(self):
+        current = snapshot(self.notes_dir)
+        events = diff(self.files, current)
+        self.files = current
+        return events
+
+    def close(self):
+        pass
+
+
+class InotifyBackend:
+    def __init__(self, notes_dir):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.libc = libc
+        self.notes_dir = notes_dir
+        self.fd = libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.folders = {}
+        try:
+            self.files = snapshot(notes_dir)
+            self._watch_all()
+        except BaseException:
+            os.close(self.fd)
+            raise
+
+    def _watch_all(self):
+        # notes/ and each category folder in it not watched yet
+        watched = set(self.folders.values())
+        for folder in [""] + [entry.name for entry in os.scandir(self.notes_dir)
+                              if entry.is_dir() and not entry.name.startswith(".")]:
+            if folder not in watched:
+                self._watch(folder)
+
+    def _watch(self, folder):
+        path = os.path.join(self.notes_dir, folder) if folder else self.notes_dir
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self.folders[wd] = folder
+
+    def changes(self):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        # a new file is reported as created, then written: "added" once
+        added = set()
+        pos = 0
+        while pos < len(data):
+            wd, mask, cookie, length = EVENT.unpack_from(data, pos)
+            name = os.fsdecode(data[pos + EVENT.size:pos + EVENT.size + length].rstrip(b"\0"))
+            pos += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                # the kernel dropped events: compare the whole tree instead
+                events += self.rescan()
+                break
+            folder = self.folders.get(wd)
+            if folder is None or not name:
+                continue
+            if mask & IN_ISDIR:
+                # a new category folder appeared; only one level is watched
+                if not folder and mask & (IN_CREATE | IN_MOVED_TO) and not name.startswith("."):
+                    self._watch(name)
+                continue
+            if not is_note(name):
+                continue
+            rel = f"{folder}/{name}" if folder else name
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self.files.pop(rel, None)
+                added.discard(rel)
+                events.append(("deleted", rel))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE):
+                if rel in self.files and rel not in added:
+                    events.append(("modified", rel))
+                else:
+                    events.append(("added", rel))
+                    added.add(rel)
+                try:
+                    st = os.stat(os.path.join(self.notes_dir, folder, name))
+                except FileNotFoundError:
+                    continue
+                self.files[rel] = (st.st_mtime_ns, st.st_size)
+        # the same file is often reported several times per write
+        return list(dict.fromkeys(events))
+
+    def rescan(self):
+        # drain what is left of the queue, then diff against the tree
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        self._watch_all()
+        current = snapshot(self.notes_dir)
+        events = diff(self.files, current)
+        self.files = current
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class NotesWatcher:
+    def __init__(self, notes_dir="notes", interval=1000, backend=None):
+        # interval: milliseconds between checks; larger means less CPU
+        self.notes_dir = notes_dir
+        self.interval = interval
+        self.subscribers = []
+        self.stopped = threading.Event()
+        if backend is None:
+            backend = "inotify" if sys.platform.startswith("linux") else "poll"
+        if backend == "inotify":
+            try:
+                self.backend = InotifyBackend(notes_dir)
+            except (OSError, AttributeError):
+                self.backend = PollingBackend(notes_dir)
+        else:
+            self.backend = PollingBackend(notes_dir)
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def check(self):
+        events = self.backend.changes()
+        if events:
+            for callback in list(self.subscribers):
+                callback(events)
+        return events
+
+    def attach(self, root):
+        # Checks from the Tk event loop, so subscribers may touch widgets
+        def tick():
+            if self.stopped.is_set():
+                return
+            self.check()
+            root.after(self.interval, tick)
+        root.after(self.interval, tick)
+
+    def start(self):
+        # Checks from a daemon thread instead (headless use)
+        def run():
+            while not self.stopped.wait(self.interval / 1000):
+                self.check()
+        threading.Thread(target=run, daemon=True).start()
+
+    def stop(self):
+        if not self.stopped.is_set():
+            self.stopped.set()
+            self.backend.close()
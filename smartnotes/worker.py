@@ -0,0 +1,123 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------------------------------------------------
+# Background jobs for the Tk apps
+# ---------------------------------------------------
+# Disk work runs on a small thread pool. A job talks back only through its
+# event queue, which the Tk thread drains with root.after(), so widgets
+# are never touched from a worker thread.
+#
+#   def task(job, *args):
+#       for thing in work:
+#           job.emit(thing)         # streamed to on_items in batches
+#           job.progress(i, total)  # to on_progress
+#       return result               # to on_done
+#
+# emit() and progress() raise Cancelled once job.cancel() was called, so
+# tasks stop at their next step without checking a flag themselves.
+
+POLL_MS = 30
+EVENTS_PER_POLL = 2000
+# a task more than this many events ahead of the UI waits for it
+QUEUE_SIZE = 20000
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self):
+        self.events = queue.Queue(QUEUE_SIZE)
+        self.cancelled = threading.Event()
+        self.future = None
+
+    def emit(self, item):
+        self._put(("item", item))
+
+    def progress(self, done, total):
+        self._put(("progress", (done, total)))
+
+    def _put(self, event):
+        while True:
+            if self.cancelled.is_set():
+                raise Cancelled
+            try:
+                self.events.put(event, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def finish(self, kind, value):
+        # "done" or "error"; dropped if the job was cancelled, since the
+        # queue is no longer drained then
+        try:
+            self._put((kind, value))
+        except Cancelled:
+            pass
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def running(self):
+        return self.future is not None and not self.future.done()
+
+
+class Worker:
+    def __init__(self, root, max_workers=2):
+        self.root = root
+        self.pool = ThreadPoolExecutor(max_workers, thread_name_prefix="smartnotes")
+
+    def submit(self, task, *args, on_items=None, on_progress=None, on_done=None, on_error=None):
+        job = Job()
+
+        def run():
+            try:
+                result = task(job, *args)
+            except Cancelled:
+                pass
+            except Exception as e:
+                job.finish("error", e)
+            else:
+                job.finish("done", result)
+
+        job.future = self.pool.submit(run)
+        handlers = {"item": on_items, "progress": on_progress, "done": on_done, "error": on_error}
+        self.root.after(POLL_MS, self._poll, job, handlers)
+        return job
+
+    def _poll(self, job, handlers):
+        if job.cancelled.is_set():
+            return
+        # Items and progress are coalesced per tick: one on_items call with
+        # everything that arrived, then only the latest progress value.
+        items = []
+        progress = None
+        final = None
+        for _ in range(EVENTS_PER_POLL):
+            try:
+                kind, value = job.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "item":
+                items.append(value)
+            elif kind == "progress":
+                progress = value
+            else:
+                final = (kind, value)
+                break
+        if items and handlers["item"]:
+            handlers["item"](items)
+        if progress is not None and handlers["progress"]:
+            handlers["progress"](progress)
+        if final is None:
+            self.root.after(POLL_MS, self._poll, job, handlers)
+        elif handlers[final[0]]:
+            handlers[final[0]](final[1])
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
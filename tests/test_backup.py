@@ -0,0 +1,79 @@
+import os
+import threading
+
+import pytest
+
+from smartnotes.backup import BackupStore
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def read_tree(folder):
+    tree = {}
+    for dirpath, dirnames, filenames in os.walk(folder):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            with open(path, encoding="utf-8") as f:
+                tree[os.path.relpath(path, folder).replace(os.sep, "/")] = f.read()
+    return tree
+
+
+def objects(store):
+    return sorted(name for dirpath, dirnames, names in os.walk(store.objects_dir) for name in names)
+
+
+def test_restore_rebuilds_every_snapshot(tmp_path):
+    notes = str(tmp_path / "notes")
+    store = BackupStore(str(tmp_path / "backups"))
+    write(os.path.join(notes, "school", "2026-03-02_notes.txt"), "[09:30] exam\n")
+    write(os.path.join(notes, "ideas", "2026-03-02_notes.txt"), "[09:30] exam\n")
+    write(os.path.join(notes, ".index"), "skipped")
+    first = store.backup(notes)
+    # one object for the two identical files, none for dot-files
+    assert len(objects(store)) == 1
+    assert store.backup(notes) == first
+
+    write(os.path.join(notes, "school", "2026-03-02_notes.txt"), "[09:30] exam\n[10:00] revise\n")
+    os.remove(os.path.join(notes, "ideas", "2026-03-02_notes.txt"))
+    second = store.backup(notes)
+    assert store.snapshots() == [first, second]
+
+    assert read_tree(store.restore(first, str(tmp_path / "first"))) == {
+        "school/2026-03-02_notes.txt": "[09:30] exam\n",
+        "ideas/2026-03-02_notes.txt": "[09:30] exam\n",
+    }
+    assert read_tree(store.restore(dest=str(tmp_path / "latest"))) == {
+        "school/2026-03-02_notes.txt": "[09:30] exam\n[10:00] revise\n",
+    }
+    with pytest.raises(ValueError):
+        store.restore("1999-01-01T00-00-00-000000", str(tmp_path / "none"))
+
+
+def test_restore_needs_a_snapshot(tmp_path):
+    with pytest.raises(ValueError):
+        BackupStore(str(tmp_path / "backups")).restore(dest=str(tmp_path / "restored"))
+
+
+def test_backups_side_by_side(tmp_path):
+    store = BackupStore(str(tmp_path / "backups"))
+    folders = []
+    for i in range(4):
+        folder = str(tmp_path / f"notes{i}")
+        for j in range(20):
+            write(os.path.join(folder, f"2026-03-{j + 1:02d}_notes.txt"), f"{i} {j}\n" * (1000 + i))
+        folders.append(folder)
+    names = {}
+    threads = [threading.Thread(target=lambda f=f: names.setdefault(f, store.backup(f))) for f in folders]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(objects(store)) == 80
+    for i, folder in enumerate(folders):
+        manifest = store.manifest(names[folder])
+        restored = read_tree(store.restore(names[folder], str(tmp_path / f"restored{i}")))
+        assert restored == read_tree(folder) and len(manifest) == 20
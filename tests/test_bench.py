@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from smartnotes import bench
+
+
+def tree(folder):
+    files = {}
+    for dirpath, dirnames, names in os.walk(folder):
+        for name in names:
+            with open(os.path.join(dirpath, name), "rb") as f:
+                files[os.path.relpath(os.path.join(dirpath, name), folder)] = f.read()
+    return files
+
+
+@pytest.fixture(scope="module")
+def ctx(tmp_path_factory):
+    work = tmp_path_factory.mktemp("bench")
+    notes = bench.make_corpus(str(work / "notes"), 300, seed=1, years=1)
+    return {"notes": notes, "work": str(work), "db": str(work / "notebook.db"),
+            "backups": str(work / "backups"), "redraws": 1}
+
+
+# ---------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------
+def test_corpus_is_reproducible(tmp_path):
+    first = tree(bench.make_corpus(str(tmp_path / "a"), 200, seed=3, years=1))
+    assert first == tree(bench.make_corpus(str(tmp_path / "b"), 200, seed=3, years=1))
+    assert first != tree(bench.make_corpus(str(tmp_path / "c"), 200, seed=4, years=1))
+    notes = [line for name, data in first.items() if name.endswith(".txt") for line in data.splitlines()]
+    assert len(notes) == 200
+    assert all(line[:1] == b"[" and line[6:8] == b"] " for line in notes)
+
+
+def test_corpus_is_reused_or_rebuilt(tmp_path):
+    notes = bench.make_corpus(str(tmp_path / "notes"), 50, seed=0, years=1)
+    extra = os.path.join(notes, "ideas", "extra.txt")
+    with open(extra, "w", encoding="utf-8") as f:
+        f.write("[09:30] kept\n")
+    bench.make_corpus(notes, 50, seed=0, years=1)
+    assert os.path.exists(extra)
+    bench.make_corpus(notes, 60, seed=0, years=1)
+    assert not os.path.exists(extra)
+
+
+# ---------------------------------------------------
+# Operations
+# ---------------------------------------------------
+@pytest.mark.parametrize("ops", [
+    ["search.scan", "search.grep", "search.index.warm", "search.sqlite"],
+    ["month.scan", "month.dates.warm"],
+    ["stats.scan", "stats.cache.warm", "stats.sqlite"],
+])
+def test_implementations_agree(ctx, ops):
+    results = []
+    for name in ops:
+        if name in bench.PREPARE:
+            bench.PREPARE[name](ctx)
+        results.append(bench.OPS[name](ctx))
+    assert results[0] > 0
+    assert results == [results[0]] * len(ops)
+
+
+def test_backups_cover_the_corpus(ctx):
+    files = sum(1 for cat, file, path in bench.note_paths(ctx["notes"]))
+    bench.PREPARE["backup.full"](ctx)
+    assert bench.OPS["backup.full"](ctx) == files
+    assert bench.OPS["backup.incremental"](ctx) == files
+
+
+def test_bench_run_measures_in_a_child(ctx, tmp_path, capsys):
+    report = bench.bench_run([100], ["search.grep", "stats.cache.cold"], str(tmp_path), repeat=1)
+    assert [(r["op"], r["notes"]) for r in report["results"]] == [("search.grep", 100), ("stats.cache.cold", 100)]
+    assert all(r["seconds"] > 0 and r["result"] > 0 for r in report["results"])
+    assert "search.grep" in capsys.readouterr().out
+
+
+# ---------------------------------------------------
+# Reports
+# ---------------------------------------------------
+def test_compare_flags_slower_operations(capsys):
+    old = {"commit": "a", "results": [{"notes": 100, "op": "search.grep", "seconds": 1.0},
+                                      {"notes": 100, "op": "stats.scan", "seconds": 1.0}]}
+    faster = {"commit": "b", "results": [{"notes": 100, "op": "search.grep", "seconds": 1.2},
+                                         {"notes": 100, "op": "stats.scan", "skipped": "no display"},
+                                         {"notes": 1000, "op": "search.grep", "seconds": 9.0}]}
+    assert bench.compare(old, faster)
+    slower = {"commit": "c", "results": [{"notes": 100, "op": "search.grep", "seconds": 1.3}]}
+    assert not bench.compare(old, slower)
+    assert "SLOWER" in capsys.readouterr().out
+    assert bench.compare(old, slower, threshold=1.5)
+
+
+def test_load_report():
+    records = [("add", 1.0, "ok"), ("add", 3.0, "ok"), ("edit", 2.0, "conflict"), ("search", 5.0, "OSError: x")]
+    report = bench.load_report(records, 2.0, 4)
+    assert (report["requests"], report["throughput"]) == (4, 2.0)
+    assert report["ops"]["add"]["count"] == 2
+    assert report["ops"]["add"]["max"] == 3.0
+    assert report["ops"]["all"]["conflicts"] == 1
+    assert report["ops"]["all"]["errors"] == 1
+
+
+def test_parse_mix():
+    assert bench.parse_mix("add:2, search:4,rank") == {"add": 2, "search": 4, "rank": 1}
@@ -0,0 +1,31 @@
+from smartnotes.__main__ import main
+
+
+def run(tmp_path, capsys, *argv):
+    main(["--notes-dir", str(tmp_path / "notes"), "--backup-dir", str(tmp_path / "backups"), *argv])
+    return capsys.readouterr().out.splitlines()
+
+
+def test_add_and_search(tmp_path, capsys):
+    assert run(tmp_path, capsys, "add", "buy milk", "-c", "personal")[0].startswith("Saved to ")
+    run(tmp_path, capsys, "add", "exam on monday", "-c", "school")
+    lines = run(tmp_path, capsys, "search", "MILK")
+    assert len(lines) == 1 and lines[0].startswith("personal/") and lines[0].endswith("] buy milk")
+    assert run(tmp_path, capsys, "search", "milk", "-c", "school") == []
+
+
+def test_flat_layout(tmp_path, capsys):
+    run(tmp_path, capsys, "--flat", "add", "as typed")
+    (line,) = run(tmp_path, capsys, "--flat", "search", "typed")
+    assert line.endswith("_notes.txt: as typed") and "/" not in line.partition(":")[0]
+
+
+def test_backup_and_restore(tmp_path, capsys):
+    run(tmp_path, capsys, "add", "buy milk", "-c", "personal")
+    (line,) = run(tmp_path, capsys, "backup")
+    name = line.rpartition(" ")[2]
+    assert run(tmp_path, capsys, "snapshots") == [name]
+    dest = tmp_path / "restored"
+    assert run(tmp_path, capsys, "restore", "--to", str(dest)) == [f"Restored to {dest}"]
+    (path,) = (dest / "personal").iterdir()
+    assert path.read_text(encoding="utf-8").endswith("] buy milk\n")
@@ -0,0 +1,66 @@
+import datetime
+import os
+
+import pytest
+
+from smartnotes.dates import DateIndex, parse_range
+
+# a Wednesday
+TODAY = datetime.date(2026, 3, 4)
+
+
+@pytest.mark.parametrize("text, first, last", [
+    ("", "2026-03-04", "2026-03-04"),
+    ("today", "2026-03-04", "2026-03-04"),
+    ("  Yesterday ", "2026-03-03", "2026-03-03"),
+    ("this week", "2026-03-02", "2026-03-08"),
+    ("last  week", "2026-02-23", "2026-03-01"),
+    ("this month", "2026-03-01", "2026-03-31"),
+    ("last month", "2026-02-01", "2026-02-28"),
+    ("this year", "2026-01-01", "2026-12-31"),
+    ("last year", "2025-01-01", "2025-12-31"),
+    ("last 7 days", "2026-02-26", "2026-03-04"),
+    ("past 1 days", "2026-03-04", "2026-03-04"),
+    ("2026-03-01", "2026-03-01", "2026-03-01"),
+    ("2024-02", "2024-02-01", "2024-02-29"),
+    ("2025-12", "2025-12-01", "2025-12-31"),
+    ("2025", "2025-01-01", "2025-12-31"),
+    ("March 2025", "2025-03-01", "2025-03-31"),
+    ("sep", "2026-09-01", "2026-09-30"),
+    ("2026-03-01..2026-03-10", "2026-03-01", "2026-03-10"),
+    ("january..yesterday", "2026-01-01", "2026-03-03"),
+    ("2026-02..", "2026-02-01", "9999-99-99"),
+    ("..2025", "0000-00-00", "2025-12-31"),
+])
+def test_parse_range(text, first, last):
+    assert parse_range(text, TODAY) == (first, last)
+
+
+@pytest.mark.parametrize("text", ["ma", "ju", "someday", "2026-13-01", "last week..soon", "3 days"])
+def test_parse_range_rejects(text):
+    with pytest.raises(ValueError):
+        parse_range(text, TODAY)
+
+
+def test_last_month_in_january():
+    assert parse_range("last month", datetime.date(2026, 1, 15)) == ("2025-12-01", "2025-12-31")
+    assert parse_range("this week", datetime.date(2026, 3, 2)) == ("2026-03-02", "2026-03-08")
+
+
+def test_days_in_a_range(tmp_path):
+    notes = tmp_path / "notes"
+    for rel in ["ideas/2026-02-28_notes.txt", "ideas/2026-03-02_notes.txt",
+                "school/2026-03-02_notes.txt", "school/2026-03-09_notes.txt"]:
+        os.makedirs(notes / os.path.dirname(rel), exist_ok=True)
+        (notes / rel).write_text("[09:30] one two\n[09:31] three\n", encoding="utf-8")
+    index = DateIndex(str(notes), ["school", "ideas"])
+    days = index.days(*parse_range("this week", TODAY))
+    assert [(day, cat, rel) for day, cat, rel, size in days] == [
+        ("2026-03-02", "school", "school/2026-03-02_notes.txt"),
+        ("2026-03-02", "ideas", "ideas/2026-03-02_notes.txt"),
+    ]
+    # words as the stats count them, stamps included
+    assert index.rollup(*parse_range("2026-02..2026-03-02", TODAY)) == {
+        "2026-02-28": {"notes": 2, "words": 5, "categories": {"ideas": 2}},
+        "2026-03-02": {"notes": 4, "words": 10, "categories": {"school": 2, "ideas": 2}},
+    }
@@ -0,0 +1,117 @@
+import csv
+import datetime
+import json
+import os
+
+import pytest
+
+from smartnotes.core import Notebook
+from smartnotes.export import export_notes, export_records, format_for, parse_line
+
+WHEN = datetime.datetime(2026, 3, 2, 9, 30)
+FORMATS = ["txt", "jsonl", "md", "csv"]
+
+
+def read(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+@pytest.fixture
+def notes(tmp_path):
+    notes = tmp_path / "notes"
+    for rel, text in [("school/2026-03-01_notes.txt", "[08:00] exam, \"hard\"\n"),
+                      ("ideas/2026-03-01_notes.txt", "[09:30] crème brûlée\nno time here\n"),
+                      ("ideas/2026-03-02_notes.txt", "[9:05] early\n")]:
+        os.makedirs(notes / os.path.dirname(rel), exist_ok=True)
+        with open(notes / rel, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+    return str(notes)
+
+
+@pytest.mark.parametrize("line, parsed", [
+    ("[09:30] buy milk\n", ("09:30", "buy milk")),
+    ("[9:05]early", ("9:05", "early")),
+    ("no time\r\n", ("", "no time")),
+    ("[09:30 broken", ("", "[09:30 broken")),
+])
+def test_parse_line(line, parsed):
+    assert parse_line(line) == parsed
+
+
+def test_format_for():
+    assert [format_for(p) for p in ["a.TXT", "a.jsonl", "a.md", "a.csv", "a.json"]] == \
+        ["txt", "jsonl", "md", "csv", "txt"]
+
+
+def test_every_format_in_one_pass(notes, tmp_path):
+    out = tmp_path / "out"
+    targets = {str(out / f"all.{fmt}"): fmt for fmt in FORMATS}
+    os.makedirs(out)
+    done = []
+    assert export_notes(notes, targets, ["ideas", "school"], lambda i, n: done.append((i, n))) == 3
+    assert done == [(1, 3), (2, 3), (3, 3)]
+    assert read(out / "all.txt") == (
+        "--- ideas/2026-03-01_notes.txt ---\n[09:30] crème brûlée\nno time here\n\n\n"
+        "--- ideas/2026-03-02_notes.txt ---\n[9:05] early\n\n\n"
+        "--- school/2026-03-01_notes.txt ---\n[08:00] exam, \"hard\"\n\n\n")
+    assert [json.loads(line) for line in read(out / "all.jsonl").splitlines()] == [
+        {"category": "ideas", "date": "2026-03-01", "time": "09:30", "text": "crème brûlée",
+         "file": "ideas/2026-03-01_notes.txt"},
+        {"category": "ideas", "date": "2026-03-01", "time": "", "text": "no time here",
+         "file": "ideas/2026-03-01_notes.txt"},
+        {"category": "ideas", "date": "2026-03-02", "time": "9:05", "text": "early",
+         "file": "ideas/2026-03-02_notes.txt"},
+        {"category": "school", "date": "2026-03-01", "time": "08:00", "text": "exam, \"hard\"",
+         "file": "school/2026-03-01_notes.txt"},
+    ]
+    assert read(out / "all.md") == (
+        "# Smart Notebook\n\n"
+        "## ideas · 2026-03-01\n\n- **09:30** crème brûlée\n- no time here\n\n"
+        "## ideas · 2026-03-02\n\n- **9:05** early\n\n"
+        "## school · 2026-03-01\n\n- **08:00** exam, \"hard\"\n\n")
+    with open(out / "all.csv", encoding="utf-8", newline="") as f:
+        assert list(csv.reader(f)) == [
+            ["category", "date", "time", "text"],
+            ["ideas", "2026-03-01", "09:30", "crème brûlée"],
+            ["ideas", "2026-03-01", "", "no time here"],
+            ["ideas", "2026-03-02", "9:05", "early"],
+            ["school", "2026-03-01", "08:00", "exam, \"hard\""],
+        ]
+    # plain text on its own is copied through, to the same bytes
+    export_notes(notes, {str(out / "alone.txt"): "txt"}, ["ideas", "school"])
+    assert read(out / "alone.txt") == read(out / "all.txt")
+
+
+def test_an_export_inside_the_notes_is_not_read_back(notes):
+    target = os.path.join(notes, "export.txt")
+    assert export_notes(notes, {target: "txt"}) == 3
+    assert export_notes(notes, {target: "txt"}) == 3
+    assert "--- export.txt ---" not in read(target)
+    assert export_notes(notes, {target: "txt"}, ["school"]) == 1
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_records_export_as_the_files_do(notes, tmp_path, fmt):
+    records = [{"cat": cat, "date": date, "time": time, "text": text}
+               for cat, date, time, text in [("ideas", "2026-03-01", "09:30", "crème brûlée"),
+                                             ("ideas", "2026-03-01", "", "no time here"),
+                                             ("ideas", "2026-03-02", "9:05", "early"),
+                                             ("school", "2026-03-01", "08:00", "exam, \"hard\"")]]
+    files, rows = str(tmp_path / f"files.{fmt}"), str(tmp_path / f"records.{fmt}")
+    export_notes(notes, {files: fmt}, ["ideas", "school"])
+    assert export_records(records, {rows: fmt}) == 3
+    assert read(rows) == read(files)
+    export_records([], {rows: fmt})
+    assert read(rows) == {"md": "# Smart Notebook\n\n", "csv": "category,date,time,text\r\n"}.get(fmt, "")
+
+
+@pytest.mark.parametrize("store", ["files", "sqlite"])
+def test_notebook_export(tmp_path, store):
+    notebook = Notebook(str(tmp_path / "notes"), store=store, backup_dir=str(tmp_path / "backups"))
+    notebook.add("buy milk", "personal", WHEN)
+    notebook.add("an idea", "ideas", WHEN)
+    target = str(tmp_path / "all.jsonl")
+    notebook.export({target: "jsonl"})
+    assert [json.loads(line)["text"] for line in read(target).splitlines()] == ["buy milk", "an idea"]
+    notebook.close()
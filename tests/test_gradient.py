@@ -0,0 +1,75 @@
+import pytest
+
+from smartnotes import gradient
+from smartnotes.gradient import GradientBackground, gradient_colors, gradient_image
+
+
+class Widget:
+    # the one thing gradient_colors asks of a widget, for "#rrggbb" names
+    def winfo_rgb(self, color):
+        return tuple(int(color[i:i + 2], 16) * 257 for i in (1, 3, 5))
+
+
+@pytest.fixture
+def root():
+    tk = pytest.importorskip("tkinter")
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    root.withdraw()
+    gradient._cache.clear()
+    yield root
+    gradient._cache.clear()
+    root.destroy()
+
+
+def test_gradient_colors_match_the_line_drawing():
+    # the colours draw_gradient gave each row, one canvas line at a time
+    expected = []
+    for i in range(750):
+        r = int(0xff + (0xff - 0xff) * i / 750)
+        g = int(0xcf + (0xff - 0xcf) * i / 750)
+        b = int(0xcf + (0xff - 0xcf) * i / 750)
+        expected.append(f"#{r:02x}{g:02x}{b:02x}")
+    assert gradient_colors(Widget(), "#ffcfcf", "#ffffff", 750) == expected
+
+
+@pytest.mark.parametrize("height", [1, 2, 256])
+def test_gradient_colors_run_from_the_first_colour(height):
+    colors = gradient_colors(Widget(), "#000000", "#ff8000", height)
+    assert len(colors) == height
+    assert colors[0] == "#000000"
+    assert colors == sorted(colors)
+
+
+def test_images_are_cached_per_size(root):
+    image = gradient_image(root, 20, 10, "#000000", "#ffffff")
+    assert (image.width(), image.height()) == (20, 10)
+    assert image.get(0, 0) == image.get(19, 0) == (0, 0, 0)
+    assert image.get(5, 9) == tuple(int(255 * 9 / 10) for _ in range(3))
+    assert gradient_image(root, 20, 10, "#000000", "#ffffff") is image
+    for width in range(21, 21 + gradient.CACHE_SIZE):
+        gradient_image(root, width, 10, "#000000", "#ffffff")
+    assert len(gradient._cache) == gradient.CACHE_SIZE
+    assert gradient_image(root, 20, 10, "#000000", "#ffffff") is not image
+
+
+def test_background_redraws_once_per_size(root):
+    import tkinter as tk
+    # shown: an unmapped canvas has no size of its own
+    root.deiconify()
+    canvas = tk.Canvas(root, width=40, height=30)
+    canvas.pack()
+    sizes = []
+    background = GradientBackground(canvas, "#ffcfcf", "#ffffff", delay=1,
+                                    on_resize=lambda w, h: sizes.append((w, h)))
+    root.update()
+    background.redraw()
+    background.redraw()
+    assert len(sizes) == 1
+    assert canvas.itemcget(background.item, "image") == str(background.image)
+    canvas.configure(width=60)
+    root.update()
+    background.redraw()
+    assert len(sizes) == 2
@@ -0,0 +1,23 @@
+import pytest
+
+from smartnotes.grep import Query, parse_query
+
+
+@pytest.mark.parametrize("text, mode, terms", [
+    ("milk", "substring", ["milk"]),
+    ("Q&A", "substring", ["Q&A"]),
+    ("AT&T | a|b", "any", ["AT&T", "a|b"]),
+    ("milk | bread", "any", ["milk", "bread"]),
+    ("milk  &  bread", "all", ["milk", "bread"]),
+    ('"rock & roll"', "phrase", ["rock & roll"]),
+    ("/mil+k/", "regex", ["mil+k"]),
+])
+def test_parse_query(text, mode, terms):
+    assert parse_query(text) == (mode, terms)
+
+
+def test_query_lines():
+    raw = "[09:30] Q&A session\n[09:31] rock & roll\n[09:32] rock, then roll\n".encode()
+    assert Query("q&a").lines(raw) == ["[09:30] Q&A session"]
+    assert Query('"rock & roll"').lines(raw) == ["[09:31] rock & roll"]
+    assert Query("rock & roll").lines(raw) == ["[09:31] rock & roll", "[09:32] rock, then roll"]
@@ -0,0 +1,34 @@
+import os
+import threading
+
+import pytest
+
+from smartnotes.dates import DateIndex
+from smartnotes.index import NoteIndex
+from smartnotes.stats import NoteStats
+
+
+@pytest.mark.parametrize("make", [NoteIndex, NoteStats, lambda notes: DateIndex(notes, ["ideas"])])
+def test_a_change_made_while_saving_is_saved_later(tmp_path, monkeypatch, make):
+    notes = tmp_path / "notes"
+    (notes / "ideas").mkdir(parents=True)
+    path = notes / "ideas" / "2026-03-02_notes.txt"
+    path.write_text("[09:30] one\n", encoding="utf-8")
+    cache = make(str(notes))
+    cache.refresh()
+    replace = os.replace
+    changes = []
+
+    def replace_while_changing(src, dst):
+        # another thread changes a file as the save swaps its copy in
+        if not changes:
+            path.write_text("[09:30] one\n[09:31] two\n", encoding="utf-8")
+            changes.append(threading.Thread(target=cache.update_file, args=(str(path),)))
+            changes[0].start()
+            changes[0].join(0.1)
+        replace(src, dst)
+    monkeypatch.setattr(os, "replace", replace_while_changing)
+    cache.dirty = True
+    cache.save()
+    changes[0].join()
+    assert cache.dirty
@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from smartnotes import journal as journal_module
+from smartnotes.journal import Journal, replace_file
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data.encode("utf-8"))
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read().decode("utf-8")
+
+
+def write_journal(journal, entries, commit=True, torn=""):
+    # the journal as a batch leaves it when the crash comes after step 1
+    lines = [json.dumps(entry) + "\n" for entry in entries]
+    if commit:
+        lines.append(json.dumps({"commit": len(entries)}) + "\n")
+    with open(journal.path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+        f.write(torn)
+
+
+@pytest.fixture
+def notes(tmp_path):
+    notes = str(tmp_path / "notes")
+    os.makedirs(notes)
+    return notes
+
+
+# ---------------------------------------------------
+# Recovery
+# ---------------------------------------------------
+def test_recover_finishes_a_committed_batch(notes):
+    journal = Journal(notes)
+    cut = os.path.join(notes, "ideas", "2026-03-02_notes.txt")
+    missing = os.path.join(notes, "school", "2026-03-02_notes.txt")
+    done = os.path.join(notes, "personal", "2026-03-02_notes.txt")
+    write(cut, "[09:00] old\n[09:30] ne")
+    write(done, "[09:30] both\n")
+    write_journal(journal, [
+        {"path": "ideas/2026-03-02_notes.txt", "at": 12, "data": "[09:30] new\n"},
+        {"path": "school/2026-03-02_notes.txt", "at": 0, "data": "[09:30] first\n"},
+        {"path": "personal/2026-03-02_notes.txt", "at": 0, "data": "[09:30] both\n"},
+    ])
+    assert journal.recover() == ["ideas/2026-03-02_notes.txt", "school/2026-03-02_notes.txt"]
+    assert read(cut) == "[09:00] old\n[09:30] new\n"
+    assert read(missing) == "[09:30] first\n"
+    assert read(done) == "[09:30] both\n"
+    assert not os.path.exists(journal.path)
+
+
+@pytest.mark.parametrize("commit, torn", [
+    (False, ""),
+    (False, '{"path": "ideas/2026-03-02_no'),
+    (True, '{"path": "ideas/2026-03-02_no'),
+])
+def test_recover_drops_an_unfinished_journal(notes, commit, torn):
+    journal = Journal(notes)
+    path = os.path.join(notes, "ideas", "2026-03-02_notes.txt")
+    write(path, "[09:00] old\n")
+    entries = [{"path": "ideas/2026-03-02_notes.txt", "at": 12, "data": "[09:30] new\n"}]
+    # a torn line after the commit line is a second batch's, never committed
+    write_journal(journal, entries, commit, torn)
+    repaired = journal.recover()
+    assert (repaired, read(path)) == ((["ideas/2026-03-02_notes.txt"], "[09:00] old\n[09:30] new\n")
+                                      if commit else ([], "[09:00] old\n"))
+    assert not os.path.exists(journal.path)
+
+
+def test_recover_leaves_files_changed_since(notes):
+    journal = Journal(notes)
+    path = os.path.join(notes, "ideas", "2026-03-02_notes.txt")
+    write(path, "[09:00] old\n[10:00] edited by hand\n")
+    write_journal(journal, [{"path": "ideas/2026-03-02_notes.txt", "at": 12, "data": "[09:30] new\n"}])
+    assert journal.recover() == []
+    assert read(path) == "[09:00] old\n[10:00] edited by hand\n"
+
+
+def test_a_crash_mid_batch_is_finished_on_the_next_start(notes, monkeypatch):
+    journal = Journal(notes)
+    first = os.path.join(notes, "ideas", "2026-03-02_notes.txt")
+    second = os.path.join(notes, "school", "2026-03-02_notes.txt")
+    write(first, "[09:00] old\n")
+    apply = journal._apply
+
+    def crash(entry, check=False):
+        if entry["path"].startswith("school"):
+            raise OSError("power cut")
+        return apply(entry, check)
+    monkeypatch.setattr(journal, "_apply", crash)
+    with pytest.raises(OSError):
+        journal.commit([(first, "[09:30] one\n"), (second, "[09:30] two\n"), (first, "[09:31] three\n")])
+    assert os.path.exists(journal.path)
+    assert not os.path.exists(second)
+    reopened = Journal(notes)
+    assert read(first) == "[09:00] old\n[09:30] one\n[09:31] three\n"
+    assert read(second) == "[09:30] two\n"
+    assert not os.path.exists(reopened.path)
+
+
+# ---------------------------------------------------
+# Group commit
+# ---------------------------------------------------
+def test_concurrent_commits_share_a_batch(notes, monkeypatch):
+    journal = Journal(notes)
+    path = os.path.join(notes, "ideas", "2026-03-02_notes.txt")
+    committed = []
+    journal.on_commit = committed.append
+    fsyncs = []
+    fsync = os.fsync
+    monkeypatch.setattr(journal_module.os, "fsync", lambda fd: fsyncs.append(fd) or fsync(fd))
+    write_batch = journal._write
+
+    def slow_write(items):
+        # the first batch takes a while, so the other commits queue up behind it
+        time.sleep(0.05)
+        write_batch(items)
+    journal._write = slow_write
+    threads = [threading.Thread(target=journal.commit, args=([(path, f"note {i}\n")], [i])) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert journal.batches < 8
+    # one fsync for the journal and one for the day file, per batch
+    assert len(fsyncs) == 2 * journal.batches
+    assert sorted(read(path).splitlines()) == [f"note {i}" for i in range(8)]
+    assert len(committed) == journal.batches
+    assert sorted(sum(committed, [])) == list(range(8))
+    # the records come in the order the notes were written
+    assert [f"note {i}" for i in sum(committed, [])] == read(path).splitlines()
+
+
+def test_every_caller_in_a_failed_batch_sees_the_error(notes):
+    journal = Journal(notes)
+    path = os.path.join(notes, "ideas", "2026-03-02_notes.txt")
+    started = threading.Event()
+    release = threading.Event()
+    write_batch = journal._write
+
+    def blocked_write(items):
+        if not started.is_set():
+            started.set()
+            release.wait()
+            return write_batch(items)
+        raise OSError("disk full")
+    journal._write = blocked_write
+    errors = []
+
+    def add(text):
+        try:
+            journal.commit([(path, text)])
+        except OSError as e:
+            errors.append(e)
+    first = threading.Thread(target=add, args=("first\n",))
+    first.start()
+    started.wait()
+    others = [threading.Thread(target=add, args=(f"note {i}\n",)) for i in range(3)]
+    for t in others:
+        t.start()
+    while len(journal.open.items) < 3:
+        time.sleep(0.001)
+    release.set()
+    for t in [first] + others:
+        t.join()
+    assert journal.batches == 2
+    assert len(errors) == 3
+    assert read(path) == "first\n"
+
+
+def test_replace_file_writes_chunks(notes):
+    path = os.path.join(notes, "ideas", "2026-03-02_notes.txt")
+    write(path, "old\n")
+    replace_file(path, (chunk for chunk in [b"one\n", b"two\n"]))
+    assert read(path) == "one\ntwo\n"
+    assert os.listdir(os.path.dirname(path)) == ["2026-03-02_notes.txt"]
@@ -0,0 +1,288 @@
+import datetime
+import os
+import threading
+import time
+
+import pytest
+
+from smartnotes import notecache
+from smartnotes.core import Notebook
+from smartnotes.journal import Conflict
+from smartnotes.notecache import LineFile
+
+WHEN = datetime.datetime(2026, 3, 2, 9, 30)
+
+
+def open_notebook(tmp_path, store="files"):
+    return Notebook(str(tmp_path / "notes"), store=store, backup_dir=str(tmp_path / "backups"))
+
+
+def day_lines(notebook, path):
+    return notebook.read_file(path)[0].splitlines()
+
+
+# ---------------------------------------------------
+# Notes
+# ---------------------------------------------------
+def test_add_appends_to_the_day_file(tmp_path):
+    notebook = open_notebook(tmp_path)
+    path = notebook.add("buy milk", "personal", WHEN)
+    assert notebook.add_notes(["call mum", "pay rent"], "personal", WHEN) == path
+    assert path.endswith("personal/2026-03-02_notes.txt")
+    assert day_lines(notebook, path) == ["[09:30] buy milk", "[09:30] call mum", "[09:30] pay rent"]
+    assert notebook.add_notes([], "personal") is None
+    with pytest.raises(ValueError):
+        notebook.add("nowhere", "garden", WHEN)
+    notebook.close()
+
+
+def test_edit_file_checks_the_version(tmp_path):
+    notebook = open_notebook(tmp_path)
+    path = notebook.add("draft", "ideas", WHEN)
+    text, version = notebook.read_file(path)
+    version = notebook.edit_file(path, text.replace("draft", "final"), version)
+    assert day_lines(notebook, path) == ["[09:30] final"]
+    notebook.add("late", "ideas", WHEN)
+    with pytest.raises(Conflict):
+        notebook.edit_file(path, "", version)
+    assert day_lines(notebook, path) == ["[09:30] final", "[09:30] late"]
+    notebook.close()
+
+
+def test_delete_line(tmp_path):
+    notebook = open_notebook(tmp_path)
+    path = notebook.add_notes(["one", "two", "three"], "journal", WHEN)
+    version = notebook.delete_line(path, 1, notebook.note_file(path).version)
+    assert version == notebook.note_file(path).version
+    assert day_lines(notebook, path) == ["[09:30] one", "[09:30] three"]
+    notebook.delete_line(path, 1)
+    notebook.delete_line(path, 0)
+    assert day_lines(notebook, path) == []
+    notebook.close()
+
+
+def test_line_edits_trim_only_their_line(tmp_path):
+    notebook = open_notebook(tmp_path)
+    path = notebook.day_path("ideas", "2026-03-02")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("  indented\n[09:30] two\n\n")
+    notebook.edit_line(path, 1, "  three  ")
+    assert notebook.read_file(path)[0] == "  indented\nthree\n\n"
+    notebook.delete_line(path, 1)
+    assert notebook.read_file(path)[0] == "  indented\n\n"
+    notebook.close()
+
+
+def test_line_edits_page_through_the_file(tmp_path, monkeypatch):
+    # the unchanged lines are copied a few bytes at a time; the file is
+    # never read whole
+    monkeypatch.setattr(notecache, "CHUNK_BYTES", 7)
+    notebook = open_notebook(tmp_path)
+    path = notebook.add_notes([f"note {i}" for i in range(100)], "journal", WHEN)
+    lines = notebook.open_lines(path)
+    assert isinstance(lines, LineFile) and len(lines.lines(0, 200)) == 100
+    version = notebook.edit_line(path, 50, "middle", lines.version)
+    version = notebook.delete_line(path, 99, version)
+    assert notebook._cache is None
+    with pytest.raises(Conflict):
+        notebook.delete_line(path, 0, lines.version)
+    with pytest.raises(IndexError):
+        notebook.delete_line(path, 99)
+    lines.close()
+    expected = [f"[09:30] note {i}" for i in range(99)]
+    expected[50] = "middle"
+    assert day_lines(notebook, path) == expected
+    assert notebook.read_file(path)[1] == version
+    notebook.close()
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_search(tmp_path, indexed):
+    notebook = open_notebook(tmp_path)
+    notebook.add("Buy MILK", "personal", WHEN)
+    notebook.add("milkshake idea", "ideas", WHEN.replace(day=3))
+    notebook.add("exam", "school", WHEN)
+    if indexed:
+        notebook.index.save()
+    assert notebook.has_index() == indexed
+    assert sorted(notebook.search("milk")) == [
+        ("ideas/2026-03-03_notes.txt", "[09:30] milkshake idea"),
+        ("personal/2026-03-02_notes.txt", "[09:30] Buy MILK"),
+    ]
+    assert list(notebook.search("milk", ["ideas"])) == [("ideas/2026-03-03_notes.txt", "[09:30] milkshake idea")]
+    assert list(notebook.search("milk", date="2026-03-02")) == [("personal/2026-03-02_notes.txt", "[09:30] Buy MILK")]
+    assert list(notebook.search("nothing")) == []
+    # found after an edit without reopening the notebook
+    path = notebook.day_path("school", "2026-03-02")
+    notebook.edit_line(path, 0, "[09:30] milk exam")
+    assert ("school/2026-03-02_notes.txt", "[09:30] milk exam") in list(notebook.search("milk"))
+    notebook.close()
+
+
+# ---------------------------------------------------
+# Stores kept in step with the day files
+# ---------------------------------------------------
+@pytest.mark.parametrize("store", ["files", "sqlite"])
+def test_flat_layout(tmp_path, store):
+    notebook = Notebook(str(tmp_path / "notes"), [""], store, str(tmp_path / "backups"), timestamps=False)
+    path = notebook.add("first")
+    name = os.path.basename(path)
+    assert day_lines(notebook, path) == ["first"]
+    assert list(notebook.search("first")) == [(name, "first")]
+    assert list(notebook.today()) == [(name, "first")]
+    notebook.edit_line(path, 0, "first, edited")
+    assert list(notebook.search("edited")) == [(name, "first, edited")]
+    notebook.close()
+
+
+def test_line_edits_keep_notes_added_without_the_store(tmp_path):
+    notebook = open_notebook(tmp_path, "sqlite")
+    path = notebook.add("first", "personal", WHEN)
+    notebook.close()
+    # the store is not empty, so this note is never imported into it
+    notebook = open_notebook(tmp_path, "files")
+    notebook.add("added in files mode", "personal", WHEN)
+    notebook.add("third", "personal", WHEN)
+    notebook.close()
+
+    notebook = open_notebook(tmp_path, "sqlite")
+    notebook.delete_line(path, 2)
+    assert day_lines(notebook, path) == ["[09:30] first", "[09:30] added in files mode"]
+    notebook.edit_line(path, 0, "[09:30] first, edited")
+    assert day_lines(notebook, path) == ["[09:30] first, edited", "[09:30] added in files mode"]
+    records = notebook.store.day_notes("2026-03-02", "personal")
+    assert [r["text"] for r in records] == ["first, edited", "added in files mode"]
+    notebook.close()
+
+
+def test_line_edits_skip_blank_lines(tmp_path):
+    notebook = open_notebook(tmp_path, "sqlite")
+    path = notebook.add("one", "ideas", WHEN)
+    notebook.edit_file(path, "[09:30] one\n\n[09:31] two\n")
+    note = notebook.note_file(path)
+    # line numbers are the file's; the store holds no record for the blank
+    notebook.edit_line(path, note.nlines - 1, "[09:31] two, edited")
+    records = notebook.store.day_notes("2026-03-02", "ideas")
+    assert [r["text"] for r in records] == ["one", "two, edited"]
+    notebook.close()
+
+
+def test_edit_line_checks_the_version(tmp_path):
+    notebook = open_notebook(tmp_path)
+    path = notebook.add("one", "school", WHEN)
+    version = notebook.note_file(path).version
+    notebook.add("two", "school", WHEN)
+    with pytest.raises(Conflict):
+        notebook.delete_line(path, 0, version)
+    with pytest.raises(ValueError):
+        notebook.edit_line(path, 0, "two\nlines")
+    with pytest.raises(IndexError):
+        notebook.delete_line(path, 5)
+    assert day_lines(notebook, path) == ["[09:30] one", "[09:30] two"]
+    notebook.close()
+
+
+def test_store_adds_commit_together(tmp_path):
+    notebook = open_notebook(tmp_path, "sqlite")
+    write = notebook.journal._write
+
+    def slow_write(items):
+        # the first batch takes a while, so the other adds queue up behind it
+        time.sleep(0.05)
+        write(items)
+    notebook.journal._write = slow_write
+    threads = [threading.Thread(target=notebook.add, args=(f"note {i}", "ideas", WHEN)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert notebook.journal.batches < 8
+    path = notebook.day_path("ideas", "2026-03-02")
+    records = notebook.store.day_notes("2026-03-02", "ideas")
+    assert [f"[09:30] {r['text']}" for r in records] == day_lines(notebook, path)
+    assert len(records) == 8
+    notebook.close()
+
+
+def test_sqlite_search_matches_inside_words(tmp_path):
+    notebook = open_notebook(tmp_path, "sqlite")
+    notebook.add("buy milk", "personal", WHEN)
+    notebook.add("Meeting notes", "school", WHEN)
+    assert [line for rel, line in notebook.search("ilk")] == ["[09:30] buy milk"]
+    assert [line for rel, line in notebook.search("EETING")] == ["[09:30] Meeting notes"]
+    assert [line for rel, line in notebook.search("k")] == ["[09:30] buy milk"]
+    notebook.close()
+
+
+def test_sqlite_stats_count_words_per_category(tmp_path):
+    notebook = open_notebook(tmp_path, "sqlite")
+    notebook.add("exam exam, tomorrow", "school", WHEN)
+    notebook.add("milk", "personal", WHEN)
+    files = open_notebook(tmp_path)
+    for categories in (["school"], ["personal"], None):
+        assert notebook.summary(categories)["top_words"] == files.summary(categories)["top_words"]
+    notebook.add("more milk", "personal", WHEN)
+    assert dict(notebook.summary(["personal"])["top_words"])["milk"] == 2
+    notebook.close()
+
+
+@pytest.mark.parametrize("store", ["files", "sqlite"])
+def test_calendar_words_add_up_to_the_stats(tmp_path, store):
+    notebook = open_notebook(tmp_path, store)
+    notebook.add("exam, exam!", "school", WHEN)
+    notebook.add("#todo call  mum ...", "personal", WHEN)
+    day = notebook.rollup("2026-03-02", "2026-03-02")["2026-03-02"]
+    assert day["notes"] == 2
+    assert day["words"] == sum(n for word, n in notebook.summary(top=100)["top_words"])
+    notebook.close()
+
+
+# ---------------------------------------------------
+# Packed days
+# ---------------------------------------------------
+def test_packed_days_stay_listed_and_editable(tmp_path):
+    notebook = open_notebook(tmp_path)
+    old = datetime.datetime(2024, 1, 5, 8, 0)
+    path = notebook.add_notes(["one", "two"], "school", old)
+    today = notebook.add("new", "school")
+    assert notebook.pack(older_than=30) == [path]
+    assert notebook.list_files("school") == ["2024-01-05_notes.txt", os.path.basename(today)]
+
+    notebook.edit_line(path, 1, "[08:00] two, edited")
+    assert day_lines(notebook, path) == ["[08:00] one", "[08:00] two, edited"]
+    notebook.add("three", "school", old)
+    assert day_lines(notebook, path) == ["[08:00] one", "[08:00] two, edited", "[08:00] three"]
+    assert notebook.list_files("school") == ["2024-01-05_notes.txt", os.path.basename(today)]
+    notebook.close()
+
+
+def test_add_to_a_packed_day_keeps_its_notes(tmp_path):
+    notebook = open_notebook(tmp_path)
+    old = datetime.datetime(2024, 1, 5, 8, 0)
+    path = notebook.add("one", "ideas", old)
+    notebook.pack(older_than=30)
+    notebook.add("two", "ideas", old)
+    assert day_lines(notebook, path) == ["[08:00] one", "[08:00] two"]
+    assert sorted(line for rel, line in notebook.search("o", scan=True)) == ["[08:00] one", "[08:00] two"]
+    notebook.close()
+
+
+def test_notes_added_while_packing_are_kept(tmp_path, monkeypatch):
+    notebook = open_notebook(tmp_path)
+    old = datetime.datetime(2024, 1, 5, 8, 0)
+    path = notebook.add("one", "ideas", old)
+    remove = os.remove
+    adding = []
+
+    def remove_while_adding(target):
+        # a note for the day comes in just as its file is removed
+        if target == path and not adding:
+            adding.append(threading.Thread(target=notebook.add, args=("two", "ideas", old)))
+            adding[0].start()
+            adding[0].join(0.2)
+        remove(target)
+    monkeypatch.setattr(os, "remove", remove_while_adding)
+    notebook.pack(older_than=30)
+    adding[0].join()
+    assert day_lines(notebook, path) == ["[08:00] one", "[08:00] two"]
+    notebook.close()
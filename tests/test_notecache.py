@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from smartnotes.notecache import RECORD_BYTES, NoteCache, NoteFile, file_version
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+@pytest.fixture
+def days(tmp_path):
+    # five day files of 1000 bytes in 10 lines each
+    paths = []
+    for day in range(1, 6):
+        path = str(tmp_path / "ideas" / f"2026-03-0{day}_notes.txt")
+        write(path, "".join(f"[09:{i:02d}] note {day} {'x' * 84}\n" for i in range(10)))
+        paths.append(path)
+    return paths
+
+
+FILE_BYTES = 1000 + 4 * 10 + RECORD_BYTES
+
+
+# ---------------------------------------------------
+# Parsed files
+# ---------------------------------------------------
+@pytest.mark.parametrize("data, lines", [
+    (b"", []),
+    (b"one\n", ["one\n"]),
+    (b"one\ntwo", ["one\n", "two"]),
+    (b"one\n\ncr\xc3\xa8me\n", ["one\n", "\n", "crème\n"]),
+])
+def test_note_file_lines(data, lines):
+    note = NoteFile("day.txt", (0, len(data)), data)
+    assert note.count() == len(lines)
+    assert note.lines(0, 100) == lines
+    assert [note.line(i) for i in range(len(lines) + 1)] == lines + [None]
+    assert note.version == file_version(data)
+    assert note.nbytes == len(data) + 4 * len(lines) + RECORD_BYTES
+
+
+def test_note_file_line_at():
+    note = NoteFile("day.txt", (0, 12), b"one\ntwo\nend")
+    assert [note.line_at(0), note.line_at(4), note.line_at(8)] == ["one\n", "two\n", "end"]
+
+
+# ---------------------------------------------------
+# Cache
+# ---------------------------------------------------
+def test_get_is_served_from_memory_until_the_file_changes(days):
+    cache = NoteCache()
+    note = cache.get(days[0])
+    assert cache.get(days[0]) is note
+    assert (cache.hits, cache.misses) == (1, 1)
+    write(days[0], "[10:00] rewritten\n")
+    assert cache.get(days[0]).text() == "[10:00] rewritten\n"
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.used == len("[10:00] rewritten\n") + 4 + RECORD_BYTES
+    cache.discard(days[0])
+    assert cache.used == 0
+    cache.get(days[0])
+    assert cache.misses == 3
+    with pytest.raises(FileNotFoundError):
+        cache.get(days[0] + ".missing")
+
+
+def test_least_recently_used_files_go_first(days):
+    cache = NoteCache(budget=4 * FILE_BYTES)
+    for path in days[:4]:
+        cache.get(path)
+    assert cache.used == 4 * FILE_BYTES
+    # using the first file again makes the second the oldest
+    cache.get(days[0])
+    cache.get(days[4])
+    assert list(cache.files) == [os.path.normpath(p) for p in (days[2], days[3], days[0], days[4])]
+    assert cache.used == 4 * FILE_BYTES
+    hits = cache.hits
+    cache.get(days[1])
+    assert (cache.hits, cache.misses) == (hits, 6)
+    assert os.path.normpath(days[2]) not in cache.files
+
+
+def test_files_over_a_quarter_of_the_budget_are_not_kept(days):
+    cache = NoteCache(budget=4 * FILE_BYTES - 1)
+    note = cache.get(days[0])
+    assert note.count() == 10
+    assert (cache.files, cache.used) == ({}, 0)
+    assert cache.get(days[0]) is not note
+    assert cache.misses == 2
+    cache = NoteCache(budget=4 * FILE_BYTES)
+    cache.get(days[0])
+    cache.clear()
+    assert (len(cache.files), cache.used) == (0, 0)
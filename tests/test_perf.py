@@ -0,0 +1,52 @@
+import pytest
+
+from smartnotes import perf
+
+
+@pytest.fixture
+def enabled(tmp_path):
+    perf.enable(directory=str(tmp_path))
+    yield
+    perf.disable()
+
+
+def reads(nbytes):
+    for i in range(3):
+        perf.read(nbytes)
+        yield i
+
+
+def test_interleaved_generators_count_their_own_reads(enabled):
+    with perf.measure("outer") as outer:
+        a = perf.measure_iter("a", reads(10))
+        b = perf.measure_iter("b", reads(100))
+        for _ in zip(a, b):
+            perf.read(1)
+        list(a), list(b)
+    samples = {s["op"]: s for s in perf.samples()[-3:]}
+    assert (samples["a"]["bytes"], samples["a"]["results"]) == (30, 3)
+    assert (samples["b"]["bytes"], samples["b"]["results"]) == (300, 3)
+    assert outer.bytes == 333
+
+
+def test_index_search_counts_bytes(enabled, tmp_path):
+    from smartnotes.index import NoteIndex
+    notes = tmp_path / "notes"
+    (notes / "ideas").mkdir(parents=True)
+    line = "[09:30] crème brûlée\n"
+    (notes / "ideas" / "2026-03-02_notes.txt").write_text(line, encoding="utf-8")
+    index = NoteIndex(str(notes))
+    with perf.measure("search") as sample:
+        assert len(index.search("brûlée", ["ideas"])) == 1
+    assert sample.bytes == len(line.encode("utf-8"))
+
+
+def test_line_edits_are_timed_once(enabled, tmp_path):
+    from smartnotes.core import Notebook
+    notebook = Notebook(str(tmp_path / "notes"), backup_dir=str(tmp_path / "backups"))
+    path = notebook.add_notes(["one", "two"], "ideas")
+    notebook.delete_line(path, 0)
+    notebook.edit_line(path, 0, "three")
+    assert [s["op"] for s in perf.samples()[-2:]] == ["delete", "edit"]
+    assert [s["op"] for s in perf.samples()].count("edit") == 1
+    notebook.close()
@@ -0,0 +1,147 @@
+import datetime
+import math
+import os
+
+import pytest
+
+from smartnotes import rank
+from smartnotes.core import Notebook
+from smartnotes.rank import RankIndex
+
+WHEN = datetime.datetime(2026, 3, 2, 9, 30)
+
+VECTORIZED = [False, pytest.param(True, marks=pytest.mark.skipif(rank.np is None, reason="needs NumPy"))]
+
+
+def write(path, lines):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(line + "\n" for line in lines)
+
+
+def found(results):
+    return [(rel, lineno, line) for score, rel, lineno, line in results]
+
+
+@pytest.fixture
+def notes(tmp_path):
+    notes = str(tmp_path / "notes")
+    write(os.path.join(notes, "ideas", "2026-03-02_notes.txt"), [
+        "[09:30] garden plan: roses and tulips",
+        "",
+        "[09:31] roses roses roses",
+        "[09:32] pay the rent",
+    ])
+    write(os.path.join(notes, "personal", "2026-03-05_notes.txt"), [
+        "[10:00] buy roses for mum and a card and some wrapping paper",
+        "[10:01] call mum about the garden",
+    ])
+    return notes
+
+
+# ---------------------------------------------------
+# Scoring
+# ---------------------------------------------------
+@pytest.mark.parametrize("vectorized", VECTORIZED)
+def test_search_ranks_by_bm25(notes, vectorized):
+    ranks = RankIndex(notes, vectorized=vectorized)
+    results = ranks.search("roses")
+    assert found(results) == [
+        ("ideas/2026-03-02_notes.txt", 3, "[09:31] roses roses roses"),
+        ("ideas/2026-03-02_notes.txt", 1, "[09:30] garden plan: roses and tulips"),
+        ("personal/2026-03-05_notes.txt", 1, "[10:00] buy roses for mum and a card and some wrapping paper"),
+    ]
+    # the stamp isn't a word: 5 notes of 3, 5, 3, 11 and 5 words
+    idf = math.log(1 + (5 - 3 + 0.5) / (3 + 0.5))
+    tf, length, average = 3, 3, 27 / 5
+    expected = idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * length / average))
+    assert results[0][0] == pytest.approx(expected)
+    # a rare word outweighs a common one
+    assert found(ranks.search("tulips roses"))[0][1] == 1
+    assert ranks.search("nothing") == []
+
+
+@pytest.mark.parametrize("vectorized", VECTORIZED)
+def test_search_filters(notes, vectorized):
+    ranks = RankIndex(notes, vectorized=vectorized)
+    assert [r[1] for r in ranks.search("roses", categories=["personal"])] == ["personal/2026-03-05_notes.txt"]
+    assert len(ranks.search("roses", date="2026-03-01..2026-03-03")) == 2
+    assert len(ranks.search("roses", date="2026-03-04..")) == 1
+    assert len(ranks.search("roses", date="03-05")) == 1
+    assert len(ranks.search("roses", k=2)) == 2
+
+
+@pytest.mark.parametrize("vectorized", VECTORIZED)
+def test_similar_leaves_out_the_note_itself(notes, vectorized):
+    ranks = RankIndex(notes, vectorized=vectorized)
+    results = found(ranks.similar("personal/2026-03-05_notes.txt", 2))
+    assert ("personal/2026-03-05_notes.txt", 2, "[10:01] call mum about the garden") not in results
+    # every note sharing a word with "call mum about the garden"
+    assert sorted(results) == [
+        ("ideas/2026-03-02_notes.txt", 1, "[09:30] garden plan: roses and tulips"),
+        ("ideas/2026-03-02_notes.txt", 4, "[09:32] pay the rent"),
+        ("personal/2026-03-05_notes.txt", 1, "[10:00] buy roses for mum and a card and some wrapping paper"),
+    ]
+    with pytest.raises(ValueError):
+        ranks.similar("ideas/2026-03-02_notes.txt", 2)
+
+
+# ---------------------------------------------------
+# Keeping in sync
+# ---------------------------------------------------
+def test_rewritten_files_are_compacted(notes):
+    ranks = RankIndex(notes, vectorized=False)
+    path = os.path.join(notes, "ideas", "2026-03-02_notes.txt")
+    for i in range(4):
+        write(path, ["[09:30] tulips"] + ["[09:31] roses"] * i)
+        ranks.update_file(path)
+    assert len(ranks.alive) > ranks.live == 6
+    before = ranks.search("roses tulips")
+    ranks.compact()
+    assert len(ranks.alive) == ranks.live == 6
+    assert ranks.search("roses tulips") == before
+    assert found(ranks.search("rent")) == []
+    os.remove(path)
+    ranks.update_file(path)
+    assert [r[1] for r in ranks.search("roses tulips")] == ["personal/2026-03-05_notes.txt"]
+
+
+def test_saved_index_is_reloaded(notes, monkeypatch):
+    ranks = RankIndex(notes, vectorized=False)
+    expected = ranks.search("roses mum")
+    ranks.save()
+    assert os.path.exists(os.path.join(notes, rank.RANK_NAME))
+
+    def read_terms(path):
+        raise AssertionError("read " + path)
+
+    monkeypatch.setattr(rank, "read_terms", read_terms)
+    assert RankIndex(notes, vectorized=False).search("roses mum") == expected
+    monkeypatch.undo()
+    # a file changed while the index was closed is read again
+    write(os.path.join(notes, "personal", "2026-03-05_notes.txt"), ["[10:00] roses everywhere, roses"])
+    reloaded = RankIndex(notes, vectorized=False)
+    assert ("personal/2026-03-05_notes.txt", 1, "[10:00] roses everywhere, roses") in found(reloaded.search("roses"))
+    assert found(reloaded.search("mum")) == []
+
+
+def test_a_damaged_index_is_rebuilt(notes):
+    RankIndex(notes).save()
+    path = os.path.join(notes, rank.RANK_NAME)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) // 2)
+    assert len(RankIndex(notes).search("roses")) == 3
+
+
+@pytest.mark.parametrize("store", ["files", "sqlite"])
+def test_ranked_follows_edits(tmp_path, store):
+    notebook = Notebook(str(tmp_path / "notes"), store=store, backup_dir=str(tmp_path / "backups"))
+    path = notebook.add_notes(["roses", "tulips", "pay the rent"], "ideas", WHEN)
+    assert [r[3] for r in notebook.ranked("roses")] == ["[09:30] roses"]
+    notebook.edit_line(path, 1, "[09:30] roses and tulips")
+    notebook.delete_line(path, 0)
+    assert found(notebook.ranked("roses")) == [("ideas/2026-03-02_notes.txt", 1, "[09:30] roses and tulips")]
+    notebook.add("roses again", "school", WHEN)
+    assert len(notebook.ranked("roses")) == 2
+    assert len(notebook.ranked("roses", categories=["school"])) == 1
+    notebook.close()
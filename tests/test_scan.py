@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from smartnotes import perf, scan
+from smartnotes.grep import grep_notes
+from smartnotes.scan import chunked, imap_chunks, read_chunk
+from smartnotes.stats import NoteStats
+
+
+@pytest.fixture
+def notes(tmp_path):
+    # 70 day files over two categories: three chunks of files
+    notes = tmp_path / "notes"
+    paths = []
+    for cat in ("ideas", "school"):
+        os.makedirs(notes / cat)
+        for day in range(1, 36):
+            path = str(notes / cat / f"2026-01-{day:02d}_notes.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"[09:30] {cat} day {day}\n[09:31] crème brûlée #{day % 3}\n")
+            paths.append(path)
+    return str(notes), paths
+
+
+def test_chunked():
+    assert chunked(list(range(5)), 2) == [[0, 1], [2, 3], [4]]
+    assert chunked([], 2) == []
+
+
+def test_pool_results_match_a_serial_read(notes):
+    notes_dir, paths = notes
+    serial = list(imap_chunks(read_chunk, paths, parallel=False))
+    assert len(serial) == 3
+    assert serial[0][0] == (paths[0], ["[09:30] ideas day 1\n", "[09:31] crème brûlée #1\n"])
+    assert list(imap_chunks(read_chunk, paths, parallel=True)) == serial
+
+
+def test_pool_reads_are_counted(notes, tmp_path):
+    notes_dir, paths = notes
+    perf.enable(directory=str(tmp_path))
+    try:
+        with perf.measure("serial") as serial:
+            list(imap_chunks(read_chunk, paths, parallel=False))
+        with perf.measure("pool") as pool:
+            list(imap_chunks(read_chunk, paths, parallel=True))
+    finally:
+        perf.disable()
+    assert pool.bytes == serial.bytes == sum(os.path.getsize(p) for p in paths)
+
+
+def test_scans_agree_with_and_without_the_pool(notes, monkeypatch):
+    notes_dir, paths = notes
+    serial = (list(grep_notes(notes_dir, "brûlée", ["ideas", "school"])),
+              NoteStats(notes_dir, path=notes_dir + "/serial.json").summary(["ideas", "school"]))
+    # every scan through the pool, however small
+    monkeypatch.setattr(scan, "WORKERS", 2)
+    monkeypatch.setattr(scan, "PARALLEL_MIN_FILES", 1)
+    submitted = []
+    submit = scan.pool().submit
+    monkeypatch.setattr(scan.pool(), "submit", lambda *a: submitted.append(a) or submit(*a))
+    pooled = (list(grep_notes(notes_dir, "brûlée", ["ideas", "school"])),
+              NoteStats(notes_dir, path=notes_dir + "/pooled.json").summary(["ideas", "school"]))
+    assert len(serial[0]) == 70
+    assert pooled == serial
+    assert len(submitted) == 6
@@ -0,0 +1,112 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from smartnotes.client import RemoteNotebook
+from smartnotes.core import Notebook
+from smartnotes.journal import Conflict
+from smartnotes.server import NotesServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    notebook = Notebook(str(tmp_path / "notes"), backup_dir=str(tmp_path / "backups"))
+    server = NotesServer(("127.0.0.1", 0), notebook)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    notebook.close()
+
+
+@pytest.fixture
+def remote(server):
+    remote = RemoteNotebook(f"127.0.0.1:{server.server_address[1]}",
+                            notes_dir=server.notebook.notes_dir)
+    yield remote
+    remote.close()
+
+
+def call(server, method, path, body=None):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    try:
+        conn.request(method, path, json.dumps(body) if body is not None else None,
+                     {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def test_remote_add_edit_delete_search(remote):
+    path = remote.add_notes(["buy milk", "call mum"], "personal")
+    assert [line.split("] ", 1)[1] for rel, line in remote.search("milk")] == ["buy milk"]
+    note = remote.note_file(path)
+    remote.edit_line(path, 0, "buy oat milk", note.version)
+    with pytest.raises(Conflict):
+        remote.delete_line(path, 1, note.version)
+    remote.delete_line(path, 1)
+    assert remote.read_file(path)[0] == "buy oat milk\n"
+
+
+def test_line_edits_keep_the_other_lines(server, remote):
+    path = remote.add_notes(["one", "two"], "ideas")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("  indented\n")
+    version = remote.edit_line(path, 0, " first ")
+    assert remote.read_file(path)[0].split("\n", 1)[1].endswith("two\n  indented\n")
+    with pytest.raises(Conflict):
+        remote.delete_line(path, 1, "stale")
+    assert remote.delete_line(path, 1, version) == remote.read_file(path)[1]
+    assert remote.read_file(path)[0] == "first\n  indented\n"
+    status, data = call(server, "PUT", "/api/line", {"path": remote.rel(path), "line": 9})
+    assert status == 400 and "no line 10" in data["error"]
+
+
+@pytest.mark.parametrize("method, path, body", [
+    ("GET", "/api/stats", {"category": 5}),
+    ("GET", "/api/search", {"q": "milk", "category": ["personal", 5]}),
+    ("GET", "/api/search", {"q": 5}),
+    ("POST", "/api/notes", {"text": "milk", "category": "personal", "when": 5}),
+    ("POST", "/api/notes", {"text": "two\nlines", "category": "personal"}),
+    ("GET", "/api/stats", {"top": [1]}),
+    ("PUT", "/api/line", {"path": "ideas/2026-03-02_notes.txt"}),
+])
+def test_bad_requests_get_400(server, method, path, body):
+    status, data = call(server, method, path, body)
+    assert status == 400 and data["error"]
+
+
+def test_server_failures_get_500(server, capsys):
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+    server.notebook.summary = broken
+    status, data = call(server, "GET", "/api/stats")
+    assert (status, data) == (500, {"error": "internal server error"})
+    assert "RuntimeError: boom" in capsys.readouterr().err
+
+
+def test_adds_are_not_sent_twice(server, remote):
+    remote.add("first", "ideas")
+    remote.close()
+    # the server drops the next connection once the request is sent
+    handle = server.RequestHandlerClass.handle_one_request
+    calls = []
+
+    def drop(self):
+        calls.append(self)
+        if len(calls) == 1:
+            self.close_connection = True
+            self.rfile.readline()
+            return
+        handle(self)
+    server.RequestHandlerClass.handle_one_request = drop
+    try:
+        with pytest.raises(http.client.RemoteDisconnected):
+            remote.add("second", "ideas")
+    finally:
+        server.RequestHandlerClass.handle_one_request = handle
+    assert remote.today(["ideas"])[0][1].endswith("first")
+    assert len(remote.today(["ideas"])) == 1
@@ -0,0 +1,123 @@
+import os
+import threading
+
+import pytest
+
+from smartnotes import watcher as watcher_module
+from smartnotes.journal import replace_file
+from smartnotes.watcher import InotifyBackend, NotesWatcher, PollingBackend, diff
+
+
+def inotify_available(tmp_path):
+    try:
+        InotifyBackend(str(tmp_path)).close()
+    except (OSError, AttributeError):
+        return False
+    return True
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+@pytest.fixture(params=["poll", "inotify"])
+def watcher(request, tmp_path):
+    notes = tmp_path / "notes"
+    write(str(notes / "ideas" / "2026-03-02_notes.txt"), "[09:30] one\n")
+    if request.param == "inotify" and not inotify_available(tmp_path):
+        pytest.skip("inotify is not available here")
+    watcher = NotesWatcher(str(notes), backend=request.param)
+    yield watcher
+    watcher.stop()
+
+
+@pytest.mark.parametrize("old, new, events", [
+    ({}, {}, []),
+    ({"a.txt": (1, 5)}, {"a.txt": (1, 5)}, []),
+    ({}, {"a.txt": (1, 5)}, [("added", "a.txt")]),
+    ({"a.txt": (1, 5)}, {"a.txt": (2, 5)}, [("modified", "a.txt")]),
+    ({"a.txt": (1, 5)}, {"a.txt": (1, 6)}, [("modified", "a.txt")]),
+    ({"a.txt": (1, 5), "b.txt": (1, 5)}, {"b.txt": (1, 5)}, [("deleted", "a.txt")]),
+])
+def test_diff(old, new, events):
+    assert diff(old, new) == events
+
+
+# ---------------------------------------------------
+# Backends
+# ---------------------------------------------------
+def test_changes_are_reported(watcher):
+    notes = watcher.notes_dir
+    seen = []
+    watcher.subscribe(seen.append)
+    assert watcher.check() == []
+    day = os.path.join(notes, "ideas", "2026-03-02_notes.txt")
+    write(day, "[09:30] one\n[09:31] two\n")
+    write(os.path.join(notes, "ideas", "2026-03-03_notes.txt"), "[09:30] new\n")
+    # temp files and other names aren't notes
+    write(os.path.join(notes, "ideas", ".2026-03-02_notes.txt.tmp"), "partial")
+    write(os.path.join(notes, "ideas", "todo.md"), "- something\n")
+    assert sorted(watcher.check()) == [("added", "ideas/2026-03-03_notes.txt"),
+                                       ("modified", "ideas/2026-03-02_notes.txt")]
+    replace_file(day, "[09:30] one\n[09:31] two\n[09:32] three\n")
+    assert watcher.check() == [("modified", "ideas/2026-03-02_notes.txt")]
+    os.remove(day)
+    assert watcher.check() == [("deleted", "ideas/2026-03-02_notes.txt")]
+    assert len(seen) == 3
+    watcher.unsubscribe(seen.append)
+    write(day, "[09:30] back\n")
+    assert watcher.check() == [("added", "ideas/2026-03-02_notes.txt")]
+    assert len(seen) == 3
+
+
+def test_new_category_folders_are_watched(watcher):
+    notes = watcher.notes_dir
+    os.makedirs(os.path.join(notes, "garden"))
+    assert watcher.check() == []
+    write(os.path.join(notes, "garden", "2026-03-02_notes.txt"), "[09:30] roses\n")
+    write(os.path.join(notes, "2026-03-02_notes.txt"), "[09:30] flat\n")
+    assert sorted(watcher.check()) == [("added", "2026-03-02_notes.txt"),
+                                       ("added", "garden/2026-03-02_notes.txt")]
+
+
+def test_rescan_catches_up(tmp_path):
+    # what the inotify backend falls back on when the kernel drops events
+    if not inotify_available(tmp_path):
+        pytest.skip("inotify is not available here")
+    notes = str(tmp_path / "notes")
+    write(os.path.join(notes, "ideas", "2026-03-02_notes.txt"), "[09:30] one\n")
+    backend = InotifyBackend(notes)
+    try:
+        write(os.path.join(notes, "ideas", "2026-03-02_notes.txt"), "[09:30] one\n[09:31] two\n")
+        write(os.path.join(notes, "school", "2026-03-02_notes.txt"), "[09:30] class\n")
+        assert sorted(backend.rescan()) == [("added", "school/2026-03-02_notes.txt"),
+                                            ("modified", "ideas/2026-03-02_notes.txt")]
+        assert backend.changes() == []
+        write(os.path.join(notes, "school", "2026-03-03_notes.txt"), "[09:30] more\n")
+        assert backend.changes() == [("added", "school/2026-03-03_notes.txt")]
+    finally:
+        backend.close()
+
+
+def test_falls_back_to_polling(tmp_path, monkeypatch):
+    def unavailable(notes_dir):
+        raise OSError(38, "inotify_init1 failed")
+    monkeypatch.setattr(watcher_module, "InotifyBackend", unavailable)
+    watcher = NotesWatcher(str(tmp_path / "notes"), backend="inotify")
+    assert isinstance(watcher.backend, PollingBackend)
+    write(str(tmp_path / "notes" / "2026-03-02_notes.txt"), "[09:30] one\n")
+    assert watcher.check() == [("added", "2026-03-02_notes.txt")]
+    assert isinstance(NotesWatcher(str(tmp_path / "notes"), backend="poll").backend, PollingBackend)
+
+
+def test_start_checks_from_a_thread(tmp_path):
+    watcher = NotesWatcher(str(tmp_path / "notes"), interval=10, backend="poll")
+    seen = threading.Event()
+    watcher.subscribe(lambda events: seen.set())
+    watcher.start()
+    write(str(tmp_path / "notes" / "ideas" / "2026-03-02_notes.txt"), "[09:30] one\n")
+    assert seen.wait(5)
+    watcher.stop()
+    watcher.stop()